@@ -125,9 +125,16 @@ def pp_dir(loja: str) -> Path:
 def vendas_raw_json(loja: str) -> Path:
     return raw_dir(loja) / "vendas.json"  # nome fixo
 
+def vendas_shards_dir(loja: str) -> Path:
+    """Checkpoints por shard do backfill de pedidos (retomável)."""
+    return raw_dir(loja) / "shards"
+
 def vendas_pp_json(loja: str) -> Path:
     return pp_dir(loja) / "vendas_pp.json"
 
+def vendas_cubo_diario_json(loja: str) -> Path:
+    return pp_dir(loja) / "vendas_cubo_diario.json"
+
 def vendas_resumo_json(loja: str) -> Path:   # compatível com versão anterior
     return pp_dir(loja) / "resumo_windows.json"
 
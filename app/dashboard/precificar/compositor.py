@@ -9,53 +9,34 @@ from app.utils.vendas.meli.service import get_por_mlb, get_por_mlb_br
 
 from app.config.paths import Regiao
 from app.utils.precificacao.service import (
-    construir_dataset_base,    # monta itens (price, rebate, logística, etc.)
-    enriquecer_preco_compra, 
-    aplicar_overrides_no_documento, 
-    aplicar_metricas_no_documento,  # calcula MCP, custos e percentuais
+    construir_dataset_memoria,  # base → preço de compra → overrides → métricas → faixas
 )
 from app.utils.precificacao.simulator import simular_mcp_item
-from app.utils.precificacao.precos_min_max import precos_min_max
-from app.utils.precificacao.metrics import carregar_regras_ml
+from app.utils.precificacao.cache import dataset_em_cache, datasets_em_cache
+from app.utils.precificacao.grade import CENARIO_BASE, simular_grade
+from app.utils.precificacao.config import get_overrides_ml
 
 from app.utils.precificacao.metrics_estoque import calcular_cobertura_estoque
 
 
 def _dataset_memoria_unit(regiao: Regiao) -> dict:
-    # versão unitária (sem mudanças nas suas regras)
-    doc = construir_dataset_base(regiao)
-    doc = enriquecer_preco_compra(doc)
-    doc = aplicar_overrides_no_documento(doc) 
-    doc = aplicar_metricas_no_documento(doc)
-
-    # anexar faixa de preços alvo (se você já tinha essa lógica)
-    regras = carregar_regras_ml()
-    itens2 = []
-    for it in doc.get("itens", []):
-        it2 = dict(it)
-        faixas = precos_min_max(it2, regras)
-        if faixas.get("preco_minimo") is not None:
-            it2["preco_minimo"] = faixas["preco_minimo"]
-        if faixas.get("preco_maximo") is not None:
-            it2["preco_maximo"] = faixas["preco_maximo"]
-        itens2.append(it2)
-    doc["itens"] = itens2
-    return doc
-
-
-def _dataset_memoria_multi(regioes: list[Regiao]) -> dict:
+    # versão unitária (sem mudanças nas suas regras); rebuild só se algum insumo mudou
+    return dataset_em_cache(regiao, construir_dataset_memoria)
+
+
+def _dataset_memoria_multi(regioes: list[Regiao], *, modo: str = "threads") -> dict:
     """
     Carrega 1..n regiões e concatena itens num único documento.
     Mantém o campo `regiao` em cada item para distinguir no grid.
+    Regiões sem cache são construídas em paralelo (modo: threads | processos | serial);
+    a ordem dos itens e de `_meta_origens` segue `regioes`.
     """
     itens_all: list[dict] = []
     metas = []
-    for r in regioes:
-        d = _dataset_memoria_unit(r)
-        for it in d.get("itens", []):
-            it2 = dict(it)
-            it2["regiao"] = r  # garante o campo
-            itens_all.append(it2)
+    for r, d in zip(regioes, datasets_em_cache(regioes, construir_dataset_memoria, modo=modo)):
+        for it in d.get("itens", []):  # itens já são cópias (cache)
+            it["regiao"] = r  # garante o campo
+            itens_all.append(it)
         metas.append(d.get("_meta"))
     return {"itens": itens_all, "_meta_origens": metas}
 
@@ -83,24 +64,8 @@ def _aplicar_filtro_busca(items: List[dict], query: str) -> List[dict]:
     return [it for it in items if match(it)]
 
 def _dataset_memoria(regiao):
-    doc = construir_dataset_base(regiao)
-    doc = enriquecer_preco_compra(doc)
-    doc = aplicar_overrides_no_documento(doc)
-    doc = aplicar_metricas_no_documento(doc)
-
-    # anexar preco_minimo/preco_maximo por item (somente FULL quando aplicável)
-    regras = carregar_regras_ml()
-    itens2 = []
-    for it in doc.get("itens", []):
-        faixas = precos_min_max(it, regras)
-        it2 = dict(it)
-        if faixas.get("preco_minimo") is not None:
-            it2["preco_minimo"] = faixas["preco_minimo"]
-        if faixas.get("preco_maximo") is not None:
-            it2["preco_maximo"] = faixas["preco_maximo"]
-        itens2.append(it2)
-    doc["itens"] = itens2
-    return doc
+    # mesmo pipeline de _dataset_memoria_unit, servido pelo cache de artefatos
+    return dataset_em_cache(regiao, construir_dataset_memoria)
 
 
 def _tabela_principal(items: list[dict]) -> list[int]:
@@ -118,7 +83,7 @@ def _tabela_principal(items: list[dict]) -> list[int]:
     cols = [
         "mlb", "title", "gtin", "regiao", "logistic_type",
         "preco_efetivo", "price", "rebate_price_discounted",
-        "preco_compra", "frete_sobre_custo", "custo_fixo_full",
+        "preco_compra", "frete_sobre_custo", "custo_fixo_full", "custo_ml_nao_full",
         "comissao", "comissao_pct", "marketing", "marketing_pct",
         "imposto", "imposto_pct", "subsidio_ml_valor",
         "mcp_abs", "mcp_pct",
@@ -135,6 +100,7 @@ def _tabela_principal(items: list[dict]) -> list[int]:
         "rebate_price_discounted": "Preço com rebate (R$)",
         "preco_compra": "Preço de custo (R$)", "frete_sobre_custo": "Frete (R$)",
         "custo_fixo_full": "Custo fixo FULL (R$)",
+        "custo_ml_nao_full": "Custo ML não FULL (R$)",
         "comissao": "Comissão (R$)", "comissao_pct": "Comissão (%)",
         "marketing": "Marketing (R$)", "marketing_pct": "Marketing (%)",
         "imposto": "Imposto (R$)", "imposto_pct": "Imposto (%)",
@@ -199,10 +165,52 @@ def _simulador(item: dict):
         k1.metric("MCP simulado (R$)", f"{res['mcp_abs']:.2f}")
         k2.metric("MCP simulado (%)", f"{(res['mcp_pct'] or 0)*100:.2f}%")
         k3.metric("Comissão (R$)", f"{res['comissao_brl']:.2f}")
-        k4.metric("Custo fixo FULL (R$)", f"{res['custo_fixo_full']:.2f}")
+        k4.metric("Custo fixo ML (R$)", f"{res['custo_fixo_full'] + res['custo_ml_nao_full']:.2f}")
         with st.expander("Decomposição completa"):
             st.json(res, expanded=False)
 
+    _grade_sensibilidade(item)
+
+
+def _grade_sensibilidade(item: dict):
+    """Heatmap de MCP % sobre preço × subsídio (× cenários de override), recalculado a cada slider."""
+    import altair as alt
+    import numpy as np
+
+    ref = float(item.get("preco_efetivo") or item.get("price") or 0.0)
+    if ref <= 0:
+        return
+    st.markdown("#### Sensibilidade: preço × subsídio")
+    nomes = [CENARIO_BASE] + sorted((get_overrides_ml().get("cenarios") or {}).keys())
+    c1, c2, c3 = st.columns([1, 1, 1])
+    with c1:
+        faixa = st.slider("Preço (% do atual)", min_value=50, max_value=150, value=(80, 120), step=5)
+    with c2:
+        teto = max(1.0, round(ref * 0.3, 1))
+        sub_max = st.slider("Subsídio máximo (R$)", min_value=0.0, max_value=teto,
+                            value=min(teto, max(0.5, round(ref * 0.1, 1))), step=0.5)
+    with c3:
+        cenarios = st.multiselect("Cenários", options=nomes, default=[CENARIO_BASE])
+
+    precos = np.round(np.linspace(ref * faixa[0] / 100, ref * faixa[1] / 100, 21), 2)
+    subsidios = np.round(np.linspace(0.0, sub_max, 11), 2)
+    grade = simular_grade([item], precos, subsidios, cenarios or [CENARIO_BASE])
+    df = grade.tabela(0)
+    if df["mcp_pct"].isna().all():
+        st.info("Sem preço de compra: não há MCP para simular.")
+        return
+    df["mcp_pct"] = df["mcp_pct"] * 100
+
+    chart = alt.Chart(df).mark_rect().encode(
+        x=alt.X("subsidio:O", title="Subsídio (R$)"),
+        y=alt.Y("preco:O", title="Preço (R$)", sort="descending"),
+        color=alt.Color("mcp_pct:Q", title="MCP %", scale=alt.Scale(scheme="redyellowgreen", domainMid=0)),
+        tooltip=["cenario", "preco", "subsidio", alt.Tooltip("mcp_pct:Q", format=".2f"), alt.Tooltip("mcp_abs:Q", format=".2f")],
+    ).properties(height=420)
+    if len(grade.cenarios) > 1:
+        chart = chart.properties(width=260).facet(column=alt.Column("cenario:N", title=None))
+    st.altair_chart(chart, use_container_width=len(grade.cenarios) == 1)
+
 def _norm_windows(payload: dict) -> dict:
     """
     Aceita o dicionário retornado por get_resumos(...) e tenta extrair contagens
@@ -467,7 +475,8 @@ def _render_cards_metricas(item: dict):
     c3.metric("Comissão ML (R$ / %)",
               f"{m(item.get('comissao'))}",
               pct(item.get('comissao_pct')))
-    c4.metric("Custo fixo ML (R$)", m(item.get("custo_fixo_full")))
+    fixo_ml = item.get("custo_fixo_full")
+    c4.metric("Custo fixo ML (R$)", m(fixo_ml if fixo_ml is not None else item.get("custo_ml_nao_full")))
 
     c5, c6, c7, c8 = st.columns(4)
     faixa = (m(pmin) if pmin is not None else "—") + "  →  " + (m(pmax) if pmax is not None else "—")
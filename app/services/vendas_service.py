@@ -4,6 +4,7 @@ from app.utils.vendas.meli.service import (
     resumo_total,
     # novos:
     listar_vendas_br, get_resumos_br, get_por_mlb_br, get_por_gtin, get_por_gtin_br,
+    get_agregados, get_agregados_br,
 )
 
 __all__ = [
@@ -11,4 +12,5 @@ __all__ = [
     "filtrar_por_mlb", "filtrar_por_sku", "filtrar_por_gtin", "filtrar_por_venda",
     "resumo_total",
     "listar_vendas_br", "get_resumos_br", "get_por_mlb_br", "get_por_gtin", "get_por_gtin_br",
+    "get_agregados", "get_agregados_br",
 ]
@@ -2,19 +2,40 @@
 import time
 import json
 import logging
-import requests
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.utils.core.http import HttpTransport, RetryPolicy, check_rate_limit_keys
 
 LWA_TOKEN_URL = "https://api.amazon.com/auth/o2/token"  # LWA
 DEFAULT_TIMEOUT = 30
 
+# Limites (req/s, burst) documentados da SP-API; demais endpoints aprendem a taxa
+# pelo header x-amzn-RateLimit-Limit da primeira resposta.
+SPAPI_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "orders": (0.0167, 20.0),
+    "GET /orders/v0/orders/{id}": (0.5, 30.0),
+    "GET /orders/v0/orders/{id}/orderItems": (0.5, 30.0),
+}
+
+# URL de exemplo de cada chave "METHOD /path" acima (checada no import)
+_SPAPI_KEY_EXAMPLES: Dict[str, str] = {
+    "GET /orders/v0/orders/{id}":
+        "GET https://sellingpartnerapi-na.amazon.com/orders/v0/orders/902-3159896-1390916",
+    "GET /orders/v0/orders/{id}/orderItems":
+        "GET https://sellingpartnerapi-na.amazon.com/orders/v0/orders/902-3159896-1390916/orderItems",
+}
+check_rate_limit_keys(SPAPI_RATE_LIMITS, _SPAPI_KEY_EXAMPLES)
+
 class AmazonSpApiClient:
     """
     Cliente mínimo SP-API (sem IAM/SigV4). Usa LWA access token no header:
     x-amz-access-token: <ACCESS_TOKEN>
     """
     def __init__(self, base_url: str, client_id: str, client_secret: str,
-                 refresh_token: str, user_agent: str):
+                 refresh_token: str, user_agent: str,
+                 transport: Optional[HttpTransport] = None,
+                 rate_limits: Optional[Mapping[str, Tuple[float, float]]] = None):
         self.base_url = base_url.rstrip("/")
         self.client_id = client_id
         self.client_secret = client_secret
@@ -22,24 +43,33 @@ class AmazonSpApiClient:
         self.user_agent = user_agent
         self._access_token: Optional[str] = None
         self._access_token_exp: float = 0.0
+        self._token_lock = threading.Lock()
+        self.http = transport or HttpTransport(
+            retry=RetryPolicy(),
+            rate_limits=rate_limits if rate_limits is not None else SPAPI_RATE_LIMITS,
+            timeout=DEFAULT_TIMEOUT,
+            name="sp-api",
+        )
 
     def _ensure_token(self) -> str:
-        now = time.time()
-        if self._access_token and now < self._access_token_exp - 60:
-            return self._access_token
+        with self._token_lock:
+            now = time.time()
+            if self._access_token and now < self._access_token_exp - 60:
+                return self._access_token
 
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": self.refresh_token,
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-        }
-        r = requests.post(LWA_TOKEN_URL, data=data, timeout=DEFAULT_TIMEOUT)
-        r.raise_for_status()
-        payload = r.json()
-        self._access_token = payload["access_token"]
-        self._access_token_exp = now + int(payload.get("expires_in", 3600))
-        return self._access_token
+            data = {
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            }
+            # LWA não rotaciona o refresh token: repetir a troca é seguro
+            r = self.http.post(LWA_TOKEN_URL, data=data, endpoint="POST /auth/o2/token", idempotent=True)
+            r.raise_for_status()
+            payload = r.json()
+            self._access_token = payload["access_token"]
+            self._access_token_exp = now + int(payload.get("expires_in", 3600))
+            return self._access_token
 
     def _headers(self, token: str, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         h = {
@@ -51,11 +81,16 @@ class AmazonSpApiClient:
             h.update(extra)
         return h
 
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+            endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        GET com retry/backoff (429/5xx, Retry-After) e token bucket por endpoint.
+        endpoint: rótulo do bucket (ex.: "orders"); padrão = "GET /path" normalizado.
+        """
         token = self._ensure_token()
         url = f"{self.base_url}/{path.lstrip('/')}"
         try:
-            r = requests.get(url, headers=self._headers(token), params=params, timeout=DEFAULT_TIMEOUT)
+            r = self.http.get(url, headers=self._headers(token), params=params, endpoint=endpoint)
         except Exception as e:
             logging.exception("SP-API GET %s exception: %s", url, e)
             raise
@@ -74,8 +109,8 @@ class AmazonSpApiClient:
         token = self._ensure_token()
         body = {"restrictedResources": restricted_resources}
         url = f"{self.base_url}/tokens/2021-03-01/restrictedDataToken"
-        r = requests.post(url, headers=self._headers(token, {"content-type": "application/json"}),
-                          data=json.dumps(body), timeout=DEFAULT_TIMEOUT)
+        r = self.http.post(url, headers=self._headers(token, {"content-type": "application/json"}),
+                           data=json.dumps(body))
         r.raise_for_status()
         return r.json()["restrictedDataToken"]
     
@@ -87,17 +122,13 @@ class AmazonSpApiClient:
         - monta headers (inclui content-type json)
         - executa POST e faz o mesmo tratamento de erro/log do get()
         """
-        import requests
-        import logging
-
         token = self._ensure_token()
         url = f"{self.base_url}/{path.lstrip('/')}"
         try:
-            r = requests.post(
+            r = self.http.post(
                 url,
                 headers=self._headers(token, {"content-type": "application/json"}),
                 json=json,
-                timeout=DEFAULT_TIMEOUT,
             )
         except Exception as e:
             logging.exception("SP-API POST %s exception: %s", url, e)
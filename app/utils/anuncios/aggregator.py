@@ -20,7 +20,12 @@ def _read_json(p: Path) -> Any:
     with p.open("r", encoding="utf-8") as f:
         return json.load(f)
 
+def _vivo(item: Any) -> bool:
+    # itens removidos do seller ficam no RAW com tombstone (ver sync.py) até expirar
+    return not (isinstance(item, dict) and item.get("_removed_at"))
+
 def carregar_raw(regiao: Regiao | str | None) -> list[dict]:
+    """Itens do RAW da região, sem os tombstones de anúncios removidos."""
     reg = _norm_regiao(regiao)
     path: Path = ancfg.RAW_PATH(reg)  # RAW_PATH("sp"/"mg"/...)
     if not path.exists():
@@ -31,12 +36,12 @@ def carregar_raw(regiao: Regiao | str | None) -> list[dict]:
         for key in ("results", "data", "items", "anuncios"):
             arr = payload.get(key)
             if isinstance(arr, list):
-                return arr
+                return [it for it in arr if _vivo(it)]
         if "id" in payload:
-            return [payload]
+            return [payload] if _vivo(payload) else []
         return []
     if isinstance(payload, list):
-        return payload
+        return [it for it in payload if _vivo(it)]
     return []
 
 def _carregar_pp(regiao: str) -> List[PPAnuncio]:
@@ -87,7 +92,7 @@ def _normalizar_raw_para_pp(raw_payload: Dict[str, Any]) -> List[PPAnuncio]:
     """
     items = raw_payload.get("items") or []
     out: List[PPAnuncio] = []
-    for it in items:
+    for it in filter(_vivo, items):
         # campos conforme schema mínimo
         rec: PPAnuncio = {
             "mlb": it.get("id"),
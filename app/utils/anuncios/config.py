@@ -11,6 +11,15 @@ RegiaoStr = Literal["mg", "sp"]
 # Mantido p/ consumo externo; usado pelos scripts (ML e Amazon)
 RETENCAO_BACKUPS = 2
 
+# Campos do item ML gravados no RAW (projeção `attributes=` do /items?ids=).
+# Cobrem o que o gerar_pp extrai; ampliar aqui se o PP passar a usar outro campo.
+RAW_ITEM_ATTRIBUTES = (
+    "id", "title", "status", "last_updated",
+    "price", "original_price", "sale_terms", "available_quantity",
+    "shipping", "tags",
+    "seller_custom_field", "attributes", "variations",
+)
+
 # =========================
 # MERCADO LIVRE (compat)
 # =========================
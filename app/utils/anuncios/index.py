@@ -0,0 +1,175 @@
+# app/utils/anuncios/index.py
+"""
+Índice em memória de anúncios ML (RAW e PP) por MLB, SKU e GTIN.
+
+Cada (camada, regiao) é indexado uma vez e reaproveitado enquanto o arquivo
+não mudar (assinatura = mtime_ns + tamanho); uma regravação do RAW/PP pelos
+scripts invalida o índice na próxima consulta, sem reiniciar o processo.
+Os registros indexados são compartilhados: quem for alterar deve copiar.
+"""
+from __future__ import annotations
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.paths import Camada, Regiao
+from app.utils.core.identifiers import normalize_gtin
+from . import aggregator as ag
+from . import config as ancfg
+from .preprocess import _extract_gtin, _extract_sku
+
+__all__ = [
+    "IndiceAnuncios",
+    "get_indice",
+    "buscar_por_mlb",
+    "buscar_por_sku",
+    "buscar_por_gtin",
+    "invalidar_indices",
+]
+
+
+class IndiceAnuncios:
+    __slots__ = ("camada", "regiao", "by_mlb", "by_sku", "by_gtin")
+
+    def __init__(self, camada: Camada, regiao: str) -> None:
+        self.camada = camada
+        self.regiao = regiao
+        self.by_mlb: Dict[str, Dict[str, Any]] = {}
+        self.by_sku: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_gtin: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_mlb)
+
+
+_CACHE: Dict[Tuple[str, str], Tuple[Optional[Tuple[int, int]], IndiceAnuncios]] = {}
+_LOCK = threading.Lock()
+
+
+# ------------------------------------------------------------
+# chaves
+# ------------------------------------------------------------
+
+def _mlb_key(v: Any) -> str:
+    return str(v or "").strip().casefold()
+
+
+def _sku_key(v: Any) -> str:
+    return str(v or "").strip().casefold()
+
+
+def _gtin_key(v: Any) -> str:
+    return (normalize_gtin(str(v)) or "") if v else ""
+
+
+def _path(camada: Camada, regiao: str) -> Path:
+    return ancfg.RAW_PATH(regiao) if camada is Camada.RAW else ancfg.PP_PATH(regiao)
+
+
+def _file_sig(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+# ------------------------------------------------------------
+# construção
+# ------------------------------------------------------------
+
+def _build(camada: Camada, regiao: str) -> IndiceAnuncios:
+    idx = IndiceAnuncios(camada, regiao)
+    if camada is Camada.RAW:
+        rows = ag.carregar_raw(regiao)
+        mlb_of = lambda r: r.get("id")  # noqa: E731
+        sku_of, gtin_of = _extract_sku, _extract_gtin
+    else:
+        rows = ag._carregar_pp(regiao)
+        mlb_of = lambda r: r.get("mlb")  # noqa: E731
+        sku_of = lambda r: r.get("sku") or r.get("seller_sku")  # noqa: E731
+        gtin_of = lambda r: r.get("gtin") or r.get("ean") or r.get("barcode")  # noqa: E731
+
+    for rec in rows:
+        if not isinstance(rec, dict):
+            continue
+        k = _mlb_key(mlb_of(rec))
+        if k:
+            idx.by_mlb.setdefault(k, rec)  # 1ª ocorrência vence (mesma regra do scan linear)
+        s = _sku_key(sku_of(rec))
+        if s:
+            idx.by_sku.setdefault(s, []).append(rec)
+        g = _gtin_key(gtin_of(rec))
+        if g:
+            idx.by_gtin.setdefault(g, []).append(rec)
+    return idx
+
+
+def _norm_regiao(regiao: Regiao | str) -> str:
+    return regiao.value if isinstance(regiao, Regiao) else str(regiao).strip().lower()
+
+
+def get_indice(camada: Camada | str, regiao: Regiao | str) -> IndiceAnuncios:
+    """Índice da camada (RAW/PP) e região, reconstruído só quando o arquivo mudou."""
+    camada = Camada(camada)
+    if camada not in (Camada.RAW, Camada.PP):
+        raise ValueError(f"get_indice: camada não indexada: {camada}")
+    reg = _norm_regiao(regiao)
+    sig = _file_sig(_path(camada, reg))
+    key = (camada.value, reg)
+    with _LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    idx = _build(camada, reg) if sig is not None else IndiceAnuncios(camada, reg)
+    with _LOCK:
+        _CACHE[key] = (sig, idx)
+    return idx
+
+
+def invalidar_indices() -> None:
+    with _LOCK:
+        _CACHE.clear()
+
+
+# ------------------------------------------------------------
+# consultas (várias regiões, na ordem pedida)
+# ------------------------------------------------------------
+
+def _regioes(regioes: Optional[List[Regiao | str]]) -> List[Regiao | str]:
+    return list(regioes) if regioes else list(Regiao)
+
+
+def buscar_por_mlb(mlb: str, regioes: Optional[List[Regiao | str]] = None,
+                   camada: Camada = Camada.PP) -> Optional[Dict[str, Any]]:
+    """Primeiro registro com o MLB nas regiões (todas, se None)."""
+    k = _mlb_key(mlb)
+    if not k:
+        return None
+    for r in _regioes(regioes):
+        rec = get_indice(camada, r).by_mlb.get(k)
+        if rec is not None:
+            return rec
+    return None
+
+
+def buscar_por_sku(sku: str, regioes: Optional[List[Regiao | str]] = None,
+                   camada: Camada = Camada.PP) -> List[Dict[str, Any]]:
+    k = _sku_key(sku)
+    if not k:
+        return []
+    out: List[Dict[str, Any]] = []
+    for r in _regioes(regioes):
+        out.extend(get_indice(camada, r).by_sku.get(k, ()))
+    return out
+
+
+def buscar_por_gtin(gtin: str, regioes: Optional[List[Regiao | str]] = None,
+                    camada: Camada = Camada.PP) -> List[Dict[str, Any]]:
+    k = _gtin_key(gtin)
+    if not k:
+        return []
+    out: List[Dict[str, Any]] = []
+    for r in _regioes(regioes):
+        out.extend(get_indice(camada, r).by_gtin.get(k, ()))
+    return out
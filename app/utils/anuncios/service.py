@@ -1,11 +1,12 @@
 # app/utils/anuncios/service.py
 from __future__ import annotations
+import copy
 from typing import List, Dict, Any, Optional
 
 from .aggregator import _carregar_pp
-import app.utils.anuncios.aggregator as ag
 from .schemas import PPAnuncio, has_minimal_fields
 from . import filters  # by_* / apply_filters
+from . import index as indice  # índice MLB/SKU/GTIN (RAW + PP) invalidado por mtime
 from app.utils.core.identifiers import normalize_gtin
 from app.config.paths import Regiao, Camada
 from app.utils.core.io import ler_json
@@ -108,15 +109,25 @@ def listar_anuncios(
 def obter_anuncio_por_mlb_pp(regiao: str, mlb: str) -> Optional[PPAnuncio]:
     """
     Retorna um único anúncio PP por MLB (ou None se não encontrado).
+    Consulta O(1) no índice em memória (invalidado pelo mtime do PP).
     """
     if not mlb:
         return None
-    q = mlb.strip().casefold()
-    for rec in _carregar_pp(regiao):
-        rid = str(rec.get("mlb") or "").strip().casefold()
-        if rid == q:
-            return rec
-    return None
+    return indice.buscar_por_mlb(mlb, [regiao], Camada.PP)  # type: ignore[return-value]
+
+def obter_anuncios_por_sku(sku: str, regiao: Regiao | str | None = None,
+                           camada: Camada = Camada.PP) -> List[Dict[str, Any]]:
+    """
+    Anúncios (PP ou RAW) com o SKU do vendedor; regiao=None busca em todas.
+    """
+    return indice.buscar_por_sku(sku, _resolve_regioes(regiao), camada)
+
+def obter_anuncios_por_gtin(gtin: str, regiao: Regiao | str | None = None,
+                            camada: Camada = Camada.PP) -> List[Dict[str, Any]]:
+    """
+    Anúncios (PP ou RAW) com o GTIN (normalizado); regiao=None busca em todas.
+    """
+    return indice.buscar_por_gtin(gtin, _resolve_regioes(regiao), camada)
 
 def campos_basicos(rec: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -186,6 +197,7 @@ def _chamada_api_ou_cache(regiao: str, mlb: str) -> Optional[dict]:
 def obter_anuncio_por_mlb(regiao: str, mlb: str) -> Optional[dict]:
     anuncio = _chamada_api_ou_cache(regiao, mlb)
     if anuncio:
+        anuncio = copy.deepcopy(anuncio)  # registro vem do índice compartilhado
         _normalize_gtins_inplace(anuncio)
     return anuncio
 
@@ -217,13 +229,4 @@ def obter_raw_por_mlb(mlb: str, regiao: Regiao | str | None) -> Optional[Dict[st
     """
     if not mlb:
         return None
-
-    for r in _resolve_regioes(regiao):
-        items = ag.carregar_raw(r)  # lista de dicts (pode ser vazia)
-        for it in items:
-            try:
-                if str(it.get("id")) == str(mlb):
-                    return it
-            except Exception:
-                continue
-    return None
\ No newline at end of file
+    return indice.buscar_por_mlb(str(mlb), _resolve_regioes(regiao), Camada.RAW)
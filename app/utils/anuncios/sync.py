@@ -0,0 +1,181 @@
+# app/utils/anuncios/sync.py
+"""
+Refresh incremental de anúncios ML (RAW + PP) por detecção de mudança.
+
+1) sonda barata: /items?ids= com projeção PROBE_ATTRIBUTES para todos os MLBs;
+2) plan_refresh compara a sonda com o RAW anterior (last_updated, preço,
+   estoque, status) → novos / alterados / inalterados / removidos / falhos;
+3) só novos + alterados são baixados com a projeção completa do RAW;
+4) patch_items / patch_pp aplicam o resultado no RAW e no PP existentes.
+
+Só itens que sumiram da listagem do seller (scan de /users/{id}/items/search)
+recebem tombstone ("_removed_at") no RAW e saem do PP; falha na sonda ou no
+download (timeout, 429, 5xx, code != 200) deixa o registro anterior intacto.
+Tombstones mais antigos que TOMBSTONE_RETENCAO_DIAS são descartados.
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils.core.filtros import _parse_iso
+from .preprocess import normalizar_item_pp
+
+__all__ = [
+    "PROBE_ATTRIBUTES",
+    "TOMBSTONE_RETENCAO_DIAS",
+    "SYNC_HISTORY_MAX",
+    "is_tombstone",
+    "plan_refresh",
+    "patch_items",
+    "patch_pp",
+    "change_summary",
+]
+
+# campos comparados entre execuções (id sempre vem na projeção)
+PROBE_ATTRIBUTES = ("id", "last_updated", "price", "available_quantity", "status")
+
+TOMBSTONE_RETENCAO_DIAS = 30
+
+# quantos resumos de execução ficam em metadata.sync_history do RAW
+SYNC_HISTORY_MAX = 50
+
+
+def _id(item: Dict[str, Any]) -> str:
+    return str(item.get("id") or "")
+
+
+def is_tombstone(item: Dict[str, Any]) -> bool:
+    return bool(item.get("_removed_at"))
+
+
+def _fingerprint(item: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple(item.get(k) for k in PROBE_ATTRIBUTES[1:])
+
+
+def plan_refresh(
+    previous: Iterable[Dict[str, Any]],
+    probes: Iterable[Dict[str, Any]],
+    listed_ids: Iterable[str],
+) -> Dict[str, List[str]]:
+    """
+    Classifica os MLBs listados no seller (`listed_ids`, o scan) contra a sonda
+    e o RAW anterior. Retorna {"new", "changed", "unchanged", "removed", "failed"}:
+      - new:       sondado e ausente (ou com tombstone) no RAW anterior;
+      - changed:   fingerprint diferente do RAW anterior;
+      - removed:   vivo no RAW anterior e ausente da listagem do seller;
+      - failed:    listado mas sem resposta na sonda — o registro anterior
+                   (se houver) fica como está; nunca vira tombstone.
+    """
+    prev: Dict[str, Dict[str, Any]] = {}
+    for it in previous:
+        k = _id(it)
+        if k:
+            prev[k] = it
+    probed: Dict[str, Dict[str, Any]] = {}
+    for p in probes:
+        k = _id(p)
+        if k and k not in probed:
+            probed[k] = p
+
+    plan: Dict[str, List[str]] = {"new": [], "changed": [], "unchanged": [], "removed": [], "failed": []}
+    listed = set()
+    for k in listed_ids:
+        k = str(k or "")
+        if not k or k in listed:
+            continue
+        listed.add(k)
+        p = probed.get(k)
+        old = prev.get(k)
+        if p is None:
+            plan["failed"].append(k)
+        elif old is None or is_tombstone(old):
+            plan["new"].append(k)
+        elif _fingerprint(old) != _fingerprint(p):
+            plan["changed"].append(k)
+        else:
+            plan["unchanged"].append(k)
+
+    plan["removed"] = [k for k, it in prev.items() if k not in listed and not is_tombstone(it)]
+    return plan
+
+
+def patch_items(
+    previous: Iterable[Dict[str, Any]],
+    fetched: Iterable[Dict[str, Any]],
+    removed: Sequence[str],
+    *,
+    now: Optional[datetime] = None,
+    tombstone_days: int = TOMBSTONE_RETENCAO_DIAS,
+) -> List[Dict[str, Any]]:
+    """
+    Aplica o refresh sobre os itens do RAW anterior, preservando a ordem:
+    itens baixados substituem o anterior (ou entram no fim), removidos
+    ganham tombstone e tombstones vencidos são descartados.
+    """
+    now = now or datetime.now().astimezone()
+    now_iso = now.isoformat(timespec="seconds")
+    cutoff = now - timedelta(days=tombstone_days)
+
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for it in previous:
+        k = _id(it)
+        if k:
+            by_id[k] = it
+    for it in fetched:
+        k = _id(it)
+        if k:
+            by_id[k] = it  # item vivo: sem tombstone
+    for k in removed:
+        old = by_id.get(str(k))
+        if old is not None and not is_tombstone(old):
+            by_id[str(k)] = {**old, "_removed_at": now_iso}
+
+    out: List[Dict[str, Any]] = []
+    for it in by_id.values():
+        if is_tombstone(it):
+            dt = _parse_iso(it["_removed_at"])
+            if dt is not None and dt < cutoff:
+                continue
+        out.append(it)
+    return out
+
+
+def patch_pp(
+    pp_rows: Iterable[Dict[str, Any]],
+    fetched: Iterable[Dict[str, Any]],
+    removed: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """
+    Atualiza a lista PP no lugar: renormaliza só os itens baixados, remove
+    os MLBs com tombstone e anexa os novos. Equivale a regerar o PP do RAW
+    após patch_items (mesmos registros; novos no fim).
+    """
+    fresh: Dict[str, Dict[str, Any]] = {}
+    for it in fetched:
+        k = _id(it)
+        if k:
+            fresh[k] = normalizar_item_pp(it)
+    gone = {str(k) for k in removed}
+
+    out: List[Dict[str, Any]] = []
+    done = set()
+    for rec in pp_rows:
+        k = str(rec.get("mlb") or "")
+        if k in gone or k in done:
+            continue
+        out.append(fresh.get(k, rec))
+        done.add(k)
+    out.extend(rec for k, rec in fresh.items() if k not in done)
+    return out
+
+
+def change_summary(plan: Dict[str, List[str]], *, mode: str, fetched: Optional[int] = None,
+                   at: Optional[str] = None, sample: int = 20) -> Dict[str, Any]:
+    """Resumo da execução (contagens + amostra de ids) para metadata do RAW/PP."""
+    return {
+        "at": at or datetime.now().astimezone().isoformat(timespec="seconds"),
+        "mode": mode,
+        **{k: len(v) for k, v in plan.items()},
+        "fetched": len(plan["new"]) + len(plan["changed"]) if fetched is None else fetched,
+        "ids": {k: v[:sample] for k, v in plan.items() if k != "unchanged" and v},
+    }
@@ -1,15 +1,21 @@
 # app/utils/billing/excel/ingest.py
 from __future__ import annotations
 
+import importlib.util
 import io
+import os
 import re
 import zipfile
 import unicodedata
-from decimal import Decimal
 from pathlib import Path
-from typing import Iterable, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, Sequence
 
 import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+from app.utils.core.excel_cache import frames_em_cache, versao_codigo
+from app.utils.core.parse_br import parse_amount_br, parse_date_br
 
 # Buckets (classificação de conceitos)
 from .conceitos import (
@@ -45,72 +51,44 @@ def _normalize_headers(df: pd.DataFrame) -> pd.DataFrame:
     out.columns = new_cols
     return out
 
-# padrões numéricos
-_DEC_PT = re.compile(r"^\d{1,3}(\.\d{3})*,\d{1,2}$")   # 1.234,56
-_DEC_COMMA = re.compile(r"^\d+,\d{1,2}$")              # 12,34
-_DEC_DOT = re.compile(r"^\d+\.\d{1,2}$")               # 12.34
-_INT = re.compile(r"^\d+$")
-
 def _coerce_amount(series: pd.Series) -> pd.Series:
     """Converte strings monetárias pt-BR/en-US para float. Parênteses = negativo."""
-    def conv(x):
-        if isinstance(x, (int, float, Decimal)):
-            return float(x)
-        if pd.isna(x):
-            return None
-
-        s = str(x).strip()
-        neg = False
-        if s.startswith("(") and s.endswith(")"):
-            neg = True
-            s = s[1:-1]
-
-        # remove símbolo e NBSP; preserva pontos internos
-        s = s.replace("R$", "").replace("\u00A0", " ").strip()
-        s_no_sp = s.replace(" ", "")
-
-        if _DEC_PT.match(s_no_sp):          # 1.234,56
-            s_norm = s_no_sp.replace(".", "").replace(",", ".")
-        elif _DEC_COMMA.match(s_no_sp):     # 12,34
-            s_norm = s_no_sp.replace(",", ".")
-        elif _DEC_DOT.match(s_no_sp):       # 12.34
-            s_norm = s_no_sp
-        elif _INT.match(s_no_sp):           # 1234
-            s_norm = s_no_sp
-        else:
-            # fallback: troca vírgula por ponto e mantém pontos decimais legítimos
-            s_norm = s_no_sp.replace(",", ".")
-
-        try:
-            v = float(s_norm)
-            return -v if neg else v
-        except Exception:
-            return None
-    return series.apply(conv)
+    return parse_amount_br(series)
 
 def _parse_date(series: pd.Series) -> pd.Series:
-    try:
-        return pd.to_datetime(series, errors="coerce", dayfirst=True)
-    except Exception:
-        return pd.to_datetime(series, errors="coerce")
+    return parse_date_br(series)
 
 # =================================================
 # 2) Leitura de fontes: .xlsx e .zip com .xlsx dentro
 # =================================================
 
-def _iter_excel_sources(dir_excel: Path) -> Iterable[Tuple[str, bytes]]:
-    """Itera sobre .xlsx e .zip contendo .xlsx, retornando (nome, bytes)."""
+def _iter_excel_origens(
+    dir_excel: Path, aceitar: Optional[Callable[[str], bool]] = None
+) -> Iterable[Tuple[str, Path, Optional[str]]]:
+    """
+    Itera sobre .xlsx e .zip contendo .xlsx, retornando (nome, arquivo no disco,
+    membro do .zip ou None) sem ler nada: os bytes ficam para _ler_bytes, que o
+    cache de ingest evita. `aceitar(nome)` filtra antes (None = todos).
+    """
     if not dir_excel.exists():
         return
     # XLSX diretos
     for p in sorted(dir_excel.glob("*.xlsx")):
-        yield (p.name, p.read_bytes())
+        if aceitar is None or aceitar(p.name):
+            yield (p.name, p, None)
     # ZIPs com XLSX
     for z in sorted(dir_excel.glob("*.zip")):
         with zipfile.ZipFile(z, "r") as zf:
-            for name in zf.namelist():
-                if name.lower().endswith(".xlsx"):
-                    yield (Path(name).name, zf.read(name))
+            nomes = zf.namelist()
+        for name in nomes:
+            if name.lower().endswith(".xlsx") and (aceitar is None or aceitar(Path(name).name)):
+                yield (Path(name).name, z, name)
+
+def _ler_bytes(origem: Path, membro: Optional[str]) -> bytes:
+    if membro is None:
+        return origem.read_bytes()
+    with zipfile.ZipFile(origem, "r") as zf:
+        return zf.read(membro)
 
 # ==========================================================
 # 3) Header dinâmico por aba (detecta linha com tokens-chave)
@@ -131,14 +109,16 @@ def _looks_like_header_row(row_vals: List[str], tokens: List[str]) -> bool:
     hits = sum(1 for t in tokens if t in joined)
     return hits >= 2  # pelo menos 2 tokens na linha
 
-def _detect_header_row(xls: pd.ExcelFile, sheet: str, tokens: List[str], probe_rows: int = 50) -> Optional[int]:
-    tmp = xls.parse(sheet_name=sheet, header=None, nrows=probe_rows)
-    for i, row in tmp.iterrows():
-        vals = [row.get(j, "") for j in range(len(row))]
+def _header_na_amostra(tmp: pd.DataFrame, tokens: List[str]) -> Optional[int]:
+    for i, vals in enumerate(tmp.to_numpy(dtype=object).tolist()):
         if _looks_like_header_row(vals, tokens):
-            return int(i)
+            return i
     return None
 
+def _detect_header_row(xls: pd.ExcelFile, sheet: str, tokens: List[str], probe_rows: int = 50) -> Optional[int]:
+    tmp = xls.parse(sheet_name=sheet, header=None, nrows=probe_rows)
+    return _header_na_amostra(tmp, tokens)
+
 def _read_sheet_dynamic_header(xls: pd.ExcelFile, sheet: str, tokens: List[str]) -> pd.DataFrame:
     row = _detect_header_row(xls, sheet, tokens)
     if row is None:
@@ -148,20 +128,51 @@ def _read_sheet_dynamic_header(xls: pd.ExcelFile, sheet: str, tokens: List[str])
     df["__sheet__"] = sheet
     return df
 
-def _read_workbook_filtered_sheets(file_bytes: bytes, allowed_sheets: set[str], tokens: List[str]) -> pd.DataFrame:
-    xls = pd.ExcelFile(io.BytesIO(file_bytes))
-    frames = []
-    for sh in xls.sheet_names:
-        sh_norm = _norm_text(sh)
-        if sh_norm not in allowed_sheets:
-            continue
+def _read_sheet_uma_passada(xls: pd.ExcelFile, sheet: str, tokens: List[str], probe_rows: int = 50) -> pd.DataFrame:
+    """
+    Mesmo resultado de _read_sheet_dynamic_header, decodificando a aba uma vez:
+    as linhas cruas do reader do pandas servem para achar o header (nas
+    primeiras `probe_rows`) e para montar o DF, sem o segundo parse do XML.
+    """
+    reader = xls._reader
+    data = reader.get_sheet_data(reader.get_sheet_by_name(sheet), None)
+    if not data:
+        df = pd.DataFrame()
+    else:
+        amostra = TextParser([list(r) for r in data[:probe_rows]], header=None, skip_blank_lines=False).read()
+        row = _header_na_amostra(amostra, tokens)
+        try:
+            df = TextParser(data, header=row if row is not None else 0, skip_blank_lines=False).read()
+        except EmptyDataError:
+            df = pd.DataFrame()
+    df["__sheet__"] = sheet
+    return df
+
+def _ler_aba(xls: pd.ExcelFile, sheet: str, tokens: List[str]) -> pd.DataFrame:
+    if _modo_leitura() != "legado":
         try:
-            df = _read_sheet_dynamic_header(xls, sh, tokens)
-            frames.append(df)
+            return _read_sheet_uma_passada(xls, sheet, tokens)
         except Exception:
-            continue
-    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
-    return out
+            pass  # API interna do pandas mudou / aba atípica: caminho de duas leituras
+    return _read_sheet_dynamic_header(xls, sheet, tokens)
+
+def _modo_leitura() -> str:
+    """DATAHIVE_EXCEL_ENGINE: auto (padrão) | calamine | openpyxl | legado (duas leituras por aba)."""
+    return (os.getenv("DATAHIVE_EXCEL_ENGINE") or "auto").strip().lower()
+
+def _motor() -> str:
+    """calamine (Rust) quando instalado e não desligado; senão o openpyxl padrão do pandas."""
+    if _modo_leitura() in ("auto", "calamine") and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+def _abrir_workbook(data: bytes) -> pd.ExcelFile:
+    if _motor() == "calamine":
+        try:
+            return pd.ExcelFile(io.BytesIO(data), engine="calamine")
+        except Exception:
+            pass
+    return pd.ExcelFile(io.BytesIO(data))
 
 # ==========================================
 # 4) Abas “oficiais” por relatório (normalizadas)
@@ -233,16 +244,106 @@ def _dedup_by_id(df: pd.DataFrame) -> pd.DataFrame:
         return df.drop_duplicates(subset=["__id__"], keep="last")
     return df
 
+# ==================================================================
+# 6) Varredura única: cada workbook é aberto uma vez e as abas vão
+#    para o(s) relatório(s) a que pertencem (pelo nome do arquivo)
+# ==================================================================
+
+FONTES = ("mp", "ml", "full", "pay")
+
+_FONTE_ARQUIVO: Dict[str, Callable[[str], bool]] = {
+    "mp": lambda n: bool(re.search(r"faturamento[_\s-]*mercado\s*pago", n.lower())),
+    "ml": lambda n: bool(re.search(r"faturamento[_\s-]*mercado\s*livre", n.lower())),
+    "full": lambda n: "tarifas_full" in n.lower(),
+    "pay": lambda n: "pagamento_faturas" in n.lower(),
+}
+
+_FONTE_ABAS: Dict[str, set[str]] = {
+    "mp": SHEETS_MP,
+    "ml": SHEETS_ML,
+    "full": SHEETS_FULL,
+    "pay": SHEETS_PAY,
+}
+
+# fonte → [(arquivo, abas do workbook concatenadas)], na ordem de leitura
+Varredura = Dict[str, List[Tuple[str, pd.DataFrame]]]
+
+
+def classificar_arquivo(name: str, fontes: Sequence[str] = FONTES) -> List[str]:
+    """Relatórios a que o arquivo pertence (pelo nome), na ordem de `fontes`."""
+    return [f for f in fontes if _FONTE_ARQUIVO[f](name)]
+
+
+def _ler_workbook(name: str, origem: Path, membro: Optional[str]) -> Dict[str, pd.DataFrame]:
+    """Abas do workbook que interessam a qualquer relatório do arquivo (aba → DF cru)."""
+    alvo = classificar_arquivo(name)
+    xls = _abrir_workbook(_ler_bytes(origem, membro))
+    abas: Dict[str, pd.DataFrame] = {}
+    for sh in xls.sheet_names:
+        sh_norm = _norm_text(sh)
+        if not any(sh_norm in _FONTE_ABAS[f] for f in alvo):
+            continue
+        try:
+            abas[sh] = _ler_aba(xls, sh, _BASE_TOKENS)
+        except Exception:
+            continue
+    return abas
+
+
+def _abas_em_cache(name: str, origem: Path, membro: Optional[str]) -> Dict[str, pd.DataFrame]:
+    # cache sidecar ao lado do .xlsx/.zip (chave = conteúdo + versão deste
+    # ingestor); para membro de .zip o hit nem descompacta
+    etapa = "billing" if membro is None else f"billing_{Path(membro).stem}"
+    versao = versao_codigo(__name__, "app.utils.core.parse_br")
+    return frames_em_cache(
+        origem, etapa, versao, lambda: _ler_workbook(name, origem, membro),
+        membro=membro, motor=_motor(), legado=_modo_leitura() == "legado",
+    )
+
+
+def escanear_excel(dir_excel: Path, fontes: Sequence[str] = FONTES) -> Varredura:
+    """
+    Lê cada .xlsx (solto ou dentro de .zip) uma única vez: só arquivos de algum
+    relatório pedido são lidos/descompactados, e cada aba relevante é decodificada
+    uma vez e entregue a todas as fontes que a usam. As abas lidas ficam no cache
+    de ingest (app.utils.core.excel_cache), então arquivos já vistos não são
+    reabertos. Os frames são compartilhados entre fontes: os carregadores não
+    devem alterá-los.
+    """
+    out: Varredura = {f: [] for f in fontes}
+    for name, origem, membro in _iter_excel_origens(dir_excel, aceitar=lambda n: bool(classificar_arquivo(n, fontes))):
+        alvo = classificar_arquivo(name, fontes)
+        abas = _abas_em_cache(name, origem, membro)
+        for f in alvo:
+            frames = [df for sh, df in abas.items() if _norm_text(sh) in _FONTE_ABAS[f]]
+            out[f].append((name, pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()))
+    return out
+
+
+def _workbooks(dir_excel: Path, fonte: str, scan: Optional[Varredura]) -> List[Tuple[str, pd.DataFrame]]:
+    if scan is None:
+        scan = escanear_excel(dir_excel, (fonte,))
+    return scan.get(fonte, [])
+
+
+def carregar_todos(dir_excel: Path) -> Dict[str, pd.DataFrame]:
+    """Os quatro relatórios da pasta com uma única varredura: {"mp","ml","full","pay"} → DF."""
+    scan = escanear_excel(dir_excel)
+    return {
+        "mp": carregar_faturamento_mp(dir_excel, scan=scan),
+        "ml": carregar_faturamento_ml(dir_excel, scan=scan),
+        "full": carregar_tarifas_full(dir_excel, scan=scan),
+        "pay": carregar_pagamento_faturas(dir_excel, scan=scan),
+    }
+
 # =========================================
-# 6) Carregadores por relatório (retornam DF)
+# 7) Carregadores por relatório (retornam DF)
+#    scan=None → varre só os arquivos do relatório
 # =========================================
 
-def carregar_faturamento_mp(dir_excel: Path) -> pd.DataFrame:
+def carregar_faturamento_mp(dir_excel: Path, *, scan: Optional[Varredura] = None) -> pd.DataFrame:
     frames = []
-    for name, data in _iter_excel_sources(dir_excel):
-        if not re.search(r"faturamento[_\s-]*mercado\s*pago", name.lower()):
-            continue
-        raw = _read_workbook_filtered_sheets(data, SHEETS_MP, _BASE_TOKENS)
+    for name, raw in _workbooks(dir_excel, "mp", scan):
         if raw.empty:
             continue
         df = _normalize_headers(raw)
@@ -273,12 +374,9 @@ def carregar_faturamento_mp(dir_excel: Path) -> pd.DataFrame:
     return _dedup_by_id(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame(columns=["__id__","__data__","__conceito__","__valor__","__categoria__","__src__"])
 
 
-def carregar_faturamento_ml(dir_excel: Path) -> pd.DataFrame:
+def carregar_faturamento_ml(dir_excel: Path, *, scan: Optional[Varredura] = None) -> pd.DataFrame:
     frames = []
-    for name, data in _iter_excel_sources(dir_excel):
-        if not re.search(r"faturamento[_\s-]*mercado\s*livre", name.lower()):
-            continue
-        raw = _read_workbook_filtered_sheets(data, SHEETS_ML, _BASE_TOKENS)
+    for name, raw in _workbooks(dir_excel, "ml", scan):
         if raw.empty:
             continue
         df = _normalize_headers(raw)
@@ -343,12 +441,9 @@ def carregar_faturamento_ml(dir_excel: Path) -> pd.DataFrame:
     return _dedup_by_id(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame(columns=["__id__","__data__","__conceito__","__valor__","__categoria__","__src__"])
 
 
-def carregar_tarifas_full(dir_excel: Path) -> pd.DataFrame:
+def carregar_tarifas_full(dir_excel: Path, *, scan: Optional[Varredura] = None) -> pd.DataFrame:
     frames = []
-    for name, data in _iter_excel_sources(dir_excel):
-        if "tarifas_full" not in name.lower():
-            continue
-        raw = _read_workbook_filtered_sheets(data, SHEETS_FULL, _BASE_TOKENS)
+    for name, raw in _workbooks(dir_excel, "full", scan):
         if raw.empty:
             continue
         df = _normalize_headers(raw)
@@ -373,12 +468,9 @@ def carregar_tarifas_full(dir_excel: Path) -> pd.DataFrame:
 
 # (moved to top with other imports)
 
-def carregar_pagamento_faturas(dir_excel: Path) -> pd.DataFrame:
+def carregar_pagamento_faturas(dir_excel: Path, *, scan: Optional[Varredura] = None) -> pd.DataFrame:
     frames = []
-    for name, data in _iter_excel_sources(dir_excel):
-        if "pagamento_faturas" not in name.lower():
-            continue
-        raw = _read_workbook_filtered_sheets(data, SHEETS_PAY, _BASE_TOKENS)
+    for name, raw in _workbooks(dir_excel, "pay", scan):
         if raw.empty:
             continue
         df = _normalize_headers(raw)
@@ -6,12 +6,7 @@ import calendar
 import pandas as pd
 
 from app.utils.billing.config import excel_dir
-from app.utils.billing.excel.ingest import (
-    carregar_faturamento_mp,
-    carregar_faturamento_ml,
-    carregar_tarifas_full,
-    carregar_pagamento_faturas,
-)
+from app.utils.billing.excel.ingest import carregar_todos
 from app.utils.billing.excel.conceitos import categorias_fatura_ml
 
 # ----------------------
@@ -115,10 +110,8 @@ def consolidar_excel(*, market: str, ano: int, mes: int, regioes: Iterable[str])
 
     for reg in regioes:
         d = excel_dir(market, ano, mes, reg)
-        mp = carregar_faturamento_mp(d)
-        ml = carregar_faturamento_ml(d)
-        fu = carregar_tarifas_full(d)
-        pay = carregar_pagamento_faturas(d)
+        fontes = carregar_todos(d)  # uma leitura por workbook para os 4 relatórios
+        mp, ml, fu, pay = fontes["mp"], fontes["ml"], fontes["full"], fontes["pay"]
 
         if not mp.empty:
             g = mp.groupby("__categoria__", dropna=False)["__valor__"].sum()
@@ -183,10 +176,8 @@ def consolidar_fatura_totais(
     regioes_processadas: list[str] = []
     for reg in regioes:
         d = excel_dir(market, ano, mes, reg)
-        mp = carregar_faturamento_mp(d)
-        ml = carregar_faturamento_ml(d)
-        fu = carregar_tarifas_full(d)
-        pay = carregar_pagamento_faturas(d)
+        fontes = carregar_todos(d)  # uma leitura por workbook para os 4 relatórios
+        mp, ml, fu, pay = fontes["mp"], fontes["ml"], fontes["full"], fontes["pay"]
 
         has_data = False
         if not mp.empty:
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import hashlib
-import zipfile
+import logging
 from pathlib import Path
 from typing import Dict, Any, Iterable, List, Set
 
+from app.utils.core.xml_lotes import Lote, listar_lotes, ler_lote, mapear_lotes
+
 from .parser_xml import parse_xml_nfe, parse_xml_nfse
 
+log = logging.getLogger(__name__)
+
 def _dedup(notas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     seen: Set[str] = set()
     out: List[Dict[str, Any]] = []
@@ -18,26 +22,41 @@ def _dedup(notas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
         out.append(n)
     return out
 
-def carregar_zip_dir(*, dir_raw: Path, regiao: str, market: str, incluir_modelos: Set[str] | None = None) -> List[Dict[str, Any]]:
+def _parse_lote(lote: Lote, *, regiao: str, market: str, incluir_modelos: Set[str]) -> List[Dict[str, Any]]:
+    # roda no worker: lê e parseia um lote de membros de um .zip
+    notas: List[Dict[str, Any]] = []
+    zip_name = Path(lote[0]).name
+    for data, name, erro in ler_lote(lote):
+        origem = f"{zip_name}::{name}"
+        if data is None:
+            # membro ilegível (CRC inválido, ZIP truncado): pula só ele
+            log.warning("Falha lendo XML %s: %s", origem, erro)
+            continue
+        # simples heurística: NF-e costuma ter <NFe ...>
+        if b"<NFe" in data[:2000] and "NFe" in incluir_modelos:
+            n = parse_xml_nfe(data, regiao=regiao, market=market, origem_arquivo=origem)
+        elif "NFSe" in incluir_modelos:
+            n = parse_xml_nfse(data, regiao=regiao, market=market, origem_arquivo=origem)
+        else:
+            continue
+        notas.append(n)
+    return notas
+
+def carregar_zip_dir(
+    *, dir_raw: Path, regiao: str, market: str, incluir_modelos: Set[str] | None = None,
+    workers: int = 1, lote: int = 500,
+) -> List[Dict[str, Any]]:
     """
     Lê todos os .zip em dir_raw, percorre XMLs e aplica parser.
+    workers > 1: lotes de `lote` XMLs parseados num pool de processos, juntados
+    na ordem de leitura (mesmo resultado do serial).
     """
     if incluir_modelos is None:
         incluir_modelos = {"NFe", "NFSe"}
 
+    lotes = listar_lotes(sorted(dir_raw.glob("*.zip")), tamanho=lote, pular_corrompidos=False)
     notas: List[Dict[str, Any]] = []
-    for zip_path in sorted(dir_raw.glob("*.zip")):
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            for name in zf.namelist():
-                if not name.lower().endswith(".xml"):
-                    continue
-                data = zf.read(name)
-                # simples heurística: NF-e costuma ter <NFe ...>
-                if b"<NFe" in data[:2000] and "NFe" in incluir_modelos:
-                    n = parse_xml_nfe(data, regiao=regiao, market=market, origem_arquivo=f"{zip_path.name}::{name}")
-                elif "NFSe" in incluir_modelos:
-                    n = parse_xml_nfse(data, regiao=regiao, market=market, origem_arquivo=f"{zip_path.name}::{name}")
-                else:
-                    continue
-                notas.append(n)
+    for parte in mapear_lotes(_parse_lote, lotes, workers=workers,
+                              regiao=regiao, market=market, incluir_modelos=set(incluir_modelos)):
+        notas.extend(parte)
     return _dedup(notas)
@@ -5,6 +5,8 @@ from datetime import datetime, timezone
 from typing import Dict, Any
 from xml.etree import ElementTree as ET
 
+from app.utils.core.nfe_xml import caminhos_nfe, localizar_nfe
+
 def _text(el, path, default=None):
     x = el.find(path)
     return (x.text.strip() if x is not None and x.text is not None else default)
@@ -27,59 +29,63 @@ def parse_xml_nfe(xml_bytes: bytes, *, regiao: str, market: str, origem_arquivo:
     """
     try:
         root = ET.fromstring(xml_bytes)
-        infNFe = root.find(".//infNFe")
-        ide = root.find(".//ide")
-        emit = root.find(".//emit")
-        dest = root.find(".//dest")
-        total = root.find(".//total/ICMSTot")
-        dets = root.findall(".//det")
+        _, infNFe = localizar_nfe(root)
+        if infNFe is None:
+            raise ValueError("infNFe não encontrada")
+        # namespace do documento resolvido uma vez (ver core/nfe_xml)
+        c = caminhos_nfe(infNFe)
+        ide = infNFe.find(c[".//{*}ide"])
+        emit = infNFe.find(c[".//{*}emit"])
+        dest = infNFe.find(c[".//{*}dest"])
+        total = infNFe.find(c[".//{*}total/{*}ICMSTot"])
+        dets = infNFe.findall(c[".//{*}det"])
 
         chave = infNFe.attrib.get("Id", "").replace("NFe", "") if infNFe is not None else None
-        numero = _text(ide, "nNF", "")
-        serie = _text(ide, "serie", "")
-        dhEmi = _text(ide, "dhEmi", "") or _text(ide, "dEmi", "")
+        numero = _text(ide, c["{*}nNF"], "")
+        serie = _text(ide, c["{*}serie"], "")
+        dhEmi = _text(ide, c["{*}dhEmi"], "") or _text(ide, c["{*}dEmi"], "")
         dt = _parse_datetime(dhEmi) if dhEmi else datetime.now(timezone.utc)
 
-        emit_doc = _text(emit, "CNPJ") or _text(emit, "CPF")
-        dest_doc = _text(dest, "CNPJ") or _text(dest, "CPF")
+        emit_doc = _text(emit, c["{*}CNPJ"]) or _text(emit, c["{*}CPF"])
+        dest_doc = _text(dest, c["{*}CNPJ"]) or _text(dest, c["{*}CPF"])
 
-        natureza = _text(ide, "natOp", "") or ""
+        natureza = _text(ide, c["{*}natOp"], "") or ""
         cfops = []
         itens = []
         for det in dets:
-            prod = det.find("prod")
-            det.find("imposto")
-            cfop = _text(prod, "CFOP", "")
+            prod = det.find(c["{*}prod"])
+            det.find(c["{*}imposto"])
+            cfop = _text(prod, c["{*}CFOP"], "")
             if cfop:
                 cfops.append(cfop)
             item = {
-                "sku": _text(prod, "cProd", None),
-                "gtin": _text(prod, "cEAN", None) or _text(prod, "cEANTrib", None),
-                "descricao": _text(prod, "xProd", "") or "",
-                "ncm": _text(prod, "NCM", None),
+                "sku": _text(prod, c["{*}cProd"], None),
+                "gtin": _text(prod, c["{*}cEAN"], None) or _text(prod, c["{*}cEANTrib"], None),
+                "descricao": _text(prod, c["{*}xProd"], "") or "",
+                "ncm": _text(prod, c["{*}NCM"], None),
                 "cfop": cfop,
                 "cst_icms": None,
                 "cst_pis": None,
                 "cst_cofins": None,
-                "quantidade": float(_text(prod, "qCom", "0") or 0),
-                "valor_unitario": float(_text(prod, "vUnCom", "0") or 0),
-                "valor_total": float(_text(prod, "vProd", "0") or 0),
-                "desconto": float(_text(prod, "vDesc", "0") or 0),
+                "quantidade": float(_text(prod, c["{*}qCom"], "0") or 0),
+                "valor_unitario": float(_text(prod, c["{*}vUnCom"], "0") or 0),
+                "valor_total": float(_text(prod, c["{*}vProd"], "0") or 0),
+                "desconto": float(_text(prod, c["{*}vDesc"], "0") or 0),
                 "aliquotas": {},
             }
             itens.append(item)
 
         totais = {
-            "valor_produtos": float(_text(total, "vProd", "0") or 0),
-            "descontos": float(_text(total, "vDesc", "0") or 0),
-            "frete": float(_text(total, "vFrete", "0") or 0),
-            "outras_despesas": float(_text(total, "vOutro", "0") or 0),
-            "base_icms": float(_text(total, "vBC", "0") or 0),
-            "icms": float(_text(total, "vICMS", "0") or 0),
-            "ipi": float(_text(total, "vIPI", "0") or 0),
-            "pis": float(_text(total, "vPIS", "0") or 0),
-            "cofins": float(_text(total, "vCOFINS", "0") or 0),
-            "valor_total_nfe": float(_text(total, "vNF", "0") or 0),
+            "valor_produtos": float(_text(total, c["{*}vProd"], "0") or 0),
+            "descontos": float(_text(total, c["{*}vDesc"], "0") or 0),
+            "frete": float(_text(total, c["{*}vFrete"], "0") or 0),
+            "outras_despesas": float(_text(total, c["{*}vOutro"], "0") or 0),
+            "base_icms": float(_text(total, c["{*}vBC"], "0") or 0),
+            "icms": float(_text(total, c["{*}vICMS"], "0") or 0),
+            "ipi": float(_text(total, c["{*}vIPI"], "0") or 0),
+            "pis": float(_text(total, c["{*}vPIS"], "0") or 0),
+            "cofins": float(_text(total, c["{*}vCOFINS"], "0") or 0),
+            "valor_total_nfe": float(_text(total, c["{*}vNF"], "0") or 0),
         }
 
         nota = {
@@ -92,17 +98,17 @@ def parse_xml_nfe(xml_bytes: bytes, *, regiao: str, market: str, origem_arquivo:
             "mes_competencia": _mk_mes_comp(dt),
             "emitente": {
                 "documento": emit_doc,
-                "razao_social": _text(emit, "xNome", ""),
-                "uf": _text(emit, "enderEmit/UF", ""),
-                "municipio": _text(emit, "enderEmit/xMun", ""),
-                "inscricao_estadual": _text(emit, "IE", None),
+                "razao_social": _text(emit, c["{*}xNome"], ""),
+                "uf": _text(emit, c["{*}enderEmit/{*}UF"], ""),
+                "municipio": _text(emit, c["{*}enderEmit/{*}xMun"], ""),
+                "inscricao_estadual": _text(emit, c["{*}IE"], None),
             },
             "destinatario": {
                 "documento": dest_doc,
-                "razao_social": _text(dest, "xNome", ""),
-                "uf": _text(dest, "enderDest/UF", ""),
-                "municipio": _text(dest, "enderDest/xMun", ""),
-                "inscricao_estadual": _text(dest, "IE", None),
+                "razao_social": _text(dest, c["{*}xNome"], ""),
+                "uf": _text(dest, c["{*}enderDest/{*}UF"], ""),
+                "municipio": _text(dest, c["{*}enderDest/{*}xMun"], ""),
+                "inscricao_estadual": _text(dest, c["{*}IE"], None),
             },
             "natureza_operacao": natureza,
             "cfops": sorted(set(cfops)),
@@ -4,22 +4,19 @@ from typing import Dict, Any, Iterable, List
 import pandas as pd
 
 from ..config import excel_dir
-from ..excel.ingest import (
-    carregar_faturamento_mp, carregar_faturamento_ml,
-    carregar_tarifas_full, carregar_pagamento_faturas,
-)
+from ..excel.ingest import carregar_todos
 from ..excel.conceitos import categorias_fatura_ml
 
 # === já existiam ===
 from .aggregator import carregar_zip_dir
 from ..config import billing_zip_raw_dir
 
-def carregar_e_normalizar(*, market: str, ano: int, mes: int, regioes: Iterable[str]) -> List[Dict[str, Any]]:
-    # (mantido para XML) ...
+def carregar_e_normalizar(*, market: str, ano: int, mes: int, regioes: Iterable[str], workers: int = 1) -> List[Dict[str, Any]]:
+    # (mantido para XML) ... workers > 1: parse dos XMLs em pool de processos
     all_notas: List[Dict[str, Any]] = []
     for regiao in regioes:
         dir_raw = billing_zip_raw_dir(market, ano, mes, regiao)
-        notas = carregar_zip_dir(dir_raw=dir_raw, regiao=regiao, market=market)
+        notas = carregar_zip_dir(dir_raw=dir_raw, regiao=regiao, market=market, workers=workers)
         all_notas.extend(notas)
     by_id = {}
     for n in all_notas:
@@ -43,10 +40,8 @@ def consolidar_excel(*, market: str, ano: int, mes: int, regioes: Iterable[str])
     for reg in regioes:
         d = excel_dir(market, ano, mes, reg)
 
-        mp = carregar_faturamento_mp(d)
-        ml = carregar_faturamento_ml(d)
-        fu = carregar_tarifas_full(d)
-        pay = carregar_pagamento_faturas(d)
+        fontes = carregar_todos(d)  # uma leitura por workbook para os 4 relatórios
+        mp, ml, fu, pay = fontes["mp"], fontes["ml"], fontes["full"], fontes["pay"]
 
         if not mp.empty:
             g = mp.groupby("__categoria__", dropna=False)["__valor__"].sum()
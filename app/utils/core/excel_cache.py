@@ -0,0 +1,409 @@
+# app/utils/core/excel_cache.py
+"""
+Cache de planilhas já lidas (sidecar): o DataFrame normalizado de um Excel/ZIP
+de entrada fica numa pasta `.ingest_cache/` ao lado do arquivo de origem, e as
+próximas execuções (scripts ou recomputes do dashboard) pulam o parse do Excel.
+
+Chave = sha256 do conteúdo do arquivo de origem + etapa (qual leitura/aba) +
+versão do ingestor (código-fonte dos módulos que produzem o DF, versão do
+pandas) + parâmetros da leitura. Os relatórios mensais não mudam depois de
+baixados; se mudarem, o hash muda e a entrada antiga vira órfã (ver `limpar_cache`).
+
+Formato: Feather (pyarrow) quando instalado e todas as colunas são tipadas;
+senão pickle assinado (mesma fidelidade de dtypes, sem dependência extra).
+As pastas de dados são compartilhadas, então o pickle leva um HMAC-SHA256 com
+uma chave local da máquina (DATAHIVE_INGEST_CACHE_KEY ou o arquivo
+~/.datahive/ingest_cache.key, criado com permissão 0600 no 1º uso) e só é
+desserializado se a assinatura bater — arquivo adulterado ou de outra máquina
+conta como ausente. Sem chave disponível, o fallback pickle fica desligado.
+
+O cache é só acelerador: qualquer erro de leitura/gravação cai no caminho
+normal, e DATAHIVE_INGEST_CACHE=0 desliga tudo.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import importlib.util
+import json
+import os
+import pickle
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+__all__ = [
+    "PASTA_CACHE",
+    "VERSAO_FORMATO",
+    "cache_ativo",
+    "hash_arquivo",
+    "versao_codigo",
+    "frames_em_cache",
+    "frame_em_cache",
+    "listar_cache",
+    "limpar_cache",
+]
+
+VERSAO_FORMATO = 2
+PASTA_CACHE = ".ingest_cache"
+_INDICE = "_indice.json"
+_MAGICO = b"DHIC2"  # cabeçalho do pickle assinado: mágico + HMAC (32 bytes) + payload
+
+Frames = Dict[str, pd.DataFrame]
+
+_HASHES: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_VERSOES: Dict[Tuple[str, ...], str] = {}
+_CHAVE_HMAC: List[Optional[bytes]] = []  # memo: [] = ainda não resolvida
+_LOCK = threading.Lock()
+
+
+def cache_ativo() -> bool:
+    return (os.getenv("DATAHIVE_INGEST_CACHE") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _file_sig(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def hash_arquivo(path: Union[str, Path]) -> str:
+    """sha256 (hex) do conteúdo; memoizado por (mtime_ns, tamanho) no processo."""
+    p = Path(path)
+    sig = _file_sig(p)
+    chave = str(p.resolve())
+    with _LOCK:
+        hit = _HASHES.get(chave)
+    if hit is not None and sig is not None and hit[0] == sig:
+        return hit[1]
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    dig = h.hexdigest()
+    if sig is not None:
+        with _LOCK:
+            _HASHES[chave] = (sig, dig)
+    return dig
+
+
+def versao_codigo(*modulos: str) -> str:
+    """
+    Versão do ingestor: sha256 do código-fonte dos módulos (nomes importáveis)
+    + versão do pandas. Muda com qualquer edição do parser, não com o mtime.
+    """
+    chave = tuple(modulos)
+    with _LOCK:
+        hit = _VERSOES.get(chave)
+    if hit is not None:
+        return hit
+    h = hashlib.sha256(f"{VERSAO_FORMATO}|pandas={pd.__version__}".encode("utf-8"))
+    for nome in modulos:
+        spec = importlib.util.find_spec(nome)
+        origem = getattr(spec, "origin", None) if spec else None
+        h.update(nome.encode("utf-8"))
+        if origem and os.path.isfile(origem):
+            with open(origem, "rb") as f:
+                h.update(f.read())
+    dig = h.hexdigest()[:16]
+    with _LOCK:
+        _VERSOES[chave] = dig
+    return dig
+
+
+# ------------------------------------------------------------
+# armazenamento
+# ------------------------------------------------------------
+
+def _chave_hmac() -> Optional[bytes]:
+    """Chave local da assinatura do pickle; None => fallback pickle desligado."""
+    with _LOCK:
+        if _CHAVE_HMAC:
+            return _CHAVE_HMAC[0]
+    env = (os.getenv("DATAHIVE_INGEST_CACHE_KEY") or "").strip()
+    chave: Optional[bytes] = env.encode("utf-8") if env else None
+    if chave is None:
+        arq = Path.home() / ".datahive" / "ingest_cache.key"
+        try:
+            if not arq.exists():
+                arq.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    fd = os.open(arq, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                except FileExistsError:
+                    pass  # outro processo criou antes
+                else:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(secrets.token_bytes(32))
+            lida = arq.read_bytes()
+            chave = lida if len(lida) >= 32 else None
+        except OSError:
+            chave = None
+    with _LOCK:
+        if not _CHAVE_HMAC:
+            _CHAVE_HMAC.append(chave)
+        return _CHAVE_HMAC[0]
+
+
+def _assinatura(chave: bytes, payload: bytes) -> bytes:
+    return hmac.new(chave, payload, hashlib.sha256).digest()
+
+
+def _tem_arrow() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _colunar_ok(df: pd.DataFrame) -> bool:
+    # Feather só quando volta idêntico: nomes str únicos, índice padrão e
+    # colunas object só com texto (planilha crua com str+float vai de pickle)
+    if not df.columns.is_unique or not all(isinstance(c, str) for c in df.columns):
+        return False
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return False
+    for c in df.columns:
+        if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) not in ("string", "empty"):
+            return False
+    return True
+
+
+def _slug(s: str) -> str:
+    # sem pontos: o nome da entrada é <origem>.<etapa>.<params>.<chave>.<ext>
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in s)[:80]
+
+
+def _hash_params(params: Dict[str, Any]) -> str:
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:8]
+
+
+def _base(origem: Path, etapa: str, params: Dict[str, Any], chave: str) -> Path:
+    # o hash dos params no nome separa as variantes de leitura em listar_cache
+    return origem.parent / PASTA_CACHE / f"{origem.name}.{_slug(etapa)}.{_hash_params(params)}.{chave[:20]}"
+
+
+def _ler(base: Path) -> Optional[Frames]:
+    pkl = base.with_name(base.name + ".pkl")
+    if pkl.exists():
+        chave = _chave_hmac()
+        if chave is None:
+            return None
+        try:
+            dados = pkl.read_bytes()
+            n = len(_MAGICO)
+            if dados[:n] != _MAGICO:
+                return None
+            mac, payload = dados[n:n + 32], dados[n + 32:]
+            if not hmac.compare_digest(mac, _assinatura(chave, payload)):
+                return None  # adulterado ou assinado por outra máquina: nunca desserializa
+            obj = pickle.loads(payload)
+        except Exception:
+            return None
+        return obj if isinstance(obj, dict) else None
+    pasta = base.with_name(base.name + ".feather")
+    if pasta.is_dir() and _tem_arrow():
+        try:
+            nomes = json.loads((pasta / _INDICE).read_text(encoding="utf-8"))["abas"]
+            return {n: pd.read_feather(pasta / f"{i}.feather") for i, n in enumerate(nomes)}
+        except Exception:
+            return None
+    return None
+
+
+def _gravar(base: Path, origem: Path, etapa: str, frames: Frames) -> None:
+    pasta_cache = base.parent
+    try:
+        pasta_cache.mkdir(parents=True, exist_ok=True)
+        if _tem_arrow() and frames and all(_colunar_ok(df) for df in frames.values()):
+            _gravar_feather(base.with_name(base.name + ".feather"), origem, etapa, frames)
+            return
+        chave = _chave_hmac()
+        if chave is None:
+            return
+        payload = pickle.dumps(frames, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp = tempfile.mkstemp(prefix=f".{base.name}.", suffix=".tmp", dir=pasta_cache)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_MAGICO)
+                f.write(_assinatura(chave, payload))
+                f.write(payload)
+            os.replace(tmp, base.with_name(base.name + ".pkl"))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    except Exception:
+        return  # best-effort: sem cache, a próxima rodada lê o Excel de novo
+
+
+def _gravar_feather(destino: Path, origem: Path, etapa: str, frames: Frames) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix=f".{destino.name}.", dir=destino.parent))
+    try:
+        for i, df in enumerate(frames.values()):
+            df.to_feather(tmp / f"{i}.feather")
+        (tmp / _INDICE).write_text(json.dumps({"abas": list(frames), "origem": origem.name, "etapa": etapa},
+                                              ensure_ascii=False), encoding="utf-8")
+        if destino.exists():
+            shutil.rmtree(destino, ignore_errors=True)
+        os.replace(tmp, destino)
+    finally:
+        if tmp.exists():
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def frames_em_cache(
+    origem: Union[str, Path, bytes, None],
+    etapa: str,
+    versao: str,
+    construir: Callable[[], Frames],
+    **params: Any,
+) -> Frames:
+    """
+    {nome: DataFrame} de `construir()` com cache ao lado de `origem`. `etapa`
+    identifica a leitura (ex. "billing:report"), `versao` o código que gera os
+    frames (versao_codigo(...)) e `params` os argumentos que mudam o resultado.
+    Origem em bytes/None (upload em memória) não tem onde gravar: só constrói.
+
+    Os frames devolvidos podem ser compartilhados: trate como somente leitura.
+    """
+    if not isinstance(origem, (str, Path)) or not cache_ativo():
+        return construir()
+    p = Path(origem)
+    try:
+        conteudo = hash_arquivo(p)
+    except OSError:
+        return construir()
+    raw = json.dumps({"conteudo": conteudo, "etapa": etapa, "versao": versao, "params": params},
+                     sort_keys=True, default=str)
+    chave = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    base = _base(p, etapa, params, chave)
+
+    hit = _ler(base)
+    if hit is not None:
+        return hit
+    frames = construir()
+    _gravar(base, p, etapa, frames)
+    return frames
+
+
+def frame_em_cache(
+    origem: Union[str, Path, bytes, None],
+    etapa: str,
+    versao: str,
+    construir: Callable[[], pd.DataFrame],
+    **params: Any,
+) -> pd.DataFrame:
+    """frames_em_cache para um único DataFrame."""
+    return frames_em_cache(origem, etapa, versao, lambda: {"": construir()}, **params)[""]
+
+
+# ------------------------------------------------------------
+# inspeção / limpeza (scripts/diagnostics/cache_ingest.py)
+# ------------------------------------------------------------
+
+def _entradas(raiz: Path) -> Iterable[Path]:
+    for pasta in sorted(Path(raiz).rglob(PASTA_CACHE)):
+        if pasta.is_dir():
+            for e in sorted(pasta.iterdir()):
+                if e.name.startswith("."):
+                    continue  # temporário de gravação em andamento
+                if e.suffix in (".pkl", ".feather"):
+                    yield e
+
+
+def _tamanho(e: Path) -> int:
+    if e.is_dir():
+        return sum(f.stat().st_size for f in e.iterdir() if f.is_file())
+    return e.stat().st_size
+
+
+def _partes_nome(e: Path) -> Tuple[str, str, Optional[str], str]:
+    """(origem, etapa, hash dos params, chave); params None = nome do formato 1."""
+    nome = e.name[: -len(e.suffix)]
+    partes = nome.rsplit(".", 3)
+    if len(partes) == 4 and len(partes[2]) == 8 and len(partes[3]) == 20:
+        origem, etapa, params, chave = partes
+        return origem, etapa, params, chave
+    origem, etapa, chave = nome.rsplit(".", 2)
+    return origem, etapa, None, chave
+
+
+def listar_cache(raiz: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    Entradas sob `raiz`: arquivo, origem, etapa, params (hash), formato, bytes,
+    idade (dias), orfa (origem sumiu) e substituida (existe entrada mais nova
+    da mesma origem/etapa/params, i.e. o arquivo mudou ou o ingestor foi
+    atualizado; entradas no nome do formato 1 não são mais lidas e também contam).
+    """
+    agora = time.time()
+    out: List[Dict[str, Any]] = []
+    for e in _entradas(Path(raiz)):
+        try:
+            st = e.stat()
+            tamanho = _tamanho(e)
+            nome_origem, etapa, params, _ = _partes_nome(e)
+        except (OSError, ValueError):
+            continue
+        origem = e.parent.parent / nome_origem
+        out.append({
+            "arquivo": str(e),
+            "origem": str(origem),
+            "etapa": etapa,
+            "params": params,
+            "formato": e.suffix.lstrip("."),
+            "bytes": tamanho,
+            "mtime": st.st_mtime,
+            "idade_dias": round((agora - st.st_mtime) / 86400.0, 1),
+            "orfa": not origem.exists(),
+            "substituida": False,
+        })
+    recente: Dict[Tuple[str, str, Optional[str]], float] = {}
+    for info in out:
+        k = (info["origem"], info["etapa"], info["params"])
+        recente[k] = max(recente.get(k, 0.0), info["mtime"])
+    for info in out:
+        k = (info["origem"], info["etapa"], info["params"])
+        info["substituida"] = info["params"] is None or info["mtime"] < recente[k]
+    return out
+
+
+def limpar_cache(
+    raiz: Union[str, Path],
+    *,
+    orfas: bool = False,
+    dias: Optional[float] = None,
+    dry_run: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Remove entradas sob `raiz`: todas, ou só as órfãs/substituídas (orfas=True)
+    e/ou as mais velhas que `dias`. Retorna as entradas removidas (ou que
+    seriam, com dry_run).
+    """
+    removidas = []
+    for info in listar_cache(raiz):
+        if orfas and not (info["orfa"] or info["substituida"]):
+            continue
+        if dias is not None and info["idade_dias"] < dias:
+            continue
+        if not dry_run:
+            e = Path(info["arquivo"])
+            try:
+                shutil.rmtree(e) if e.is_dir() else e.unlink()
+            except OSError:
+                continue
+        removidas.append(info)
+    if not dry_run:
+        for pasta in sorted(Path(raiz).rglob(PASTA_CACHE)):
+            try:
+                pasta.rmdir()  # só se ficou vazia
+            except OSError:
+                pass
+    return removidas
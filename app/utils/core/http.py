@@ -0,0 +1,313 @@
+# app/utils/core/http.py
+"""
+Transporte HTTP compartilhado pelos clientes de marketplace (MELI, Amazon).
+
+- Session com pool de conexões (keep-alive / reuso de TCP+TLS);
+- retry com backoff exponencial + jitter em 429/5xx e erros de conexão,
+  respeitando Retry-After e x-amzn-RateLimit-Limit; métodos não idempotentes
+  (POST/PATCH) só repetem se o pedido não chegou ao servidor (falha ao conectar
+  ou 429), salvo idempotent=True na chamada;
+- token bucket por endpoint (rate, burst);
+- métricas de latência por endpoint.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+__all__ = ["RetryPolicy", "TokenBucket", "HttpTransport", "check_rate_limit_keys"]
+
+log = logging.getLogger(__name__)
+
+# segmentos com forma de id viram "{id}" na chave do endpoint; versões ("v0") e
+# datas ("2021-03-01") das rotas ficam como estão
+_ID_SEGMENT = re.compile(
+    r"^(?:[A-Z]{3}U?\d{5,}"                                     # MLB123456789, MLBU123456
+    r"|\d{3}-\d{7}-\d{7}"                                       # pedido Amazon
+    r"|B0[0-9A-Z]{8}"                                           # ASIN
+    r"|A(?=[0-9A-Z]*\d)[0-9A-Z]{9,15}"                          # seller/marketplace Amazon
+    r"|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}"    # UUID
+    r"|\d{5,})$"                                                # ids numéricos (pedido, usuário...)
+)
+
+_IDEMPOTENT = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int = 5
+    backoff_base: float = 0.5      # segundos (tentativa 1)
+    backoff_max: float = 60.0
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: U(0, min(max, base * 2^attempt))."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` fichas/s, até `capacity` acumuladas."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self.rate = float(rate)
+
+    def acquire(self) -> float:
+        """Consome 1 ficha, dormindo o necessário. Retorna o tempo esperado (s)."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.rate > 0:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1 or self.rate <= 0:
+                    self._tokens = max(0.0, self._tokens - 1)
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class _EndpointStats:
+    __slots__ = ("count", "errors", "retries", "total_s", "max_s", "throttled_s")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.throttled_s = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "mean_ms": round(1000 * self.total_s / self.count, 1) if self.count else 0.0,
+            "max_ms": round(1000 * self.max_s, 1),
+            "throttled_ms": round(1000 * self.throttled_s, 1),
+        }
+
+
+def _retry_after_seconds(r: requests.Response) -> Optional[float]:
+    v = r.headers.get("Retry-After")
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(v).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def _amzn_rate(r: requests.Response) -> Optional[float]:
+    v = r.headers.get("x-amzn-RateLimit-Limit")
+    try:
+        return float(v) if v else None
+    except ValueError:
+        return None
+
+
+def _connect_failure(e: requests.RequestException) -> bool:
+    """True se a requisição não chegou a ser enviada (DNS, recusa, timeout de conexão)."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    if isinstance(e, requests.Timeout):
+        return False  # ReadTimeout: o servidor pode ter processado
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class HttpTransport:
+    """
+    rate_limits: {endpoint: (rate_por_s, burst)}; a chave "*" vale como padrão
+    para qualquer endpoint sem entrada própria (cada endpoint tem seu bucket).
+    endpoint = rótulo passado na chamada ou "METHOD /path" com ids normalizados.
+    """
+
+    def __init__(
+        self,
+        *,
+        retry: RetryPolicy = RetryPolicy(),
+        rate_limits: Optional[Mapping[str, Tuple[float, float]]] = None,
+        timeout: float = 30,
+        pool_maxsize: int = 16,
+        session: Optional[requests.Session] = None,
+        name: str = "http",
+    ) -> None:
+        self.retry = retry
+        self.timeout = timeout
+        self.name = name
+        self.rate_limits = dict(rate_limits or {})
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    # ---------- buckets / métricas ----------
+
+    @staticmethod
+    def endpoint_key(method: str, url: str) -> str:
+        """"METHOD /path" com os segmentos de id (MLB..., pedidos, ASIN...) trocados por {id}."""
+        path = urlsplit(url).path
+        segs = ["{id}" if _ID_SEGMENT.match(s) else s for s in path.split("/")]
+        return f"{method.upper()} {'/'.join(segs)}"
+
+    def _bucket(self, endpoint: str) -> Optional[TokenBucket]:
+        with self._lock:
+            b = self._buckets.get(endpoint)
+            if b is None:
+                conf = self.rate_limits.get(endpoint) or self.rate_limits.get("*")
+                if conf is None:
+                    return None
+                b = self._buckets[endpoint] = TokenBucket(*conf)
+            return b
+
+    def _learn_rate(self, endpoint: str, rate: float) -> None:
+        """Ajusta (ou cria) o bucket do endpoint com a taxa informada pelo servidor."""
+        with self._lock:
+            b = self._buckets.get(endpoint)
+            if b is None:
+                self._buckets[endpoint] = TokenBucket(rate, max(1.0, rate))
+            elif b.rate != rate:
+                b.set_rate(rate)
+
+    def _stat(self, endpoint: str) -> _EndpointStats:
+        with self._lock:
+            st = self._stats.get(endpoint)
+            if st is None:
+                st = self._stats[endpoint] = _EndpointStats()
+            return st
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas por endpoint: count, errors, retries, mean_ms, max_ms, throttled_ms."""
+        with self._lock:
+            return {k: v.as_dict() for k, v in sorted(self._stats.items())}
+
+    def log_stats(self, level: int = logging.INFO) -> None:
+        for ep, st in self.stats().items():
+            log.log(level, "[%s] %s | %s", self.name, ep, st)
+
+    # ---------- requisição ----------
+
+    def request(self, method: str, url: str, *, endpoint: Optional[str] = None,
+                idempotent: Optional[bool] = None, **kwargs: Any) -> requests.Response:
+        """
+        Executa a requisição com rate limit + retry. Não levanta por status:
+        devolve a última resposta (o chamador decide raise_for_status / 401).
+        idempotent: padrão pelo método (GET/PUT/DELETE... sim; POST/PATCH não).
+        Não idempotente só repete em falha de conexão e 429 — timeout de leitura
+        e 5xx podem ter sido processados e repetir duplicaria o efeito.
+        """
+        endpoint = endpoint or self.endpoint_key(method, url)
+        if idempotent is None:
+            idempotent = method.upper() in _IDEMPOTENT
+        retry_statuses = self.retry.retry_statuses if idempotent else (429,)
+        kwargs.setdefault("timeout", self.timeout)
+        st = self._stat(endpoint)
+        attempt = 0
+        while True:
+            bucket = self._bucket(endpoint)
+            if bucket is not None:
+                waited = bucket.acquire()
+                if waited:
+                    with self._lock:
+                        st.throttled_s += waited
+            t0 = time.perf_counter()
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    st.count += 1
+                    st.errors += 1
+                    st.total_s += elapsed
+                    st.max_s = max(st.max_s, elapsed)
+                if attempt >= self.retry.max_retries or not (idempotent or _connect_failure(e)):
+                    raise
+                delay = self.retry.backoff(attempt)
+                log.warning("[%s] %s: %s — nova tentativa em %.1fs", self.name, endpoint, e, delay)
+            else:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    st.count += 1
+                    st.total_s += elapsed
+                    st.max_s = max(st.max_s, elapsed)
+                    if r.status_code >= 400:
+                        st.errors += 1
+                rate = _amzn_rate(r)
+                if rate:
+                    self._learn_rate(endpoint, rate)
+                if r.status_code not in retry_statuses or attempt >= self.retry.max_retries:
+                    return r
+                delay = _retry_after_seconds(r)
+                if delay is None:
+                    delay = self.retry.backoff(attempt)
+                    if rate:
+                        delay = max(delay, 1.0 / rate)
+                delay = min(delay, self.retry.backoff_max)
+                log.warning("[%s] %s: HTTP %s — nova tentativa em %.1fs", self.name, endpoint,
+                            r.status_code, delay)
+            with self._lock:
+                st.retries += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def check_rate_limit_keys(
+    rate_limits: Mapping[str, Tuple[float, float]],
+    examples: Mapping[str, str],
+) -> None:
+    """
+    Confere que cada chave "METHOD /path" de `rate_limits` é a que endpoint_key
+    gera para a URL de exemplo (`examples`: chave -> "METHOD url"). Chave que
+    não casa nunca seria aplicada (tudo cairia no bucket "*"): ValueError.
+    Rótulos livres ("orders", "*") passados via endpoint= ficam de fora.
+    """
+    problems = []
+    for key in rate_limits:
+        if " /" not in key:
+            continue
+        ex = examples.get(key)
+        if ex is None:
+            problems.append(f"{key}: sem URL de exemplo")
+            continue
+        method, url = ex.split(" ", 1)
+        got = HttpTransport.endpoint_key(method, url)
+        if got != key:
+            problems.append(f"{key}: {ex} resolve para {got!r}")
+    if problems:
+        raise ValueError("rate_limits com chaves que não casam: " + "; ".join(problems))
@@ -0,0 +1,90 @@
+# app/utils/core/nfe_xml.py
+"""
+Localização rápida dos campos de NF-e, compartilhada pelos parsers de
+tax_documents e billing/xml.
+
+Busca com curinga de namespace (".//{*}ide") é resolvida pelo ElementPath em
+Python, comparando a tag de cada elemento percorrido. Como toda a infNFe vem
+num único namespace (o do portal fiscal), o namespace é lido uma vez e os
+caminhos são trocados pelos equivalentes com a tag exata ("{ns}ide"), que o
+ElementTree resolve em C (iter(tag) e busca direta de filho). Caminhos por
+namespace são montados uma vez (caminhos_nfe) e reutilizados.
+
+Se a subárvore mistura namespaces, ficam os caminhos com curinga (mesmo
+resultado, caminho lento).
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+from xml.etree import ElementTree as ET
+
+__all__ = [
+    "caminhos_nfe",
+    "localizar_nfe",
+    "namespace_de",
+    "namespace_uniforme",
+]
+
+
+def namespace_de(tag: str) -> str:
+    """'{http://...}ide' → '{http://...}'; sem namespace → ''."""
+    if tag[:1] == "{":
+        return tag[: tag.index("}") + 1]
+    return ""
+
+
+def namespace_uniforme(el: ET.Element) -> Optional[str]:
+    """Namespace comum a toda a subárvore de `el` ('' = nenhum) ou None se mistura."""
+    ns = namespace_de(el.tag) if isinstance(el.tag, str) else None
+    if ns is None:
+        return None
+    if ns:
+        ok = all(isinstance(t, str) and t.startswith(ns) for t in (e.tag for e in el.iter()))
+    else:
+        ok = all(isinstance(t, str) and t[:1] != "{" for t in (e.tag for e in el.iter()))
+    return ns if ok else None
+
+
+def localizar_nfe(root: ET.Element) -> Tuple[Optional[ET.Element], Optional[ET.Element]]:
+    """
+    (NFe, infNFe) de um XML de NF-e — procNFe/nfeProc ou NFe pura. Os dois
+    estão no início do documento, então o curinga aqui custa pouco.
+    """
+    nfe = root.find(".//{*}NFe")
+    if nfe is None and root.tag.endswith("NFe"):
+        nfe = root
+    if nfe is None:
+        return None, None
+    return nfe, nfe.find(".//{*}infNFe")
+
+
+class _Caminhos(dict):
+    # modelo com '{*}' → caminho com a tag exata, montado no 1º uso
+    def __init__(self, ns: str) -> None:
+        super().__init__()
+        self.ns = ns
+
+    def __missing__(self, modelo: str) -> str:
+        caminho = modelo.replace("{*}", self.ns)
+        if caminho.startswith(".{") or (caminho.startswith(".") and caminho[1:2].isalpha()):
+            caminho = caminho[1:]  # ".{ns}serie" ≡ "{ns}serie": filho direto vai pelo atalho em C
+        self[modelo] = caminho
+        return caminho
+
+
+_CURINGA = "{*}"
+_POR_NS: Dict[str, _Caminhos] = {}
+
+
+def caminhos_nfe(inf_nfe: ET.Element) -> Dict[str, str]:
+    """
+    Tradutor de caminhos para o documento: c[".//{*}ide"] → ".//{ns}ide" quando
+    a infNFe inteira está num namespace só; senão os próprios modelos com
+    curinga (mesmo resultado, mais lento). Um tradutor por namespace, no processo.
+    """
+    ns = namespace_uniforme(inf_nfe)
+    chave = _CURINGA if ns is None else ns
+    c = _POR_NS.get(chave)
+    if c is None:
+        c = _POR_NS.setdefault(chave, _Caminhos(chave))
+    return c
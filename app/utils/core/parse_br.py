@@ -0,0 +1,350 @@
+# app/utils/core/parse_br.py
+"""
+Conversão vetorizada de colunas de planilhas BR (valores "1.234,56", datas
+dd/mm/aaaa, flags sim/não) — substitui os conversores por célula
+(Series.apply) dos ingestores de faturamento/tarifas, com o mesmo resultado
+(datas: ver parse_date_br).
+
+Estratégia: as células que já são número/data vão direto para o dtype final;
+as strings são limpas com o accessor .str e convertidas em bloco. O que o
+caminho rápido não reconhece (formato exótico, lixo) cai no conversor
+escalar original, só para essas células.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "to_float_br",
+    "parse_float_br",
+    "to_amount_br",
+    "parse_amount_br",
+    "to_bool_br",
+    "parse_bool_br",
+    "parse_date_br",
+    "FORMATOS_DATA_BR",
+]
+
+_TRUE = frozenset({"true", "t", "1", "sim", "yes"})
+_FALSE = frozenset({"false", "f", "0", "não", "nao", "no"})
+# flags que viram número nas colunas numéricas do faturamento ML
+_TRUE_NUM = frozenset({"true", "t", "sim", "yes", "y", "1"})
+_FALSE_NUM = frozenset({"false", "f", "nao", "não", "no", "n", "0"})
+
+FORMATOS_DATA_BR: Sequence[str] = (
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+# padrões monetários (mesmos de billing/excel/ingest)
+_DEC_PT = r"^\d{1,3}(?:\.\d{3})*,\d{1,2}$"   # 1.234,56
+_DEC_COMMA = r"^\d+,\d{1,2}$"                # 12,34
+_DEC_DOT = r"^\d+\.\d{1,2}$"                 # 12.34
+_INT = r"^\d+$"
+
+
+# ------------------------------------------------------------
+# conversores escalares (referência e fallback)
+# ------------------------------------------------------------
+
+def to_float_br(x: Any, *, booleanos: bool = False) -> Optional[float]:
+    """'1.234,56' → 1234.56 (ponto = milhar). booleanos=True: 'sim'/'não' → 1.0/0.0."""
+    if pd.isna(x):
+        return None
+    if isinstance(x, str):
+        s_raw = x.strip()
+        if booleanos:
+            s = s_raw.lower()
+            if s in _TRUE_NUM:
+                return 1.0
+            if s in _FALSE_NUM:
+                return 0.0
+        try:
+            return float(s_raw.replace(".", "").replace(",", "."))
+        except Exception:
+            return None
+    try:
+        return float(x)
+    except Exception:
+        return None
+
+
+def to_amount_br(x: Any) -> Optional[float]:
+    """Valor monetário pt-BR/en-US ('R$ 1.234,56', '12.34', '(5,00)' = negativo)."""
+    if isinstance(x, (int, float, Decimal)):
+        return float(x)
+    if pd.isna(x):
+        return None
+
+    s = str(x).strip()
+    neg = False
+    if s.startswith("(") and s.endswith(")"):
+        neg = True
+        s = s[1:-1]
+
+    s = s.replace("R$", "").replace("\u00A0", " ").strip()
+    s_no_sp = s.replace(" ", "")
+
+    if re.match(_DEC_PT, s_no_sp):
+        s_norm = s_no_sp.replace(".", "").replace(",", ".")
+    elif re.match(_DEC_COMMA, s_no_sp):
+        s_norm = s_no_sp.replace(",", ".")
+    elif re.match(_DEC_DOT, s_no_sp) or re.match(_INT, s_no_sp):
+        s_norm = s_no_sp
+    else:
+        s_norm = s_no_sp.replace(",", ".")
+
+    try:
+        v = float(s_norm)
+        return -v if neg else v
+    except Exception:
+        return None
+
+
+def to_bool_br(x: Any) -> Optional[bool]:
+    if pd.isna(x):
+        return None
+    s = str(x).strip().lower()
+    if s in _TRUE:
+        return True
+    if s in _FALSE:
+        return False
+    return None
+
+
+# ------------------------------------------------------------
+# kernels vetorizados
+# ------------------------------------------------------------
+#
+# Só as células string passam pelos kernels, e cada texto distinto é
+# convertido uma vez (exports de tarifas repetem muito valor e data). Sem
+# pyarrow o accessor .str de colunas object é um laço Python com mais
+# overhead que uma list comprehension; por isso os kernels trabalham sobre
+# listas e deixam a conversão final (float/datetime) para o numpy/pandas.
+
+_RE_DEC_PT = re.compile(_DEC_PT)
+
+
+def _textos(serie: pd.Series) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """(máscara de strings, strings com .strip(), máscara de não-strings não nulas)."""
+    vals = serie.tolist()
+    eh_str = np.fromiter((isinstance(v, str) for v in vals), dtype=bool, count=len(vals))
+    strs = [v.strip() for v in vals if isinstance(v, str)]
+    return eh_str, strs, serie.notna().to_numpy() & ~eh_str
+
+
+def _por_unicos(strs: List[str], kernel: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+    codes, unicos = pd.factorize(np.array(strs, dtype=object))
+    if len(unicos) == len(strs):
+        return kernel(strs)
+    return kernel(unicos.tolist())[codes]
+
+
+def _float_ou_nan(v: str) -> float:
+    try:
+        return float(v)
+    except ValueError:
+        return np.nan
+
+
+def _floats(txt: List[str]) -> np.ndarray:
+    # float() em C sobre a lista; com alguma célula inválida, uma a uma
+    try:
+        return np.fromiter(map(float, txt), dtype=float, count=len(txt))
+    except ValueError:
+        return np.fromiter(map(_float_ou_nan, txt), dtype=float, count=len(txt))
+
+
+def _nao_texto(vals: pd.Series, escalar: Callable[[Any], Optional[float]]) -> np.ndarray:
+    # células numéricas do Excel (int/float/Decimal/bool): float() em bloco
+    try:
+        return vals.astype(float).to_numpy()
+    except (TypeError, ValueError):
+        return np.array([np.nan if (r := escalar(v)) is None else r for v in vals.tolist()], dtype=float)
+
+
+def _resultado(serie: pd.Series, valores: np.ndarray, escalar: Callable[[Any], Optional[float]]) -> pd.Series:
+    # Series.apply devolve float64 quando sobra algum float (NaN de 'nan' conta);
+    # só None → object. Coluna toda NaN é rara: confere com o escalar.
+    if np.isnan(valores).all() and all(escalar(v) is None for v in serie.tolist()):
+        return pd.Series([None] * len(serie), index=serie.index, name=serie.name, dtype=object)
+    return pd.Series(valores, index=serie.index, name=serie.name, dtype="float64")
+
+
+def _ja_numerica(serie: pd.Series) -> bool:
+    return pd.api.types.is_bool_dtype(serie.dtype) or pd.api.types.is_numeric_dtype(serie.dtype)
+
+
+def _kernel_float(strs: List[str], booleanos: bool) -> np.ndarray:
+    out = _floats([v.replace(".", "").replace(",", ".") for v in strs])
+    if booleanos:
+        low = [v.lower() for v in strs]
+        out[np.fromiter((v in _TRUE_NUM for v in low), dtype=bool, count=len(low))] = 1.0
+        out[np.fromiter((v in _FALSE_NUM for v in low), dtype=bool, count=len(low))] = 0.0
+    return out
+
+
+def parse_float_br(serie: pd.Series, *, booleanos: bool = False) -> pd.Series:
+    """Vetorizado de `serie.apply(to_float_br)` (mesmo resultado e dtype)."""
+    if not len(serie):
+        return serie.copy()
+    if _ja_numerica(serie):
+        return pd.Series(serie.astype("float64").to_numpy(), index=serie.index, name=serie.name)
+
+    eh_str, strs, outros = _textos(serie)
+    out = np.full(len(serie), np.nan)
+    if strs:
+        out[eh_str] = _por_unicos(strs, lambda u: _kernel_float(u, booleanos))
+    if outros.any():
+        out[outros] = _nao_texto(serie[outros], to_float_br)
+    return _resultado(serie, out, to_float_br)
+
+
+def _kernel_valor(strs: List[str]) -> np.ndarray:
+    neg = np.fromiter((v[:1] == "(" and v[-1:] == ")" for v in strs), dtype=bool, count=len(strs))
+    sem_par = [v[1:-1] if n else v for v, n in zip(strs, neg)] if neg.any() else strs
+    # mesmo s_no_sp do escalar: o strip() do Python já remove NBSP das pontas
+    limpo = [v.replace("R$", "").strip().replace("\u00A0", "").replace(" ", "") for v in sem_par]
+    # fora do 1.234,56 todos os ramos do escalar reduzem a trocar ',' por '.'
+    match = _RE_DEC_PT.match
+    txt = [v.replace(".", "").replace(",", ".") if match(v) else v.replace(",", ".") for v in limpo]
+    out = _floats(txt)
+    out[neg] *= -1.0
+    return out
+
+
+def parse_amount_br(serie: pd.Series) -> pd.Series:
+    """Vetorizado de `serie.apply(to_amount_br)` (mesmo resultado e dtype)."""
+    if not len(serie):
+        return serie.copy()
+    if _ja_numerica(serie):
+        return pd.Series(serie.astype("float64").to_numpy(), index=serie.index, name=serie.name)
+
+    eh_str, strs, outros = _textos(serie)
+    out = np.full(len(serie), np.nan)
+    if strs:
+        out[eh_str] = _por_unicos(strs, _kernel_valor)
+    if outros.any():
+        out[outros] = _nao_texto(serie[outros], to_amount_br)
+    return _resultado(serie, out, to_amount_br)
+
+
+def _kernel_bool(strs: List[str]) -> np.ndarray:
+    out = np.full(len(strs), None, dtype=object)
+    for i, v in enumerate(strs):
+        v = v.lower()
+        if v in _TRUE:
+            out[i] = True
+        elif v in _FALSE:
+            out[i] = False
+    return out
+
+
+def parse_bool_br(serie: pd.Series) -> pd.Series:
+    """Vetorizado de `serie.apply(to_bool_br)`: True/False/None (dtype bool se não houver None)."""
+    if not len(serie):
+        return serie.copy()
+    eh_str, strs, outros = _textos(serie)
+    out = np.full(len(serie), None, dtype=object)
+    if strs:
+        out[eh_str] = _por_unicos(strs, _kernel_bool)
+    if outros.any():
+        out[outros] = [to_bool_br(v) for v in serie[outros].tolist()]
+    if not any(v is None for v in out.tolist()):
+        return pd.Series(out.astype(bool), index=serie.index, name=serie.name)
+    return pd.Series(out, index=serie.index, name=serie.name, dtype=object)
+
+
+_UNIDADE = "datetime64[us]"
+
+
+def parse_date_br(serie: pd.Series, formatos: Sequence[str] = FORMATOS_DATA_BR) -> pd.Series:
+    """
+    datetime64 com dia primeiro. Datas já tipadas convertem em bloco; strings
+    tentam os `formatos` explícitos, em ordem, depois ISO 8601 completo ("Z",
+    offset, fração de segundo; fica a hora local do texto) e só o que sobrar
+    passa pelo `pd.to_datetime(x, dayfirst=True)` célula a célula.
+    Ao contrário de to_datetime na coluna inteira, formatos misturados não
+    viram NaT, e aaaa-mm-dd não tem dia e mês trocados pelo dayfirst.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        return serie
+    out = np.full(len(serie), np.datetime64("NaT"), dtype=_UNIDADE)
+    eh_str, strs, outros = _textos(serie)
+
+    if outros.any():
+        vals = serie[outros]
+        try:
+            out[outros] = pd.to_datetime(vals, errors="coerce").to_numpy(dtype=_UNIDADE)
+        except (TypeError, ValueError):
+            out[outros] = _datas_escalares(vals.tolist())
+
+    if strs:
+        out[eh_str] = _por_unicos(strs, lambda u: _kernel_data(u, formatos))
+    return pd.Series(out, index=serie.index, name=serie.name)
+
+
+def _kernel_data(strs: List[str], formatos: Sequence[str]) -> np.ndarray:
+    strs = pd.Series(strs, dtype=object)
+    out = np.full(len(strs), np.datetime64("NaT"), dtype=_UNIDADE)
+    faltam = np.ones(len(strs), dtype=bool)
+    for fmt in formatos:
+        if not faltam.any():
+            break
+        conv = pd.to_datetime(strs[faltam], format=fmt, errors="coerce")
+        achou = conv.notna().to_numpy()
+        if achou.any():
+            pos = np.flatnonzero(faltam)[achou]
+            out[pos] = conv[achou].to_numpy(dtype=_UNIDADE)
+            faltam[pos] = False
+    if faltam.any():
+        # ISO 8601 antes do dayfirst, que leria 2024-01-02T10:00:00Z como 1º de fevereiro
+        pos = np.flatnonzero(faltam)
+        iso = _datas_iso(strs.iloc[pos].tolist())
+        ok = ~np.isnat(iso)
+        out[pos[ok]] = iso[ok]
+        faltam[pos[ok]] = False
+    if faltam.any():
+        out[faltam] = _datas_escalares(strs[faltam].tolist())
+    return out
+
+
+_ISO_DATA = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[T ]|$)")
+
+
+def _datas_iso(vals: Sequence[str]) -> np.ndarray:
+    out = []
+    for x in vals:
+        x = x.strip()
+        try:
+            if not _ISO_DATA.match(x):
+                raise ValueError(x)
+            dt = datetime.fromisoformat(x)
+        except ValueError:
+            out.append(np.datetime64("NaT"))
+            continue
+        out.append(np.datetime64(dt.replace(tzinfo=None)))  # hora local do texto
+    return np.array(out, dtype=_UNIDADE)
+
+
+def _datas_escalares(vals: Sequence[Any]) -> np.ndarray:
+    out = []
+    for x in vals:
+        v = pd.to_datetime(x, dayfirst=True, errors="coerce")
+        if v is pd.NaT or v is None:
+            out.append(np.datetime64("NaT"))
+            continue
+        if getattr(v, "tzinfo", None) is not None:
+            v = v.tz_localize(None)  # hora local do texto, como o .dt.date de antes
+        out.append(v.to_datetime64())
+    return np.array(out, dtype=_UNIDADE)
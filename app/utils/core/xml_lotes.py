@@ -0,0 +1,118 @@
+# app/utils/core/xml_lotes.py
+"""
+Leitura de XMLs (membros de .zip ou arquivos soltos) em lotes, opcionalmente
+num pool de processos. Usado pelos ingestores de NF-e (tax_documents e
+billing/xml): o processo principal só lista os membros; cada lote é aberto,
+lido e parseado pelo worker, e os resultados voltam na ordem dos lotes, então
+o resultado final é o mesmo do modo serial.
+"""
+from __future__ import annotations
+
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Lote",
+    "listar_lotes",
+    "ler_lote",
+    "mapear_lotes",
+]
+
+# (zip ou None p/ arquivos soltos, nomes dos membros / caminhos dos arquivos)
+Lote = Tuple[Optional[str], List[str]]
+
+
+def listar_lotes(
+    zips: Sequence[Path],
+    soltos: Sequence[Path] = (),
+    *,
+    tamanho: int = 500,
+    extensao: str = ".xml",
+    pular_corrompidos: bool = True,
+    avisar: Optional[Callable[[str], None]] = None,
+) -> List[Lote]:
+    """
+    Lotes de até `tamanho` XMLs, na ordem de leitura serial (ZIPs e depois os
+    soltos). Só lê o diretório central dos ZIPs; ZIP corrompido é pulado (e
+    reportado em `avisar`) ou, com pular_corrompidos=False, levanta BadZipFile.
+    """
+    tamanho = max(1, int(tamanho))
+    lotes: List[Lote] = []
+    for z in zips:
+        try:
+            with zipfile.ZipFile(z, "r") as zf:
+                nomes = [n for n in zf.namelist() if n.lower().endswith(extensao)]
+        except zipfile.BadZipFile:
+            if not pular_corrompidos:
+                raise
+            if avisar:
+                avisar(f"[WARN] ZIP corrompido: {z}")
+            continue
+        if avisar:
+            avisar(f"[DEBUG] ZIP {Path(z).name}: {len(nomes)} XML(s)")
+        lotes.extend((str(z), nomes[i:i + tamanho]) for i in range(0, len(nomes), tamanho))
+    arquivos = [str(x) for x in soltos]
+    lotes.extend((None, arquivos[i:i + tamanho]) for i in range(0, len(arquivos), tamanho))
+    return lotes
+
+
+def ler_lote(lote: Lote) -> Iterator[Tuple[Optional[bytes], str, Optional[Exception]]]:
+    """
+    (bytes, nome, erro) de cada XML do lote — nome do membro no .zip ou caminho
+    do arquivo solto. Falha de leitura vem com bytes=None e o erro, sem
+    interromper o lote: membro com CRC inválido só perde a si mesmo, e ZIP que
+    não abre mais (corrompido/sumiu desde a listagem) marca todos os membros.
+    """
+    zpath, nomes = lote
+    if zpath is None:
+        for p in nomes:
+            try:
+                yield Path(p).read_bytes(), p, None
+            except Exception as e:
+                yield None, p, e
+        return
+    try:
+        zf = zipfile.ZipFile(zpath, "r")
+    except (zipfile.BadZipFile, OSError) as e:
+        for n in nomes:
+            yield None, n, e
+        return
+    with zf:
+        for n in nomes:
+            try:
+                data = zf.read(n)
+            except Exception as e:  # BadZipFile (CRC), zlib.error, EOFError...
+                yield None, n, e
+                continue
+            yield data, n, None
+
+
+def mapear_lotes(
+    funcao: Callable[..., Any],
+    lotes: Sequence[Lote],
+    *,
+    workers: int = 1,
+    **kwargs: Any,
+) -> Iterator[Any]:
+    """
+    funcao(lote, **kwargs) para cada lote, na ordem dos lotes. workers > 1 usa
+    um pool de processos com no máximo 2×workers lotes em voo (`funcao` precisa
+    ser função de módulo e o resultado, picklable: prefira tuplas compactas).
+    """
+    workers = max(1, min(int(workers or 1), len(lotes)))
+    if workers <= 1:
+        for lote in lotes:
+            yield funcao(lote, **kwargs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        voo: deque = deque()
+        for lote in lotes:
+            voo.append(ex.submit(funcao, lote, **kwargs))
+            if len(voo) >= 2 * workers:
+                yield voo.popleft().result()
+        while voo:
+            yield voo.popleft().result()
@@ -4,6 +4,8 @@ import pandas as pd
 from datetime import datetime, date
 from decimal import Decimal
 
+from app.utils.core.parse_br import parse_bool_br, parse_date_br, parse_float_br
+
 NUMERIC_COLS = [
     "valor_tarifa","custo_por_categoria","custo_fixo","subtotal_sem_desconto",
     "desconto_comercial","desconto_por_campanha","quantidade_vendida",
@@ -13,54 +15,16 @@ NUMERIC_COLS = [
 BOOL_COLS = ["tarifa_estornada"]
 DATE_COLS = ["data_tarifa","data_venda"]
 
-def _to_bool(x):
-    if pd.isna(x):
-        return None
-    s = str(x).strip().lower()
-    if s in {"true","t","1","sim","yes"}:
-        return True
-    if s in {"false","f","0","não","nao","no"}:
-        return False
-    return None
-
-def _to_float(x):
-    if pd.isna(x):
-        return None
-    if isinstance(x, str):
-        s_raw = x.strip()
-        s = s_raw.lower()
-        # tratar flags/booleanos comuns -> número (compatível com schema float)
-        if s in {"true","t","sim","yes","y","1"}:
-            return 1.0
-        if s in {"false","f","nao","não","no","n","0"}:
-            return 0.0
-        # tratar números com formatação regional
-        s_num = s_raw.replace(".", "").replace(",", ".")
-        try:
-            return float(s_num)
-        except Exception:
-            return None
-        
-    try:
-        return float(x)
-    except Exception:
-        return None
-
-def _to_date(x):
-    if pd.isna(x):
-        return None
-    return pd.to_datetime(x, dayfirst=True, errors="coerce")
-
 def enrich_and_clean(df: pd.DataFrame, competencia: Optional[str]) -> pd.DataFrame:
     for c in NUMERIC_COLS:
         if c in df.columns:
-            df[c] = df[c].apply(_to_float)
+            df[c] = parse_float_br(df[c], booleanos=True)  # flags sim/não → 1.0/0.0
     for c in BOOL_COLS:
         if c in df.columns:
-            df[c] = df[c].apply(_to_bool)
+            df[c] = parse_bool_br(df[c])
     for c in DATE_COLS:
         if c in df.columns:
-            df[c] = df[c].apply(_to_date).dt.date
+            df[c] = parse_date_br(df[c]).dt.date
 
     comp = competencia
     if not comp and "data_tarifa" in df.columns and df["data_tarifa"].notna().any():
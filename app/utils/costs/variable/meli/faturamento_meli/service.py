@@ -1,11 +1,18 @@
 from __future__ import annotations
 from typing import List, Dict, Any, Optional
 import pandas as pd
+from app.utils.core.excel_cache import frame_em_cache, versao_codigo
 from .mapper import map_columns
 from .aggregator import enrich_and_clean, to_json_records
 
+def _ler_report(xlsx_path: str | bytes) -> pd.DataFrame:
+    # aba REPORT já mapeada, com cache ao lado do .xlsx (bytes: lê direto)
+    return frame_em_cache(
+        xlsx_path, "faturamento_meli", versao_codigo(__name__, map_columns.__module__),
+        lambda: map_columns(pd.read_excel(xlsx_path, sheet_name="REPORT", header=7, dtype=object, engine="openpyxl")),
+    )
+
 def read_faturamento_meli_excel(xlsx_path: str | bytes, competencia: Optional[str] = None) -> List[Dict[str, Any]]:
-    df = pd.read_excel(xlsx_path, sheet_name="REPORT", header=7, dtype=object, engine="openpyxl")
-    df = map_columns(df)
+    df = _ler_report(xlsx_path).copy(deep=False)  # enrich altera colunas; o cache fica intacto
     df = enrich_and_clean(df, competencia=competencia)
     return to_json_records(df)
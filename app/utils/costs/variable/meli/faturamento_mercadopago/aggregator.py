@@ -5,6 +5,8 @@ from datetime import date, datetime
 from decimal import Decimal
 from pathlib import Path
 
+from app.utils.core.parse_br import parse_bool_br, parse_date_br, parse_float_br
+
 NUMERIC_COLS = [
     "valor_tarifa",
     "valor_acrescimo",
@@ -15,50 +17,16 @@ NUMERIC_COLS = [
 BOOL_COLS = ["tarifa_estornada"]
 DATE_COLS = ["data_movimento"]
 
-def _to_bool(x):
-    if pd.isna(x):
-        return None
-    s = str(x).strip().lower()
-    if s in {"true","t","1","sim","yes"}:
-        return True
-    if s in {"false","f","0","não","nao","no"}:
-        return False
-    return None
-
-def _to_float(x):
-    if pd.isna(x):
-        return None
-    if isinstance(x, str):
-        s = x.strip().replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except Exception:
-            return None
-    if isinstance(x, Decimal):
-        try:
-            return float(x)
-        except Exception:
-            return None
-    try:
-        return float(x)
-    except Exception:
-        return None
-
-def _to_date(x):
-    if pd.isna(x):
-        return None
-    return pd.to_datetime(x, dayfirst=True, errors="coerce")
-
 def enrich_and_clean(df: pd.DataFrame, competencia: Optional[str]) -> pd.DataFrame:
     for c in NUMERIC_COLS:
         if c in df.columns:
-            df[c] = df[c].apply(_to_float)
+            df[c] = parse_float_br(df[c])
     for c in BOOL_COLS:
         if c in df.columns:
-            df[c] = df[c].apply(_to_bool)
+            df[c] = parse_bool_br(df[c])
     for c in DATE_COLS:
         if c in df.columns:
-            df[c] = df[c].apply(_to_date).dt.date
+            df[c] = parse_date_br(df[c]).dt.date
 
     comp = competencia
     if not comp and "data_movimento" in df.columns and df["data_movimento"].notna().any():
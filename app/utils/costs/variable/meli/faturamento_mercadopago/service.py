@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import List, Dict, Any, Optional
 import pandas as pd
+from app.utils.core.excel_cache import frame_em_cache, versao_codigo
 from .mapper import map_columns
 from .aggregator import enrich_and_clean, to_json_records
 
@@ -10,13 +11,17 @@ def read_faturamento_mercadopago_excel(
     header_row: int = 7,           # linha 8 (0-based)
     sheet_name: str = "REPORT",
 ) -> List[Dict[str, Any]]:
-    df = pd.read_excel(
-        xlsx_path,
-        sheet_name=sheet_name,
-        header=header_row,
-        dtype=object,
-        engine="openpyxl",
-    )
-    df = map_columns(df)
+    # aba já mapeada, com cache ao lado do .xlsx (bytes: lê direto)
+    df = frame_em_cache(
+        xlsx_path, f"faturamento_mercadopago_{sheet_name}", versao_codigo(__name__, map_columns.__module__),
+        lambda: map_columns(pd.read_excel(
+            xlsx_path,
+            sheet_name=sheet_name,
+            header=header_row,
+            dtype=object,
+            engine="openpyxl",
+        )),
+        sheet_name=sheet_name, header_row=header_row,
+    ).copy(deep=False)  # enrich altera colunas; o cache fica intacto
     df = enrich_and_clean(df, competencia=competencia)
     return to_json_records(df)
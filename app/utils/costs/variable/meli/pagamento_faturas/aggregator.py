@@ -5,6 +5,8 @@ from datetime import datetime, date
 from decimal import Decimal
 from pathlib import Path
 
+from app.utils.core.parse_br import parse_date_br, parse_float_br
+
 NUMERIC_ABA1 = [
     "valor_total","valor_aplicado_mes","valor_aplicado_outro_mes",
     "saldo_positivo_outras_faturas","saldo_positivo_devolvido"
@@ -14,40 +16,13 @@ DATE_ABA1 = ["data_pagamento_ou_estorno","data_cancelamento"]
 NUMERIC_ABA2 = ["parte_pagamento_aplicada_tarifas"]
 DATE_ABA2 = ["data_pagamento","data_tarifa"]
 
-def _to_float(x):
-    if pd.isna(x):
-        return None
-    if isinstance(x, str):
-        s = x.strip().replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except Exception:
-            return None
-    if isinstance(x, Decimal):
-        try:
-            return float(x)
-        except Exception:
-            return None
-    try:
-        return float(x)
-    except Exception:
-        return None
-
-def _to_date(x):
-    if pd.isna(x):
-        return None
-    return pd.to_datetime(x, dayfirst=True, errors="coerce")
-
-# --- dentro de app/utils/costs/variable/meli/pagamento_faturas/aggregator.py ---
-
 def _to_date_series(s: pd.Series) -> pd.Series:
-    # Converte a coluna inteira garantindo datetime64[ns] e só depois extrai .date
-    return pd.to_datetime(s, dayfirst=True, errors="coerce").dt.date
+    return parse_date_br(s).dt.date
 
 def enrich_and_clean_aba1(df: pd.DataFrame, competencia: Optional[str]) -> pd.DataFrame:
     for c in NUMERIC_ABA1:
         if c in df.columns:
-            df[c] = df[c].apply(_to_float)
+            df[c] = parse_float_br(df[c])
     for c in DATE_ABA1:
         if c in df.columns:
             df[c] = _to_date_series(df[c])  # <-- vetoriza
@@ -65,7 +40,7 @@ def enrich_and_clean_aba1(df: pd.DataFrame, competencia: Optional[str]) -> pd.Da
 def enrich_and_clean_aba2(df: pd.DataFrame, competencia: Optional[str]) -> pd.DataFrame:
     for c in NUMERIC_ABA2:
         if c in df.columns:
-            df[c] = df[c].apply(_to_float)
+            df[c] = parse_float_br(df[c])
     for c in DATE_ABA2:
         if c in df.columns:
             df[c] = _to_date_series(df[c])  # <-- vetoriza
@@ -1,19 +1,31 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import pandas as pd
+from app.utils.core.excel_cache import frame_em_cache, versao_codigo
 from .mapper import map_columns_aba1, map_columns_aba2
 from .aggregator import (
     enrich_and_clean_aba1, enrich_and_clean_aba2, to_json_records
 )
 
+def _ler_aba(
+    xlsx_path: str | bytes, etapa: str, sheet_name: str, header_row: int,
+    mapear: Callable[[pd.DataFrame], pd.DataFrame],
+) -> pd.DataFrame:
+    # aba já mapeada, com cache ao lado do .xlsx (bytes: lê direto); cópia
+    # rasa porque o enrich altera colunas
+    return frame_em_cache(
+        xlsx_path, etapa, versao_codigo(__name__, mapear.__module__),
+        lambda: mapear(pd.read_excel(xlsx_path, sheet_name=sheet_name, header=header_row, dtype=object, engine="openpyxl")),
+        sheet_name=sheet_name, header_row=header_row,
+    ).copy(deep=False)
+
 def read_pagamentos_estornos(
     xlsx_path: str | bytes,
     competencia: Optional[str] = None,
     header_row: int = 9,                 # linha 10
     sheet_name: str = "Pagamentos e estornos",
 ) -> List[Dict[str, Any]]:
-    df = pd.read_excel(xlsx_path, sheet_name=sheet_name, header=header_row, dtype=object, engine="openpyxl")
-    df = map_columns_aba1(df)
+    df = _ler_aba(xlsx_path, "pagamentos_estornos", sheet_name, header_row, map_columns_aba1)
     df = enrich_and_clean_aba1(df, competencia=competencia)
     return to_json_records(df)
 
@@ -23,7 +35,6 @@ def read_detalhe_pagamentos_mes(
     header_row: int = 9,                 # linha 10
     sheet_name: str = "Detalhe do Pagamentos deste mês",
 ) -> List[Dict[str, Any]]:
-    df = pd.read_excel(xlsx_path, sheet_name=sheet_name, header=header_row, dtype=object, engine="openpyxl")
-    df = map_columns_aba2(df)
+    df = _ler_aba(xlsx_path, "detalhe_pagamentos_mes", sheet_name, header_row, map_columns_aba2)
     df = enrich_and_clean_aba2(df, competencia=competencia)
     return to_json_records(df)
@@ -2,9 +2,10 @@ from __future__ import annotations
 from typing import List, Dict, Any, Optional
 import pandas as pd
 from datetime import date, datetime
-from decimal import Decimal
 from pathlib import Path
 
+from app.utils.core.parse_br import parse_date_br, parse_float_br
+
 # Colunas por aba
 NUMERIC_ABA1 = ["valor_tarifa","unidades_armazenadas","tarifa_por_unidade"]
 DATE_ABA1 = ["data_tarifa"]
@@ -18,32 +19,13 @@ DATE_ABA3 = ["data_custo"]
 NUMERIC_ABA4 = ["valor_custo","custo_por_unidade","unidades_armazenadas","tempo_meses","unidades_disponiveis","unidades_nao_disponiveis"]
 DATE_ABA4 = ["data_custo"]
 
-def _to_float(x):
-    if pd.isna(x):
-        return None
-    if isinstance(x, str):
-        s = x.strip().replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except Exception:
-            return None
-    if isinstance(x, Decimal):
-        try:
-            return float(x)
-        except Exception:
-            return None
-    try:
-        return float(x)
-    except Exception:
-        return None
-
 def _to_date_series(s: pd.Series) -> pd.Series:
-    return pd.to_datetime(s, dayfirst=True, errors="coerce").dt.date
+    return parse_date_br(s).dt.date
 
 def _apply_numeric(df: pd.DataFrame, cols: list[str]) -> None:
     for c in cols:
         if c in df.columns:
-            df[c] = df[c].apply(_to_float)
+            df[c] = parse_float_br(df[c])
 
 def _apply_dates(df: pd.DataFrame, cols: list[str]) -> None:
     for c in cols:
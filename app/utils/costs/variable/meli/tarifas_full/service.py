@@ -10,6 +10,7 @@ from .aggregator import (
     to_json_records
 )
 
+from app.utils.core.excel_cache import frame_em_cache, versao_codigo
 from app.utils.costs.variable.meli.config import (
     SHEET_CANDS_TARIFAS_FULL_ARMAZEN,
     SHEET_CANDS_TARIFAS_FULL_RETIRADA,
@@ -29,7 +30,17 @@ def _read_resolved(xlsx_path: str | bytes, sheet_candidates: List[str], header_r
     """
     Resolve o nome da aba por candidatos (centralizados em meli/config.py).
     Se não encontrar, retorna DF vazio (mês sem esse custo → soma 0).
+    Com caminho em disco o resultado fica no cache de ingest (hit não abre o
+    workbook nem repete o aviso de aba ausente); cópia rasa porque o enrich
+    altera colunas.
     """
+    return frame_em_cache(
+        xlsx_path, f"tarifas_full_{sheet_candidates[0] if sheet_candidates else ''}", versao_codigo(__name__, resolve_sheet_name.__module__),
+        lambda: _read_resolved_excel(xlsx_path, sheet_candidates, header_row),
+        sheet_candidates=list(sheet_candidates), header_row=header_row,
+    ).copy(deep=False)
+
+def _read_resolved_excel(xlsx_path: str | bytes, sheet_candidates: List[str], header_row: int) -> pd.DataFrame:
     sheets = _available_sheets(xlsx_path)
     name = resolve_sheet_name(sheets, sheet_candidates)
     if not name:
@@ -1,27 +1,91 @@
 from __future__ import annotations
 
 import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence, Tuple
 import requests
 
 from typing import List
 
+from app.utils.core.http import HttpTransport, RetryPolicy
+from app.utils.core.io import atomic_write_json, ler_json
+
 TOKEN_URL = "https://api.mercadolibre.com/oauth/token"
 
+# Limite padrão por endpoint (req/s, burst); 429 ainda é tratado com backoff
+MELI_RATE_LIMITS = {"*": (10.0, 20.0)}
+
+# /orders/search não devolve resultados além deste offset (janelas longas truncavam)
+ORDERS_MAX_OFFSET = 10_000
+
+# /items?ids= aceita no máximo 20 ids por chamada
+ITEMS_BULK_MAX_IDS = 20
+
+_SHARD_STEPS = {"day": timedelta(days=1), "hour": timedelta(hours=1)}
+_MIN_SHARD = timedelta(minutes=1)
+
+# checkpoint de shard mais velho que isso é buscado de novo (status/valores mudam)
+SHARD_CHECKPOINT_MAX_AGE = timedelta(hours=24)
+
+# campos de data aceitos por /orders/search como order.<campo>.from/.to
+ORDER_DATE_FIELDS = ("date_created", "date_last_updated", "date_closed")
+
+log = logging.getLogger(__name__)
+
+
+def _orders_search_params(seller_id: str, date_from: str, date_to: str, *, date_field: str, limit: int) -> Dict[str, Any]:
+    """Query inicial de /orders/search filtrada por `date_field` (offset 0)."""
+    if date_field not in ORDER_DATE_FIELDS:
+        # filtro desconhecido é ignorado pela API: a busca viria sem filtro de data
+        raise ValueError(f"date_field inválido: {date_field!r} (use um de {ORDER_DATE_FIELDS})")
+    return {
+        "seller": seller_id,
+        f"order.{date_field}.from": date_from,
+        f"order.{date_field}.to": date_to,
+        "sort": "date_asc",  # asc para acumular sem duplicar
+        "limit": limit,
+        "offset": 0,
+    }
+
+
+class _ShardTooLarge(Exception):
+    """Shard com mais pedidos do que o offset máximo permite paginar."""
+
+
+class OrdersShardTruncated(RuntimeError):
+    """Shard no tamanho mínimo ainda passa do offset máximo: o resultado ficaria truncado."""
+
+    def __init__(self, dt_from: datetime, dt_to: datetime, total: int, max_offset: int):
+        self.dt_from, self.dt_to, self.total, self.max_offset = dt_from, dt_to, total, max_offset
+        super().__init__(
+            f"shard {dt_from.isoformat(timespec='seconds')} .. {dt_to.isoformat(timespec='seconds')} "
+            f"tem {total} pedidos; /orders/search só pagina até offset {max_offset}"
+        )
+
 class MeliClient:
     def __init__(self, access_token: str, refresh_token: Optional[str] = None,
                  client_id: Optional[str] = None, client_secret: Optional[str] = None,
-                 api_base: str = "https://api.mercadolibre.com"):
+                 api_base: str = "https://api.mercadolibre.com",
+                 transport: Optional[HttpTransport] = None):
         self.access_token = access_token
         self.refresh_token = refresh_token
         self.client_id = client_id
         self.client_secret = client_secret
         self.api_base = api_base.rstrip("/")
+        self._refresh_lock = threading.Lock()
+        # Session com pool + retry/backoff + token bucket (compartilhável entre clientes)
+        self.http = transport or HttpTransport(
+            retry=RetryPolicy(), rate_limits=MELI_RATE_LIMITS, timeout=30, name="meli",
+        )
 
     @classmethod
     def from_tokens_json(cls, path: Path, client_id: Optional[str], client_secret: Optional[str],
-                         api_base: str = "https://api.mercadolibre.com") -> "MeliClient":
+                         api_base: str = "https://api.mercadolibre.com",
+                         transport: Optional[HttpTransport] = None) -> "MeliClient":
         data = json.loads(Path(path).read_text(encoding="utf-8"))
         return cls(
             access_token=data.get("access_token"),
@@ -29,6 +93,7 @@ class MeliClient:
             client_id=client_id,
             client_secret=client_secret,
             api_base=api_base,
+            transport=transport,
         )
 
     def _auth(self) -> Dict[str, str]:
@@ -37,13 +102,17 @@ class MeliClient:
     def refresh(self) -> bool:
         if not (self.refresh_token and self.client_id and self.client_secret):
             return False
+        with self._refresh_lock:  # workers concorrentes não disputam o refresh token
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
         payload = {
             "grant_type": "refresh_token",
             "client_id": self.client_id,
             "client_secret": self.client_secret,
             "refresh_token": self.refresh_token,
         }
-        r = requests.post(TOKEN_URL, data=payload, timeout=20)
+        r = self.http.post(TOKEN_URL, data=payload, timeout=20, endpoint="POST /oauth/token")
         if r.status_code != 200:
             return False
         data = r.json()
@@ -53,9 +122,9 @@ class MeliClient:
 
     def _get(self, path: str, params: Dict[str, Any] | None = None) -> requests.Response:
         url = f"{self.api_base}/{path.lstrip('/')}"
-        r = requests.get(url, headers=self._auth(), params=params or {}, timeout=30)
+        r = self.http.get(url, headers=self._auth(), params=params or {})
         if r.status_code == 401 and self.refresh():
-            r = requests.get(url, headers=self._auth(), params=params or {}, timeout=30)
+            r = self.http.get(url, headers=self._auth(), params=params or {})
         return r
 
     # util opcional para debug: quem é o user do token?
@@ -77,21 +146,19 @@ class MeliClient:
         date_to_iso: str,
         limit: int = 50,
         max_pages: int = 1000,
+        date_field: str = "date_created",
     ) -> Dict[str, Any]:
         """
         Busca pedidos na faixa [date_from_iso, date_to_iso], paginando por offset/limit.
         date_* devem estar em ISO8601 com offset (ex.: '2025-07-01T00:00:00-03:00').
+        date_field: "date_created" (padrão) ou "date_last_updated" (sync
+        incremental: pedidos criados OU alterados na faixa); ver ORDER_DATE_FIELDS.
         Retorna {"results": [...], "paging": {"total": N}}.
         """
         path = "/orders/search"
-        params = {
-            "seller": seller_id,
-            "order.date_created.from": date_from_iso,
-            "order.date_created.to": date_to_iso,
-            "sort": "date_asc",  # asc para acumular sem duplicar
-            "limit": limit,
-            "offset": 0,
-        }
+        params = _orders_search_params(
+            seller_id, date_from_iso, date_to_iso, date_field=date_field, limit=limit,
+        )
 
         all_results: List[Dict[str, Any]] = []
         page = 0
@@ -117,6 +184,175 @@ class MeliClient:
 
         return {"results": all_results, "paging": {"total": len(all_results)}}
     
+    # ---------- busca de pedidos em shards (backfill longo) ----------
+
+    def _fetch_orders_shard(
+        self,
+        seller_id: str,
+        dt_from: datetime,
+        dt_to: datetime,
+        *,
+        limit: int,
+        date_field: str,
+        max_offset: int,
+        allow_truncated: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pagina um único shard. Se o total do shard passar do offset máximo,
+        levanta _ShardTooLarge (o chamador divide o intervalo e tenta de novo).
+        Já no tamanho mínimo, levanta OrdersShardTruncated — ou, com
+        allow_truncated=True, registra um aviso e devolve só até o offset máximo.
+        """
+        params = _orders_search_params(
+            seller_id, dt_from.isoformat(timespec="seconds"), dt_to.isoformat(timespec="seconds"),
+            date_field=date_field, limit=limit,
+        )
+        out: List[Dict[str, Any]] = []
+        avisado = False
+        while True:
+            r = self._get("/orders/search", params)
+            r.raise_for_status()
+            data = r.json()
+            total = int((data.get("paging") or {}).get("total") or 0)
+            if total > max_offset:
+                if dt_to - dt_from > _MIN_SHARD:
+                    raise _ShardTooLarge(total)
+                if not allow_truncated:
+                    raise OrdersShardTruncated(dt_from, dt_to, total, max_offset)
+                if not avisado:
+                    log.warning("%s — resultado truncado", OrdersShardTruncated(dt_from, dt_to, total, max_offset))
+                    avisado = True
+            results = data.get("results") or []
+            out.extend(results)
+            params["offset"] = int(params["offset"]) + limit
+            if not results or len(out) >= total or params["offset"] >= max_offset:
+                break
+        return out
+
+    def search_orders_range_sharded(
+        self,
+        seller_id: str,
+        date_from_iso: str,
+        date_to_iso: str,
+        *,
+        shard: str = "day",
+        workers: int = 4,
+        checkpoint_dir: Optional[Path] = None,
+        limit: int = 50,
+        date_field: str = "date_created",
+        max_offset: int = ORDERS_MAX_OFFSET,
+        checkpoint_max_age: Optional[timedelta] = SHARD_CHECKPOINT_MAX_AGE,
+        allow_truncated: bool = False,
+        progress=None,
+    ) -> Dict[str, Any]:
+        """
+        Igual a search_orders_range, mas divide [from, to] em shards ("day" | "hour")
+        buscados em paralelo por até `workers` threads.
+          - shard que ultrapassa o offset máximo é dividido ao meio automaticamente;
+          - com checkpoint_dir, cada shard concluído é gravado em disco e
+            reaproveitado numa próxima execução (backfill retomável), desde que
+            tenha sido buscado há menos de `checkpoint_max_age` (None = sem limite);
+          - shard que continua grande demais no tamanho mínimo levanta
+            OrdersShardTruncated (allow_truncated=True: só avisa e trunca).
+        progress(done, pending, shard_from_iso, n_orders) é chamado a cada shard concluído.
+        Retorna {"results": [...], "paging": {"total": N}} (dedup por id, ordem date_created asc).
+        """
+        if shard not in _SHARD_STEPS:
+            raise ValueError(f"shard inválido: {shard} (use 'day' ou 'hour')")
+        if date_field not in ORDER_DATE_FIELDS:
+            raise ValueError(f"date_field inválido: {date_field!r} (use um de {ORDER_DATE_FIELDS})")
+        start = datetime.fromisoformat(date_from_iso)
+        end = datetime.fromisoformat(date_to_iso)
+        step = _SHARD_STEPS[shard]
+        ckpt = Path(checkpoint_dir) if checkpoint_dir else None
+        if ckpt:
+            ckpt.mkdir(parents=True, exist_ok=True)
+
+        def _ckpt_path(a: datetime, b: datetime) -> Optional[Path]:
+            if ckpt is None:
+                return None
+            return ckpt / f"{date_field}_{a:%Y%m%dT%H%M%S%z}_{b:%Y%m%dT%H%M%S%z}.json"
+
+        # bordas alinhadas (00:00 / hh:00) => shards internos estáveis entre execuções
+        shards: List[Tuple[datetime, datetime]] = []
+        a = start
+        while a < end:
+            floor = a.replace(minute=0, second=0, microsecond=0)
+            if shard == "day":
+                floor = floor.replace(hour=0)
+            b = min(floor + step, end)
+            shards.append((a, b))
+            a = b
+
+        agora = datetime.now(start.tzinfo)
+
+        def _ler_ckpt(sh: Tuple[datetime, datetime]) -> Optional[List[Dict[str, Any]]]:
+            # None => sem checkpoint utilizável (ausente, ilegível ou velho demais)
+            p = _ckpt_path(*sh)
+            if p is None or not p.exists():
+                return None
+            try:
+                data = ler_json(p)
+                idade = agora - datetime.fromisoformat(data["fetched_at"])
+            except (OSError, ValueError, KeyError, TypeError):
+                return None  # inclui checkpoints antigos, sem fetched_at
+            if checkpoint_max_age is not None and idade > checkpoint_max_age:
+                return None
+            return data.get("results") or []
+
+        done: Dict[Tuple[datetime, datetime], List[Dict[str, Any]]] = {}
+        todo: List[Tuple[datetime, datetime]] = []
+        for sh in shards:
+            cached = _ler_ckpt(sh)
+            if cached is not None:
+                done[sh] = cached
+            else:
+                todo.append(sh)
+
+        def _run(sh: Tuple[datetime, datetime]) -> List[Dict[str, Any]]:
+            return self._fetch_orders_shard(
+                seller_id, sh[0], sh[1], limit=limit, date_field=date_field, max_offset=max_offset,
+                allow_truncated=allow_truncated,
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+            running = {ex.submit(_run, sh): sh for sh in todo}
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    sh = running.pop(fut)
+                    try:
+                        results = fut.result()
+                    except _ShardTooLarge:
+                        mid = sh[0] + (sh[1] - sh[0]) / 2
+                        for half in ((sh[0], mid), (mid, sh[1])):
+                            cached = _ler_ckpt(half)
+                            if cached is not None:
+                                done[half] = cached
+                            else:
+                                running[ex.submit(_run, half)] = half
+                        continue
+                    done[sh] = results
+                    p = _ckpt_path(*sh)
+                    if p is not None:
+                        atomic_write_json(p, {
+                            "from": sh[0].isoformat(timespec="seconds"),
+                            "to": sh[1].isoformat(timespec="seconds"),
+                            "fetched_at": datetime.now(start.tzinfo).isoformat(timespec="seconds"),
+                            "results": results,
+                        }, do_backup=False)
+                    if progress:
+                        progress(len(done), len(running), sh[0].isoformat(timespec="seconds"), len(results))
+
+        # merge determinístico: shards em ordem cronológica, dedup por id (bordas inclusivas)
+        seen: Dict[Any, Dict[str, Any]] = {}
+        for sh in sorted(done):
+            for o in done[sh]:
+                oid = o.get("id")
+                seen[oid if oid is not None else id(o)] = o
+        all_results = list(seen.values())
+        return {"results": all_results, "paging": {"total": len(all_results)}}
+
     # dentro de MeliClient
     def get_item(self, mlb: str) -> dict:
         r = self._get(f"/items/{mlb}")
@@ -154,24 +390,50 @@ class MeliClient:
                 break
         return ids
 
-    def get_items_bulk(self, ids: List[str]) -> List[Dict[str, Any]]:
+    def get_items_bulk(
+        self,
+        ids: List[str],
+        *,
+        attributes: Optional[Sequence[str]] = None,
+        workers: int = 1,
+        step: int = ITEMS_BULK_MAX_IDS,
+    ) -> List[Dict[str, Any]]:
         """
         Busca detalhes dos itens em lotes via /items?ids=...
+
+        attributes: projeção (`attributes=` da API) — só esses campos vêm no body;
+                    "id" é sempre incluído.
+        workers:    lotes em paralelo (o rate limit fica a cargo do transporte).
+        A ordem do retorno segue a ordem de `ids`; itens com code != 200 são omitidos.
         """
-        out: List[Dict[str, Any]] = []
-        step = 20
-        for i in range(0, len(ids), step):
-            chunk = ids[i:i+step]
-            if not chunk:
-                continue
-            r = self._get("/items", params={"ids": ",".join(chunk)})
+        step = max(1, min(int(step), ITEMS_BULK_MAX_IDS))
+        chunks = [ids[i:i + step] for i in range(0, len(ids), step)]
+        base: Dict[str, Any] = {}
+        if attributes:
+            attrs = list(dict.fromkeys(["id", *attributes]))
+            base["attributes"] = ",".join(attrs)
+
+        def _fetch(chunk: List[str]) -> List[Dict[str, Any]]:
+            r = self._get("/items", params={**base, "ids": ",".join(chunk)})
             r.raise_for_status()
             data = r.json()
+            bodies: List[Dict[str, Any]] = []
             if isinstance(data, list):
                 for it in data:
                     body = it.get("body") if isinstance(it, dict) else None
-                    if body:
-                        out.append(body)
+                    if body and it.get("code", 200) == 200:
+                        bodies.append(body)
             elif isinstance(data, dict) and data.get("body"):
-                out.append(data["body"])
-        return out
\ No newline at end of file
+                bodies.append(data["body"])
+            return bodies
+
+        if workers <= 1 or len(chunks) <= 1:
+            parts = [_fetch(c) for c in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as ex:
+                parts = list(ex.map(_fetch, chunks))  # map preserva a ordem dos lotes
+
+        out: List[Dict[str, Any]] = []
+        for part in parts:
+            out.extend(part)
+        return out
@@ -0,0 +1,271 @@
+# app/utils/precificacao/cache.py
+"""
+Cache endereçado por conteúdo do documento de precificação em memória
+(base → preço de compra → overrides → métricas → faixas), por região.
+
+A chave é um sha256 das assinaturas (mtime_ns + tamanho) de tudo o que entra
+no documento: PP de anúncios da região, PP de produtos, mercado_livre.yaml,
+overrides.yaml e os módulos .py do domínio, mais a data de hoje (vigência
+dos overrides). Nada mudou → devolve o documento pronto; o resultado também
+é gravado em disco (DATA_DIR/precificacao/meli/<reg>/cache), então um
+restart do dashboard não paga o rebuild.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.config.paths import Regiao, ensure_dir
+from app.utils.anuncios import config as ancfg
+from app.utils.precificacao.config import (
+    get_anuncios_pp_path,
+    get_overrides_yaml_path,
+    get_precificacao_cache_dir,
+    get_produtos_pp_path,
+    get_regras_meli_yaml_path,
+    reset_overrides_cache,
+)
+from app.utils.produtos.service import get_indices as get_indices_produtos
+
+__all__ = [
+    "VERSAO_CACHE",
+    "assinatura_codigo",
+    "chave_dataset",
+    "dataset_em_cache",
+    "datasets_em_cache",
+    "invalidar_cache_dataset",
+]
+
+# suba quando o formato do documento mudar sem mudar os .py do domínio
+VERSAO_CACHE = 1
+_MANTER_EM_DISCO = 3
+
+_MEM: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+_LOCK = threading.Lock()
+
+
+def _norm_regiao(regiao: Union[Regiao, str]) -> str:
+    return regiao.value if isinstance(regiao, Regiao) else str(regiao).strip().lower()
+
+
+def _file_sig(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _entradas(reg: str) -> Dict[str, Any]:
+    """Assinaturas de todos os insumos do documento (ausente = None)."""
+    arquivos = {
+        "anuncios_pp": ancfg.PP_PATH(reg),
+        "anuncios_pp_alt": get_anuncios_pp_path(reg),
+        "produtos_pp": get_produtos_pp_path(),
+        "regras_ml": get_regras_meli_yaml_path(),
+        "overrides": get_overrides_yaml_path(),
+    }
+    out: Dict[str, Any] = {k: _file_sig(Path(p)) for k, p in arquivos.items()}
+    out["codigo"] = assinatura_codigo()
+    return out
+
+
+def assinatura_codigo() -> List[Tuple[str, Optional[Tuple[int, int]]]]:
+    """Assinaturas dos módulos .py do domínio (muda a cada deploy/edição)."""
+    codigo = Path(__file__).resolve().parent
+    return sorted((p.name, _file_sig(p)) for p in codigo.glob("*.py"))
+
+
+def chave_dataset(regiao: Union[Regiao, str]) -> str:
+    """sha256 (hex) das entradas do documento da região para hoje."""
+    reg = _norm_regiao(regiao)
+    payload = {
+        "versao": VERSAO_CACHE,
+        "regiao": reg,
+        "hoje": datetime.now().date().isoformat(),  # mesma data de overrides._hoje()
+        "entradas": _entradas(reg),
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _arquivo(reg: str, chave: str) -> Path:
+    return get_precificacao_cache_dir(reg) / f"dataset_{chave[:24]}.json"
+
+
+def _ler_disco(reg: str, chave: str) -> Optional[Dict[str, Any]]:
+    p = _arquivo(reg, chave)
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(obj, dict) or obj.get("chave") != chave:
+        return None
+    doc = obj.get("documento")
+    return doc if isinstance(doc, dict) else None
+
+
+def _gravar_disco(reg: str, chave: str, doc: Dict[str, Any]) -> None:
+    p = _arquivo(reg, chave)
+    payload = {
+        "chave": chave,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "documento": doc,
+    }
+    # JSON compacto (sem indent, ao contrário de atomic_write_json): o arquivo
+    # é só cache e a indentação custava quase o mesmo que o próprio rebuild
+    tmp = None
+    try:
+        ensure_dir(p.parent)
+        fd, tmp = tempfile.mkstemp(prefix=f".{p.name}.", suffix=".tmp", dir=p.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # dumps (encoder em C) + write: json.dump em arquivo usa o encoder em Python
+            f.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp, p)
+    except (OSError, TypeError, ValueError):
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return  # cache é best-effort: sem disco, fica só a memória
+    _podar(p.parent, manter=_MANTER_EM_DISCO)
+
+
+def _podar(pasta: Path, *, manter: int) -> None:
+    arquivos: List[Path] = sorted(
+        pasta.glob("dataset_*.json"), key=lambda x: x.stat().st_mtime, reverse=True
+    )
+    for velho in arquivos[manter:]:
+        try:
+            velho.unlink()
+        except OSError:
+            pass
+
+
+def _copia(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # cópia rasa do documento e de cada item: o chamador pode reatribuir campos
+    out = dict(doc)
+    out["itens"] = [dict(it) for it in (doc.get("itens") or [])]
+    return out
+
+
+def _consultar(reg: str, chave: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        hit = _MEM.get(reg)
+    if hit is not None and hit[0] == chave:
+        return hit[1]
+    doc = _ler_disco(reg, chave)
+    if doc is not None:
+        with _LOCK:
+            _MEM[reg] = (chave, doc)
+    return doc
+
+
+def _registrar(reg: str, chave: str, doc: Dict[str, Any]) -> None:
+    if chave_dataset(reg) != chave:
+        return  # insumo mudou durante o rebuild: não persiste
+    _gravar_disco(reg, chave, doc)
+    with _LOCK:
+        _MEM[reg] = (chave, doc)
+
+
+def _preparar_rebuild() -> None:
+    # caches de processo que não olham mtime: o rebuild tem de ler os arquivos atuais
+    reset_overrides_cache()
+    get_indices_produtos(force_refresh=True)
+
+
+def dataset_em_cache(
+    regiao: Union[Regiao, str],
+    construir: Callable[[Union[Regiao, str]], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Documento da região vindo do cache (memória → disco) ou de construir(regiao).
+
+    Num miss os caches de processo de overrides e produtos são descartados antes
+    do rebuild, para que o documento reflita os arquivos que geraram a chave.
+    Se algum insumo mudar durante o rebuild, o resultado não é persistido.
+    """
+    reg = _norm_regiao(regiao)
+    chave = chave_dataset(reg)
+    doc = _consultar(reg, chave)
+    if doc is None:
+        _preparar_rebuild()
+        doc = construir(regiao)
+        _registrar(reg, chave, doc)
+    return _copia(doc)
+
+
+def datasets_em_cache(
+    regioes: Sequence[Union[Regiao, str]],
+    construir: Callable[[Union[Regiao, str]], Dict[str, Any]],
+    *,
+    modo: str = "threads",
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    dataset_em_cache para várias regiões, na ordem pedida. As regiões sem cache
+    válido são construídas em paralelo:
+      modo="threads"   → ThreadPoolExecutor (sem custo de spawn; bom no dashboard)
+      modo="processos" → ProcessPoolExecutor (JSON + métricas sem GIL; `construir`
+                         precisa ser função de módulo, ex. service.construir_dataset_memoria)
+      modo="serial"    → uma por vez
+    Regiões repetidas são construídas uma vez. Erros sobem na ordem das regiões.
+    """
+    if modo not in ("threads", "processos", "serial"):
+        raise ValueError(f"datasets_em_cache: modo inválido: {modo!r}")
+
+    regs = [_norm_regiao(r) for r in regioes]
+    chaves: Dict[str, str] = {}
+    docs: Dict[str, Dict[str, Any]] = {}
+    faltam: List[Tuple[str, Union[Regiao, str]]] = []
+    for reg, original in zip(regs, regioes):
+        if reg in chaves:
+            continue
+        chaves[reg] = chave_dataset(reg)
+        hit = _consultar(reg, chaves[reg])
+        if hit is not None:
+            docs[reg] = hit
+        else:
+            faltam.append((reg, original))
+
+    if faltam:
+        _preparar_rebuild()
+        workers = max(1, min(len(faltam), max_workers or os.cpu_count() or 1))
+        if modo == "serial" or workers == 1:
+            construidos = [construir(orig) for _, orig in faltam]
+        else:
+            pool_cls = ProcessPoolExecutor if modo == "processos" else ThreadPoolExecutor
+            with pool_cls(max_workers=workers) as ex:
+                futs = [ex.submit(construir, orig) for _, orig in faltam]
+                construidos = [f.result() for f in futs]
+        for (reg, _), doc in zip(faltam, construidos):
+            _registrar(reg, chaves[reg], doc)
+            docs[reg] = doc
+
+    return [_copia(docs[reg]) for reg in regs]
+
+
+def invalidar_cache_dataset(regiao: Union[Regiao, str, None] = None, *, disco: bool = False) -> None:
+    """Esquece o documento em memória (uma região ou todas); disco=True apaga também os arquivos."""
+    regs = [_norm_regiao(regiao)] if regiao is not None else None
+    with _LOCK:
+        for r in (regs or list(_MEM)):
+            _MEM.pop(r, None)
+    if not disco:
+        return
+    for r in (regs or [x.value for x in Regiao]):
+        for p in get_precificacao_cache_dir(r).glob("dataset_*.json"):
+            try:
+                p.unlink()
+            except OSError:
+                pass
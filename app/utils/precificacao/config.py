@@ -22,28 +22,38 @@ class Periodo:
     mes: int
 
 _OVERRIDES_CACHE = None
+_OVERRIDES_SIG = None
 
 def reset_overrides_cache():
-    global _OVERRIDES_CACHE
+    global _OVERRIDES_CACHE, _OVERRIDES_SIG
     _OVERRIDES_CACHE = None
+    _OVERRIDES_SIG = None
 
 def get_overrides_ml() -> dict:
     """
     Carrega overrides.yaml (se existir). Retorna {} se ausente.
+    Relido automaticamente quando o arquivo muda (mtime_ns + tamanho);
+    enquanto não mudar, devolve sempre o mesmo dict (não altere).
     Chaves esperadas:
       - por_item: { <mlb|sku|gtin>: { ...*_override, vigencia?, campanha_id? } }
       - cenarios: { <nome>: { ...*_override } }
     """
-    global _OVERRIDES_CACHE
-    if _OVERRIDES_CACHE is not None:
-        return _OVERRIDES_CACHE
-    import yaml  # PyYAML
+    global _OVERRIDES_CACHE, _OVERRIDES_SIG
     p = get_overrides_yaml_path()
-    if not p.exists():
-        _OVERRIDES_CACHE = {}
+    try:
+        st = p.stat()
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    if _OVERRIDES_CACHE is not None and sig == _OVERRIDES_SIG:
         return _OVERRIDES_CACHE
-    with open(p, "r", encoding="utf-8") as f:
-        _OVERRIDES_CACHE = yaml.safe_load(f) or {}
+    if sig is None:
+        dados = {}
+    else:
+        import yaml  # PyYAML
+        with open(p, "r", encoding="utf-8") as f:
+            dados = yaml.safe_load(f) or {}
+    _OVERRIDES_CACHE, _OVERRIDES_SIG = dados, sig
     return _OVERRIDES_CACHE
 
 def _reg(reg: Union[Regiao, str]) -> str:
@@ -59,6 +69,9 @@ def get_precificacao_dataset_path(regiao: Union[Regiao, str]) -> Path:
 def get_precificacao_metrics_path(regiao: Union[Regiao, str]) -> Path:
     return get_precificacao_out_dir(regiao) / "dataset_precificacao_metrics.json"
 
+def get_precificacao_cache_dir(regiao: Union[Regiao, str]) -> Path:
+    return DATA_DIR / "precificacao" / Marketplace.MELI.value / _reg(regiao) / "cache"
+
 def get_anuncios_pp_path(regiao: Union[Regiao, str]) -> Path:
     return DATA_DIR / "marketplaces" / "meli" / "anuncios" / Camada.PP.value / f"anuncios_{_reg(regiao)}_pp.json"
 
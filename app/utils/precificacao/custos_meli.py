@@ -4,6 +4,8 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 import math
 
+from app.utils.precificacao.regras_ml import compiladas
+
 # ---------------- Utils numéricos/lookup (puros) ----------------
 
 def _to_num(v) -> Optional[float]:
@@ -24,15 +26,6 @@ def _pct(v) -> float:
     except Exception:
         return 0.0
 
-def _dig(node: Any, *path: str) -> Any:
-    cur = node
-    for k in path:
-        if isinstance(cur, dict) and k in cur:
-            cur = cur[k]
-        else:
-            return None
-    return cur
-
 def _is_full_logistic(logistic_type: str | None) -> bool:
     lt = (logistic_type or "").lower()
     return lt.startswith("fulfillment")
@@ -70,23 +63,6 @@ def calcular_comissao(preco: float | None, logistic_type: str | None, regras: Di
     return p * comissao_pct_for(logistic_type, regras)
 
 
-def _pick_faixa_por_preco(p: float, faixas: List[dict]) -> Optional[dict]:
-    """
-    Seleciona a primeira faixa onde p <= max_preco. Mantém uma faixa 'otherwise' se houver.
-    """
-    otherwise = None
-    for t in (faixas or []):
-        if t.get("otherwise"):
-            otherwise = t
-            continue
-        max_preco = _to_num(t.get("max_preco") or t.get("max") or t.get("limite") or t.get("to") or t.get("upper"))
-        if max_preco is None:
-            continue
-        if p <= max_preco:
-            return t
-    return otherwise
-
-
 def custo_fixo_full(preco: float | None, regras: Dict[str, Any]) -> float:
     """
     Custo fixo para FULL por unidade, a partir de faixas de preço declaradas em:
@@ -99,19 +75,5 @@ def custo_fixo_full(preco: float | None, regras: Dict[str, Any]) -> float:
     p = _to_num(preco)
     if p is None or p <= 0:
         return 0.0
-
-    lst = _dig(regras, "full", "custo_fixo_por_unidade_brl")
-    if isinstance(lst, list) and lst:
-        faixa = _pick_faixa_por_preco(p, lst)
-        if faixa:
-            # percentual tem precedência se existir explicitamente
-            if faixa.get("valor_pct_do_preco") is not None:
-                return float(p * _pct(faixa.get("valor_pct_do_preco")))
-            v = _to_num(faixa.get("valor") or faixa.get("value") or faixa.get("amount"))
-            if v is not None:
-                return float(v)
-        # Se não achou faixa válida, 0.0 é um fallback seguro
-        return 0.0
-
-    # Fallback: se o YAML não tiver o bloco esperado, retorna 0.0 (evita valores errados)
-    return 0.0
+    # faixas pré-compiladas (bisect); sem o bloco no YAML → otherwise = 0.0
+    return compiladas(regras).fixed_cost(p, full=True)
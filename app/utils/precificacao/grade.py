@@ -0,0 +1,211 @@
+# app/utils/precificacao/grade.py
+"""
+Grade de sensibilidade do MCP: N preços × M subsídios × K cenários de override,
+para um item ou para o catálogo inteiro, num único array denso
+(itens, cenários, preços, subsídios).
+
+Os insumos de cada cenário (percentuais, frete, custo fixo...) são extraídos
+uma vez e ficam em cache no GradeSimulador; mover um slider de preço ou de
+subsídio só refaz a aritmética vetorizada (metrics_lote.avaliar_simulacao).
+
+Cenário = knobs *_override aplicados por cima do item (o cenário vence o
+override do próprio item). "base" = item como está no dataset.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.utils.precificacao.config import get_overrides_ml
+from app.utils.precificacao.metrics_lote import ColunasSimulacao, avaliar_simulacao, preparar_simulacao
+from app.utils.precificacao.regras_ml import compiladas
+
+__all__ = [
+    "CENARIO_BASE",
+    "GradeMCP",
+    "GradeSimulador",
+    "resolver_cenarios",
+    "precos_relativos",
+    "simular_grade",
+]
+
+CENARIO_BASE = "base"
+
+Cenarios = Union[None, Mapping[str, Mapping[str, Any]], Sequence[Union[str, Tuple[str, Mapping[str, Any]]]]]
+
+
+def _knobs(d: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    return {k: v for k, v in (d or {}).items() if str(k).endswith("_override")}
+
+
+def resolver_cenarios(cenarios: Cenarios = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Normaliza cenários para [(nome, knobs)]:
+      None                      → [("base", {})]
+      {"nome": {knobs}, ...}    → knobs informados
+      ["base", "black_friday"]  → nomes; knobs de overrides.yaml → cenarios
+      [("nome", {knobs}), ...]  → pares explícitos
+    """
+    if cenarios is None:
+        return [(CENARIO_BASE, {})]
+    if isinstance(cenarios, Mapping):
+        return [(str(k), _knobs(v)) for k, v in cenarios.items()]
+
+    do_yaml = None
+    out: List[Tuple[str, Dict[str, Any]]] = []
+    for c in cenarios:
+        if isinstance(c, tuple):
+            out.append((str(c[0]), _knobs(c[1])))
+            continue
+        nome = str(c)
+        if nome == CENARIO_BASE:
+            out.append((nome, {}))
+            continue
+        if do_yaml is None:
+            do_yaml = get_overrides_ml().get("cenarios", {}) or {}
+        if nome not in do_yaml:
+            raise ValueError(f"Cenário '{nome}' não existe em overrides.yaml (cenarios).")
+        out.append((nome, _knobs(do_yaml[nome])))
+    return out
+
+
+def precos_relativos(itens: Sequence[Dict[str, Any]], fatores: Sequence[float]) -> np.ndarray:
+    """Grade (n, N) = preço efetivo (ou price) de cada item × fatores; NaN sem preço."""
+    ref = np.fromiter(
+        (_ref_preco(it) for it in itens), dtype=float, count=len(itens)
+    )
+    return ref[:, None] * np.asarray(fatores, dtype=float)[None, :]
+
+
+def _ref_preco(it: Dict[str, Any]) -> float:
+    for k in ("preco_efetivo", "price"):
+        try:
+            v = float(it.get(k))
+        except (TypeError, ValueError):
+            continue
+        if v > 0:
+            return v
+    return float("nan")
+
+
+@dataclass(frozen=True)
+class GradeMCP:
+    """Resultado denso: mcp_abs / mcp_pct com shape (itens, cenários, preços, subsídios)."""
+    mlbs: List[Optional[str]]
+    cenarios: List[str]
+    precos: np.ndarray      # (n, N)
+    subsidios: np.ndarray   # (M,)
+    mcp_abs: np.ndarray
+    mcp_pct: np.ndarray
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int]:
+        return self.mcp_abs.shape  # type: ignore[return-value]
+
+    def tabela(self, item: int = 0, cenario: Optional[str] = None) -> pd.DataFrame:
+        """Formato longo (preco, subsidio, cenario, mcp_abs, mcp_pct) de um item — p/ heatmap."""
+        ks = range(len(self.cenarios)) if cenario is None else [self.cenarios.index(cenario)]
+        n_p, n_s = self.precos.shape[1], self.subsidios.size
+        frames = []
+        for k in ks:
+            frames.append(pd.DataFrame({
+                "preco": np.repeat(self.precos[item], n_s),
+                "subsidio": np.tile(self.subsidios, n_p),
+                "cenario": self.cenarios[k],
+                "mcp_abs": self.mcp_abs[item, k].reshape(-1),
+                "mcp_pct": self.mcp_pct[item, k].reshape(-1),
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+class GradeSimulador:
+    """
+    Simulador de grades para uma lista fixa de itens. Guarda os insumos
+    preparados por cenário; trate `itens` como somente leitura.
+    """
+
+    def __init__(self, itens: Sequence[Dict[str, Any]], *, regras: Optional[dict] = None) -> None:
+        self.itens = list(itens)
+        self.regras = compiladas(regras)
+        self.mlbs: List[Optional[str]] = [it.get("mlb") for it in self.itens]
+        self._cols: Dict[Tuple[Tuple[str, str], ...], ColunasSimulacao] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    def colunas(self, knobs: Mapping[str, Any]) -> ColunasSimulacao:
+        chave = tuple(sorted((k, repr(v)) for k, v in knobs.items()))
+        with self._lock:
+            hit = self._cols.get(chave)
+        if hit is not None:
+            return hit
+        itens = self.itens if not knobs else [{**it, **knobs} for it in self.itens]
+        cols = preparar_simulacao(itens, regras=self.regras)
+        with self._lock:
+            self._cols[chave] = cols
+        return cols
+
+    def grade(
+        self,
+        precos: Sequence[float] | np.ndarray,
+        subsidios: Sequence[float] | np.ndarray = (0.0,),
+        cenarios: Cenarios = None,
+        *,
+        indices: Optional[Sequence[int]] = None,
+    ) -> GradeMCP:
+        """
+        precos: (N,) comum a todos os itens ou (n, N) por item (ver precos_relativos).
+        indices: subconjunto de itens (posições); None = todos.
+        """
+        lista = resolver_cenarios(cenarios)
+        idx = None if indices is None else np.asarray(indices, dtype=int)
+        n = len(self.itens) if idx is None else idx.size
+
+        p = np.asarray(precos, dtype=float)
+        p = np.broadcast_to(p, (n, p.size)) if p.ndim <= 1 else p
+        if p.shape[0] != n:
+            raise ValueError(f"grade: precos deve ter shape (N,) ou ({n}, N); recebido {p.shape}.")
+        s = np.atleast_1d(np.asarray(subsidios, dtype=float))
+
+        shape = (n, len(lista), p.shape[1], s.size)
+        mcp_abs = np.empty(shape)
+        mcp_pct = np.empty(shape)
+        p3 = p[:, :, None]
+        s3 = np.broadcast_to(s[None, None, :], (n, 1, s.size))
+        for k, (_nome, knobs) in enumerate(lista):
+            cols = self.colunas(knobs)
+            if idx is not None:
+                cols = _subconjunto(cols, idx)
+            res = avaliar_simulacao(cols, p3, s3, so_mcp=True)
+            mcp_abs[:, k] = res["mcp_abs"]
+            mcp_pct[:, k] = res["mcp_pct"]
+
+        mlbs = self.mlbs if idx is None else [self.mlbs[i] for i in idx]
+        return GradeMCP(mlbs=mlbs, cenarios=[c for c, _ in lista], precos=np.array(p),
+                        subsidios=s, mcp_abs=mcp_abs, mcp_pct=mcp_pct)
+
+
+def _subconjunto(cols: ColunasSimulacao, idx: np.ndarray) -> ColunasSimulacao:
+    return ColunasSimulacao(
+        n=idx.size, full=cols.full[idx], com_pct=cols.com_pct[idx], imp_pct=cols.imp_pct[idx],
+        mkt_pct=cols.mkt_pct[idx], pc=cols.pc[idx], frete=cols.frete[idx], ov_fix=cols.ov_fix[idx],
+        peso=cols.peso[idx],
+        regras=cols.regras, aplicar_em=cols.aplicar_em,
+    )
+
+
+def simular_grade(
+    itens: Sequence[Dict[str, Any]],
+    precos: Sequence[float] | np.ndarray,
+    subsidios: Sequence[float] | np.ndarray = (0.0,),
+    cenarios: Cenarios = None,
+    *,
+    regras: Optional[dict] = None,
+) -> GradeMCP:
+    """Atalho sem cache: GradeSimulador(itens).grade(...)."""
+    return GradeSimulador(itens, regras=regras).grade(precos, subsidios, cenarios)
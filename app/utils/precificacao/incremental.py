@@ -0,0 +1,126 @@
+# app/utils/precificacao/incremental.py
+"""
+Recálculo incremental de métricas por item.
+
+Cada item recebe uma impressão digital (sha256) do que entra no cálculo: os
+campos do anúncio, preço de compra/peso, knobs *_override ativos (tudo já está
+no item depois de enriquecer_preco_compra/aplicar_overrides), a versão das
+regras, o modo de preço e a assinatura do código do domínio. O resultado de
+cada MLB fica num store por etapa em DATA_DIR/precificacao/meli/<reg>/cache;
+na próxima rodada só os itens cuja impressão mudou são recalculados.
+
+O store é só um acelerador: apagá-lo (ou incremental=False) recalcula tudo.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.config.paths import Regiao, atomic_write_json
+from app.utils.precificacao.cache import assinatura_codigo
+from app.utils.precificacao.config import get_precificacao_cache_dir
+
+__all__ = [
+    "VERSAO_STORE",
+    "impressao_item",
+    "get_store_path",
+    "calcular_incremental",
+]
+
+VERSAO_STORE = 1
+
+
+def _reg(regiao: Union[Regiao, str]) -> str:
+    return regiao.value if isinstance(regiao, Regiao) else str(regiao).strip().lower()
+
+
+def get_store_path(regiao: Union[Regiao, str], etapa: str) -> Path:
+    return get_precificacao_cache_dir(_reg(regiao)) / f"incremental_{etapa}.json"
+
+
+def impressao_item(item: Dict[str, Any], contexto: str) -> str:
+    """sha256 (hex) do item de entrada + contexto (regras, modo, código)."""
+    raw = json.dumps(item, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":"))
+    h = hashlib.sha256(contexto.encode("utf-8"))
+    h.update(raw.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _contexto(etapa: str, extras: Dict[str, Any]) -> str:
+    return json.dumps(
+        {"etapa": etapa, "versao": VERSAO_STORE, "codigo": assinatura_codigo(), **extras},
+        sort_keys=True, default=str,
+    )
+
+
+def _ler_store(path: Path, contexto: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(obj, dict) or obj.get("contexto") != contexto:
+        return {}  # regras/modo/código mudaram: nada aproveitável
+    itens = obj.get("itens")
+    return itens if isinstance(itens, dict) else {}
+
+
+def _gravar_store(path: Path, contexto: str, itens: Dict[str, Dict[str, Any]]) -> None:
+    try:
+        atomic_write_json(path, {
+            "contexto": contexto,
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "itens": itens,
+        }, do_backup=False)
+    except (OSError, TypeError, ValueError):
+        pass  # best-effort: a próxima rodada recalcula
+
+
+def calcular_incremental(
+    itens: Sequence[Dict[str, Any]],
+    calcular: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+    *,
+    regiao: Union[Regiao, str],
+    etapa: str,
+    extras: Optional[Dict[str, Any]] = None,
+    incremental: bool = True,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Aplica `calcular` (lote → resultados alinhados) só aos itens com impressão
+    nova; os demais reaproveitam o resultado gravado para o mesmo MLB.
+    `extras` entra no contexto de todos os itens (ex.: versão das regras).
+
+    Retorna (resultados alinhados a `itens`, {"recalculados", "reaproveitados"}).
+    Itens sem MLB são sempre recalculados.
+    """
+    contexto = _contexto(etapa, extras or {})
+    path = get_store_path(regiao, etapa)
+    store = _ler_store(path, contexto) if incremental else {}
+
+    fps = [impressao_item(it, contexto) for it in itens]
+    out: List[Optional[Dict[str, Any]]] = [None] * len(itens)
+    pendentes: List[int] = []
+    for i, (it, fp) in enumerate(zip(itens, fps)):
+        hit = store.get(str(it.get("mlb"))) if it.get("mlb") else None
+        if hit is not None and hit.get("fp") == fp:
+            out[i] = dict(hit["res"])
+        else:
+            pendentes.append(i)
+
+    if pendentes:
+        novos = calcular([itens[i] for i in pendentes])
+        for i, res in zip(pendentes, novos):
+            out[i] = res
+
+    novo_store: Dict[str, Dict[str, Any]] = {}
+    for it, fp, res in zip(itens, fps, out):
+        if it.get("mlb"):
+            novo_store.setdefault(str(it.get("mlb")), {"fp": fp, "res": res})
+    if pendentes or len(novo_store) != len(store):
+        _gravar_store(path, contexto, novo_store)
+
+    stats = {"recalculados": len(pendentes), "reaproveitados": len(itens) - len(pendentes)}
+    return out, stats  # type: ignore[return-value]
@@ -0,0 +1,100 @@
+# app/utils/precificacao/index.py
+"""
+Dataset de precificação por região indexado em memória: itens, posição por
+MLB e um GradeSimulador com os insumos já preparados.
+
+Cada região é carregada uma vez e reaproveitada enquanto o JSON não mudar
+(assinatura = mtime_ns + tamanho); regravar o dataset invalida o índice na
+próxima consulta. O simulador acompanha a versão das regras do ML: editar o
+YAML o recria na próxima consulta. Os itens são compartilhados: quem for
+alterar deve copiar.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.config.paths import Regiao
+from app.utils.precificacao.config import get_precificacao_dataset_path
+from app.utils.precificacao.grade import GradeSimulador
+from app.utils.precificacao.regras_ml import regras_ml
+
+__all__ = ["IndiceDataset", "get_indice_dataset", "invalidar_indices_dataset"]
+
+
+class IndiceDataset:
+    __slots__ = ("regiao", "itens", "por_mlb", "_sim", "_lock")
+
+    def __init__(self, regiao: str, itens: List[Dict[str, Any]]) -> None:
+        self.regiao = regiao
+        self.itens = itens
+        self.por_mlb: Dict[str, int] = {}
+        for i, it in enumerate(itens):
+            self.por_mlb.setdefault(str(it.get("mlb")), i)  # 1ª ocorrência vence (como o scan linear)
+        self._sim: Optional[GradeSimulador] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    def item(self, mlb: str) -> Optional[Dict[str, Any]]:
+        i = self.por_mlb.get(str(mlb))
+        return None if i is None else self.itens[i]
+
+    def posicoes(self, mlbs: List[str]) -> List[int]:
+        """Posições dos MLBs no dataset; ausentes geram KeyError."""
+        faltam = [m for m in mlbs if str(m) not in self.por_mlb]
+        if faltam:
+            raise KeyError(f"MLB(s) fora do dataset de {self.regiao}: {', '.join(map(str, faltam[:10]))}")
+        return [self.por_mlb[str(m)] for m in mlbs]
+
+    @property
+    def simulador(self) -> GradeSimulador:
+        """GradeSimulador dos itens com as regras vigentes (recriado se o YAML mudou)."""
+        regras = regras_ml()
+        with self._lock:
+            if self._sim is None or self._sim.regras.versao != regras.versao:
+                self._sim = GradeSimulador(self.itens, regras=regras)
+            return self._sim
+
+
+_CACHE: Dict[str, Tuple[Optional[Tuple[int, int]], IndiceDataset]] = {}
+_LOCK = threading.Lock()
+
+
+def _norm_regiao(regiao: Union[Regiao, str]) -> str:
+    return regiao.value if isinstance(regiao, Regiao) else str(regiao).strip().lower()
+
+
+def _file_sig(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_indice_dataset(regiao: Union[Regiao, str]) -> IndiceDataset:
+    """Índice do dataset da região; relê o JSON só quando o arquivo mudou."""
+    reg = _norm_regiao(regiao)
+    path = get_precificacao_dataset_path(reg)
+    sig = _file_sig(path)
+    with _LOCK:
+        hit = _CACHE.get(reg)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    if sig is None:
+        raise FileNotFoundError(f"Dataset de precificação ausente: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    idx = IndiceDataset(reg, doc.get("itens") or [])
+    with _LOCK:
+        _CACHE[reg] = (sig, idx)
+    return idx
+
+
+def invalidar_indices_dataset() -> None:
+    with _LOCK:
+        _CACHE.clear()
@@ -2,9 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional, Tuple
 import math
-import yaml
 
-from app.utils.precificacao.config import get_regras_meli_yaml_path
+from app.utils.precificacao.regras_ml import RegrasML, compiladas, regras_ml
 
 
 # =========================
@@ -40,26 +39,28 @@ def clamp_percent(x: Optional[float]) -> Optional[float]:
 
 
 def _num(x, default=None):
+    """float(x) ou `default`; NaN (célula vazia vinda do pandas) conta como ausente, como em _to_num."""
     if x is None:
         return default
     try:
-        return float(x)
+        v = float(x)
     except (TypeError, ValueError):
         return default
+    return default if math.isnan(v) else v
 
 
 # =========================
 # Leitura de regras (YAML)
 # =========================
 
-def carregar_regras_ml() -> dict:
+def carregar_regras_ml() -> RegrasML:
     """
-    Carrega o arquivo de regras do ML (tiers de FULL, comissões, defaults, etc.)
+    Regras do ML (tiers de FULL, comissões, defaults, etc.) já compiladas.
+    Lidas do YAML uma vez e recarregadas só quando o arquivo muda;
+    o objeto é somente leitura e se comporta como o dict do YAML.
     Mantém este módulo puro (sem depender de service.py).
     """
-    yaml_path = get_regras_meli_yaml_path()
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    return regras_ml()
 
 
 # =========================
@@ -78,28 +79,13 @@ def custo_fixo_full(preco: float | None, regras: dict) -> float:
     """
     Retorna o custo fixo FULL (R$) de acordo com faixas do YAML:
       full.custo_fixo_por_unidade_brl: [{max_preco, valor}, ..., {otherwise: true, valor}]
+    Lookup por bisect nas faixas pré-compiladas (ver regras_ml).
     """
-    tiers = (regras or {}).get("full", {}).get("custo_fixo_por_unidade_brl", []) or []
     try:
         p = float(preco)
     except (TypeError, ValueError):
         return 0.0
-
-    for t in tiers:
-        if "max_preco" in t and t["max_preco"] is not None:
-            try:
-                if p <= float(t["max_preco"]) + 1e-9:
-                    return float(t.get("valor", 0.0))
-            except (TypeError, ValueError):
-                continue
-
-    for t in tiers:
-        if t.get("otherwise"):
-            try:
-                return float(t.get("valor", 0.0))
-            except (TypeError, ValueError):
-                return 0.0
-    return 0.0
+    return compiladas(regras).fixo_full.valor(p)
 
 
 # =========================
@@ -272,9 +258,10 @@ def calcular_metricas_item(item: dict, *args, **kwargs) -> dict:
     # Helpers de override
     def _num_or_none(x):
         try:
-            return float(x)
+            v = float(x)
         except Exception:
             return None
+        return None if math.isnan(v) else v
 
     def _pick_override(d: dict, key_base: str):
         """Ex.: key_base='comissao_pct' -> usa d['comissao_pct_override'] se existir."""
@@ -373,7 +360,13 @@ def calcular_metricas_item(item: dict, *args, **kwargs) -> dict:
         fixo_val = 0.0
         fixo_origem = "nao_full"
 
-    # --- 9) MCP (usando percentuais AJUSTADOS e fixo FULL já decidido) ---
+    # --- 8b) Custo ML do não FULL: faixa nao_full / frete grátis (peso × preço) ---
+    # mesmos trechos que precos_min_max resolve; None = frete com peso desconhecido
+    custo_nf = None
+    if not _is_full_item(item) and pe is not None:
+        custo_nf = compiladas(regras).non_full_cost(pe, item.get("peso_kg"))
+
+    # --- 9) MCP (usando percentuais AJUSTADOS e custos de ML já decididos) ---
     res = mcp(
         preco_venda_efetivo=pe,
         preco_compra=preco_compra,
@@ -381,8 +374,10 @@ def calcular_metricas_item(item: dict, *args, **kwargs) -> dict:
         comissao_pct=comissao_pct_eff,
         imposto_pct=imposto_pct_eff,
         marketing_pct=marketing_pct_eff,
-        custo_fixo_full=fixo_val,
+        custo_fixo_full=fixo_val + (custo_nf or 0.0),
     )
+    if not _is_full_item(item) and pe is not None and custo_nf is None and not res.get("null_reasons"):
+        res = {"mcp_abs": None, "mcp_pct": None, "null_reasons": ["frete_gratis_sem_peso"]}
 
     # --- 10) Saída padronizada ---
     out = {
@@ -404,6 +399,7 @@ def calcular_metricas_item(item: dict, *args, **kwargs) -> dict:
         # controles
         "custo_fixo_full": fixo_val if _is_full_item(item) else None,
         "custo_fixo_full_origem": fixo_origem,
+        "custo_ml_nao_full": custo_nf,
         "frete_sobre_custo": frete_val,
 
         # subsídio em valor e taxa
@@ -442,20 +438,20 @@ def aplicar_metricas_no_documento(documento: Dict[str, Any], *,
                                   regras: dict | None = None,
                                   only_full: bool = False,
                                   use_rebate_as_price: bool = True) -> Dict[str, Any]:
+    # import tardio: metrics_lote depende deste módulo
+    from app.utils.precificacao.metrics_lote import calcular_metricas_lote
+
     if regras is None:
         regras = carregar_regras_ml()
 
     itens_in = documento.get("itens") or []
-    itens_out: List[Dict[str, Any]] = []
-
-    for it in itens_in:
-        if only_full and not _is_full_item(it):
-            itens_out.append(dict(it))
-            continue
-        calc = calcular_metricas_item(it, regras=regras, use_rebate_as_price=use_rebate_as_price)
-        merged = dict(it)
-        merged.update(calc)
-        itens_out.append(merged)
+    alvo = [i for i, it in enumerate(itens_in) if not only_full or _is_full_item(it)]
+    calcs = calcular_metricas_lote([itens_in[i] for i in alvo], regras=regras,
+                                   considerar_rebate=use_rebate_as_price)
+
+    itens_out: List[Dict[str, Any]] = [dict(it) for it in itens_in]
+    for i, calc in zip(alvo, calcs):
+        itens_out[i].update(calc)
 
     doc2 = dict(documento)
     doc2["itens"] = itens_out
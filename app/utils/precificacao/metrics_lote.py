@@ -0,0 +1,454 @@
+# app/utils/precificacao/metrics_lote.py
+"""
+Motor vetorizado (NumPy) de métricas de precificação para o catálogo inteiro.
+
+Mesmas regras de `metrics.calcular_metricas_item` e `simulator.simular_mcp_item`,
+mas com os campos dos itens extraídos uma única vez para colunas e toda a
+aritmética (preço efetivo, comissão/imposto/marketing, faixas de custo fixo
+FULL, alocação do subsídio e MCP) feita por array. A ordem das operações
+de ponto flutuante é a mesma do caminho por item, então os resultados batem
+bit a bit com ele (e, portanto, no centavo).
+
+Convenção interna: NaN nas colunas = valor ausente/inválido (None no item).
+NaN na entrada (ex.: documento vindo de um DataFrame) também é ausente nos dois
+caminhos (ver metrics._num), então a convenção não perde informação.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .metrics import _is_full_item, _num, _pct, carregar_regras_ml
+from .regras_ml import _num as _num_regras
+from .regras_ml import compiladas
+
+__all__ = [
+    "custo_fixo_full_lote",
+    "calcular_metricas_lote",
+    "simular_mcp_lote",
+    "ColunasSimulacao",
+    "preparar_simulacao",
+    "avaliar_simulacao",
+]
+
+_NAN = float("nan")
+_CAMPOS_SUBSIDIO = ("comissao", "marketing", "imposto")
+
+
+# =========================
+# Extração de colunas
+# =========================
+
+def _f(x: Any) -> float:
+    """metrics._num(x), com NaN no lugar de None (NaN na entrada = ausente)."""
+    v = _num(x)
+    return _NAN if v is None else v
+
+
+def _fin(x: Any) -> float:
+    """Número finito (bool não conta) ou NaN — mesma semântica de metrics._to_num."""
+    if x is None or isinstance(x, bool):
+        return _NAN
+    try:
+        v = float(x)
+    except Exception:
+        return _NAN
+    return v if math.isfinite(v) else _NAN
+
+
+def _peso(x: Any) -> float:
+    """Peso (kg) como RegrasML.freight o lê, com NaN no lugar de None."""
+    v = _num_regras(x)
+    return _NAN if v is None else v
+
+
+def _col(itens: Sequence[Dict[str, Any]], key: str, conv=_f) -> np.ndarray:
+    return np.fromiter((conv(it.get(key)) for it in itens), dtype=float, count=len(itens))
+
+
+def _first(*cols: np.ndarray) -> np.ndarray:
+    """Coalesce: primeira coluna não-NaN, posição a posição."""
+    out = cols[0]
+    for c in cols[1:]:
+        out = np.where(np.isnan(out), c, out)
+    return out
+
+
+def _opt(arr: np.ndarray, ok: np.ndarray) -> List[Optional[float]]:
+    """Array → lista de floats Python, com None onde ~ok."""
+    vals = arr.tolist()
+    return [v if k else None for v, k in zip(vals, ok.tolist())]
+
+
+def _nan0(a: np.ndarray) -> np.ndarray:
+    """NaN → 0.0 preservando ±inf (np.nan_to_num trocaria inf por float max)."""
+    a = np.asarray(a, dtype=float)
+    return np.where(np.isnan(a), 0.0, a)
+
+
+def _clip01(x: np.ndarray) -> np.ndarray:
+    return np.clip(x, 0.0, 1.0)
+
+
+def _max0(x: np.ndarray) -> np.ndarray:
+    """max(0.0, x) do Python: NaN vira 0.0 (np.maximum propagaria o NaN)."""
+    return np.where(x > 0.0, x, 0.0)
+
+
+# =========================
+# Regras (escalares do YAML)
+# =========================
+
+def custo_fixo_full_lote(precos: np.ndarray, regras: dict) -> np.ndarray:
+    """Versão vetorizada de metrics.custo_fixo_full (NaN = sem preço → 0.0)."""
+    p = np.asarray(precos, dtype=float)
+    out = compiladas(regras).fixed_cost_array(p, full=True)
+    out[np.isnan(p)] = 0.0
+    return out
+
+
+def _aplicar_em(regras: dict) -> List[str]:
+    default = (regras or {}).get("default", {}) or {}
+    aplicar_em = default.get("aplicar_subsidio_em") or ["comissao"]
+    if isinstance(aplicar_em, str):
+        aplicar_em = [aplicar_em]
+    return aplicar_em
+
+
+def _alocar_subsidio(rem: np.ndarray, c: np.ndarray, m: np.ndarray, i: np.ndarray,
+                     ordem: Sequence[str]):
+    """
+    Mesma alocação sequencial de _alocar_subsidio_sobre_taxas, por array:
+    sem dedução onde o subsídio acabou (o `break` do escalar) e min(rem, base)
+    do Python, que devolve rem quando a base é NaN (preço infinito × 0%).
+    """
+    bases = {"comissao": c, "marketing": m, "imposto": i}
+    alloc = {k: np.zeros_like(rem) for k in _CAMPOS_SUBSIDIO}
+    for campo in ordem:
+        if campo not in bases:
+            continue
+        base = bases[campo]
+        ded = np.where(rem > 0, np.where(base < rem, base, rem), 0.0)
+        bases[campo] = bases[campo] - ded
+        rem = rem - ded
+        alloc[campo] = alloc[campo] + ded
+    return bases["comissao"], bases["marketing"], bases["imposto"], alloc
+
+
+# =========================
+# Métricas do documento (equivale a calcular_metricas_item)
+# =========================
+
+def calcular_metricas_lote(
+    itens: Sequence[Dict[str, Any]],
+    *,
+    regras: Optional[dict] = None,
+    considerar_rebate: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Calcula as métricas de todos os itens de uma vez.
+    Retorna, na ordem de `itens`, os mesmos dicts que calcular_metricas_item
+    devolveria item a item (o chamador faz o merge, como antes).
+    """
+    n = len(itens)
+    if n == 0:
+        return []
+    regras = regras or carregar_regras_ml()
+    default = (regras or {}).get("default", {}) or {}
+    cfg_comissao = (regras or {}).get("comissao", {}) or {}
+    aplicar_em = _aplicar_em(regras)
+
+    full = np.fromiter((_is_full_item(it) for it in itens), dtype=bool, count=n)
+
+    # --- preço efetivo + subsídio ---
+    price = _col(itens, "price")
+    rebate = _col(itens, "rebate_price_discounted")  # "" → NaN, como no escalar
+    if considerar_rebate:
+        pe = np.where(np.isnan(rebate), price, rebate)
+    else:
+        pe = price
+    pe_ok = ~np.isnan(pe) & (pe > 0)
+    pe = np.where(pe_ok, pe, _NAN)
+
+    subs_ok = (considerar_rebate & ~np.isnan(price) & ~np.isnan(rebate)
+               & (price > 0) & (rebate < price))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        subs_valor = np.where(subs_ok, _max0(price - rebate), _NAN)
+        subs_tx = np.where(subs_ok, _max0(1.0 - rebate / price), _NAN)
+
+    # --- percentuais brutos (override > item > YAML) ---
+    com_full = _pct(cfg_comissao.get("full") or cfg_comissao.get("fulfillment")
+                    or cfg_comissao.get("classico_pct") or default.get("comissao_pct"))
+    com_seller = _pct(cfg_comissao.get("seller") or cfg_comissao.get("classico_pct")
+                      or default.get("comissao_pct"))
+    com_yaml = np.where(full, min(1.0, max(0.0, com_full)), min(1.0, max(0.0, com_seller)))
+
+    def _pct_col(key: str, fallback) -> np.ndarray:
+        return _clip01(_first(_col(itens, f"{key}_override"), _clip01(_col(itens, key, _fin)), fallback))
+
+    comissao_pct = _pct_col("comissao_pct", com_yaml)
+    imposto_pct = _pct_col("imposto_pct", np.full(n, _clip01(_pct(default.get("imposto_pct")))))
+    marketing_pct = _pct_col("marketing_pct", np.full(n, _clip01(_pct(default.get("marketing_pct")))))
+
+    # --- frete (override > campos do item > % sobre custo) ---
+    pc_fin = _col(itens, "preco_compra", _fin)
+    fr_default = _nan0(pc_fin) * _pct(default.get("frete_pct_sobre_custo"))
+    frete = _first(
+        _col(itens, "frete_full_override"),
+        _col(itens, "frete_sobre_custo_override"),
+        _col(itens, "frete_full", _fin),
+        _col(itens, "frete_sobre_custo", _fin),
+        fr_default,
+    )
+
+    # --- custos variáveis brutos e subsídio ---
+    with np.errstate(invalid="ignore"):
+        com_b = comissao_pct * pe
+        imp_b = imposto_pct * pe
+        mkt_b = marketing_pct * pe
+    zero = np.zeros(n)
+    c0 = np.where(pe_ok, com_b, zero)
+    m0 = np.where(pe_ok, mkt_b, zero)
+    i0 = np.where(pe_ok, imp_b, zero)
+    aloca = pe_ok & subs_ok & (subs_valor > 0)
+    rem = np.where(aloca, np.maximum(0.0, _nan0(subs_valor)), zero)
+    c_adj, m_adj, i_adj, alloc = _alocar_subsidio(rem, c0, m0, i0, aplicar_em)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        com_eff = np.where(pe_ok, c_adj / pe, zero)
+        mkt_eff = np.where(pe_ok, m_adj / pe, zero)
+        imp_eff = np.where(pe_ok, i_adj / pe, zero)
+
+    # --- custo fixo FULL (override > faixa do YAML) ---
+    ov_fix = _col(itens, "custo_fixo_full_override")
+    fixo_yaml = np.where(pe_ok, custo_fixo_full_lote(pe, regras), zero)
+    fixo = np.where(full, np.where(np.isnan(ov_fix), fixo_yaml, ov_fix), zero)
+    origem = np.where(full, np.where(np.isnan(ov_fix), "yaml", "override"), "nao_full")
+
+    # --- custo ML do não FULL: faixa nao_full / frete grátis (NaN = peso desconhecido) ---
+    nf = ~full & pe_ok
+    custo_nf = np.where(nf, compiladas(regras).non_full_cost_array(pe, _col(itens, "peso_kg", _peso)), _NAN)
+    nf_ok = nf & ~np.isnan(custo_nf)
+    fixo_ml = np.where(full, fixo, np.where(nf_ok, custo_nf, zero))
+
+    # --- MCP ---
+    pc = _col(itens, "preco_compra")
+    pc_ok = ~np.isnan(pc) & (pc >= 0)
+    ok = pe_ok & pc_ok & (full | nf_ok)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ct_base = pc + _nan0(frete) + fixo_ml
+        perc = _clip01(com_eff) * pe + _clip01(imp_eff) * pe + _clip01(mkt_eff) * pe
+        m_abs = pe - (ct_base + perc)
+        m_pct = m_abs / pe
+
+    # --- saída no mesmo formato do caminho por item ---
+    pe_l = _opt(pe, pe_ok)
+    m_abs_l, m_pct_l = _opt(m_abs, ok), _opt(m_pct, ok)
+    c_l, m_l, i_l = _opt(c_adj, pe_ok), _opt(m_adj, pe_ok), _opt(i_adj, pe_ok)
+    cb_l, mb_l, ib_l = _opt(com_b, pe_ok), _opt(mkt_b, pe_ok), _opt(imp_b, pe_ok)
+    ce_l, me_l, ie_l = com_eff.tolist(), mkt_eff.tolist(), imp_eff.tolist()
+    fixo_l = _opt(fixo, full)
+    origem_l = origem.tolist()
+    custo_nf_l = _opt(custo_nf, nf_ok)
+    frete_l = frete.tolist()
+    sv_l, st_l = _opt(subs_valor, subs_ok), _opt(subs_tx, subs_ok)
+    al_c, al_m, al_i = (alloc[k].tolist() for k in _CAMPOS_SUBSIDIO)
+    pe_ok_l, pc_ok_l, nf_ok_l = pe_ok.tolist(), pc_ok.tolist(), (full | nf_ok).tolist()
+
+    out: List[Dict[str, Any]] = []
+    for j in range(n):
+        rec = {
+            "preco_efetivo": pe_l[j],
+            "mcp_abs": m_abs_l[j],
+            "mcp_pct": m_pct_l[j],
+            "mcp": m_pct_l[j],
+            "imposto": i_l[j],
+            "marketing": m_l[j],
+            "comissao": c_l[j],
+            "imposto_pct": ie_l[j],
+            "marketing_pct": me_l[j],
+            "comissao_pct": ce_l[j],
+            "custo_fixo_full": fixo_l[j],
+            "custo_fixo_full_origem": origem_l[j],
+            "custo_ml_nao_full": custo_nf_l[j],
+            "frete_sobre_custo": frete_l[j],
+            "subsidio_ml_valor": sv_l[j],
+            "subsidio_ml_taxa": st_l[j],
+            "comissao_bruta": cb_l[j],
+            "marketing_bruta": mb_l[j],
+            "imposto_bruta": ib_l[j],
+            "subsidio_alocado": {"comissao": al_c[j], "marketing": al_m[j], "imposto": al_i[j]},
+            "aplicar_subsidio_em": aplicar_em,
+        }
+        if not pe_ok_l[j]:
+            rec["mcp_null_reasons"] = ["preco_venda_invalido"]
+        elif not pc_ok_l[j]:
+            rec["mcp_null_reasons"] = ["preco_compra_invalido"]
+        elif not nf_ok_l[j]:
+            rec["mcp_null_reasons"] = ["frete_gratis_sem_peso"]
+        out.append(rec)
+    return out
+
+
+# =========================
+# Simulação (equivale a simular_mcp_item)
+# =========================
+
+def _is_full_sim(it: Dict[str, Any]) -> bool:
+    lt = (it.get("logistic_type") or "").strip().lower()
+    return lt.startswith("fulfillment") or bool(it.get("is_full"))
+
+
+def _or(x: np.ndarray, fallback) -> np.ndarray:
+    """Semântica de `x or fallback` do escalar: NaN (None) e 0.0 caem no fallback."""
+    return np.where(np.isnan(x) | (x == 0.0), fallback, x)
+
+
+def _por_item(v, n: int) -> np.ndarray:
+    a = np.asarray(v, dtype=float)
+    if a.ndim == 0:
+        return np.full(n, float(a))
+    if a.shape[0] != n:
+        raise ValueError(f"simular_mcp_lote: eixo 0 deve ter {n} itens (recebido {a.shape}).")
+    return a
+
+
+def _pad(a: np.ndarray, ndim: int) -> np.ndarray:
+    return a.reshape(a.shape + (1,) * (ndim - a.ndim))
+
+
+class ColunasSimulacao:
+    """
+    Insumos por item da simulação, já extraídos e resolvidos (overrides > item
+    > YAML). Independem de preço/subsídio: prepare uma vez e avalie quantas
+    grades quiser com avaliar_simulacao.
+    """
+    __slots__ = ("n", "full", "com_pct", "imp_pct", "mkt_pct", "pc", "frete", "ov_fix", "peso",
+                 "regras", "aplicar_em")
+
+    def __init__(self, **cols: Any) -> None:
+        for k in self.__slots__:
+            setattr(self, k, cols[k])
+
+
+def preparar_simulacao(itens: Sequence[Dict[str, Any]], *, regras: Optional[dict] = None) -> ColunasSimulacao:
+    n = len(itens)
+    regras = compiladas(regras or carregar_regras_ml())
+    default = (regras or {}).get("default", {}) or {}
+    cfg_comissao = (regras or {}).get("comissao", {}) or {}
+
+    full = np.fromiter((_is_full_sim(it) for it in itens), dtype=bool, count=n)
+    com_base = np.where(
+        full,
+        float(cfg_comissao.get("full") or cfg_comissao.get("fulfillment")
+              or cfg_comissao.get("classico_pct") or default.get("comissao_pct") or 0.0),
+        float(cfg_comissao.get("seller") or cfg_comissao.get("classico_pct")
+              or default.get("comissao_pct") or 0.0),
+    )
+    com_pct = _clip01(_first(_col(itens, "comissao_pct_override"),
+                             _or(_col(itens, "comissao_pct", _fin), com_base)))
+    imp_pct = _clip01(_first(_col(itens, "imposto_pct_override"),
+                             _or(_col(itens, "imposto_pct", _fin), float(default.get("imposto_pct") or 0.0))))
+    mkt_pct = _clip01(_first(_col(itens, "marketing_pct_override"),
+                             _or(_col(itens, "marketing_pct", _fin), float(default.get("marketing_pct") or 0.0))))
+
+    pc = _col(itens, "preco_compra", _fin)
+    frete = _first(
+        _col(itens, "frete_full_override"),
+        _col(itens, "frete_sobre_custo_override"),
+        _col(itens, "frete_full", _fin),
+        _col(itens, "frete_sobre_custo", _fin),
+        _or(pc, 0.0) * float(default.get("frete_pct_sobre_custo") or 0.0),
+    )
+    return ColunasSimulacao(
+        n=n, full=full, com_pct=com_pct, imp_pct=imp_pct, mkt_pct=mkt_pct,
+        pc=pc, frete=_or(frete, 0.0), ov_fix=_col(itens, "custo_fixo_full_override"),
+        peso=_col(itens, "peso_kg", _peso), regras=regras, aplicar_em=_aplicar_em(regras),
+    )
+
+
+def avaliar_simulacao(cols: ColunasSimulacao, preco_venda, subsidio_valor=0.0, *,
+                      so_mcp: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Aritmética da simulação sobre colunas preparadas (ver simular_mcp_lote).
+    so_mcp=True devolve só mcp_abs/mcp_pct (grades grandes: sem decomposição
+    nem coluna de erro; mesmos valores).
+    """
+    n = cols.n
+    preco = _por_item(preco_venda, n)
+    subs = _por_item(subsidio_valor, n)
+    ndim = max(preco.ndim, subs.ndim)
+    preco, subs = _pad(preco, ndim), _pad(subs, ndim)
+    shape = np.broadcast_shapes(preco.shape, subs.shape)
+
+    def _c(a: np.ndarray) -> np.ndarray:  # coluna (n,) → (n, 1, ...) para broadcast
+        return _pad(a, len(shape))
+
+    preco_b = np.broadcast_to(preco, shape)
+    com_b = _c(cols.com_pct) * preco_b
+    imp_b = _c(cols.imp_pct) * preco_b
+    mkt_b = _c(cols.mkt_pct) * preco_b
+
+    rem = np.broadcast_to(np.maximum(0.0, _nan0(subs)), shape)
+    com_r, mkt_r, imp_r, alloc = _alocar_subsidio(rem, com_b, mkt_b, imp_b, cols.aplicar_em)
+
+    ov_fix = _c(cols.ov_fix)
+    full = _c(cols.full)
+    fixo = np.where(full, np.where(np.isnan(ov_fix), custo_fixo_full_lote(preco_b, cols.regras), ov_fix), 0.0)
+    custo_nf = np.where(full, 0.0, cols.regras.non_full_cost_array(preco_b, _c(cols.peso)))
+
+    pc, frete = cols.pc, cols.frete
+    ok_preco = preco_b > 0
+    ok_pc = np.broadcast_to(_c(~np.isnan(pc)), shape)
+    ok_frete = ~np.isnan(custo_nf)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        custos = _c(pc) + _c(frete) + np.where(full, fixo, custo_nf) + com_r + mkt_r + imp_r
+        mcp_abs = preco_b - custos
+        mcp_pct = mcp_abs / preco_b
+    ok = ok_preco & ok_pc & ok_frete
+    if so_mcp:
+        return {"mcp_abs": np.where(ok, mcp_abs, _NAN), "mcp_pct": np.where(ok, mcp_pct, _NAN)}
+    error = np.where(~ok_preco, "preco_venda_invalido",
+                     np.where(~ok_pc, "preco_compra_ausente",
+                              np.where(~ok_frete, "frete_gratis_sem_peso", ""))).astype(object)
+    error[error == ""] = None
+
+    return {
+        "preco_venda": preco_b,
+        "preco_compra": np.broadcast_to(_c(pc), shape),
+        "frete": np.broadcast_to(_c(frete), shape),
+        "custo_fixo_full": fixo,
+        "custo_ml_nao_full": custo_nf,
+        "comissao_pct_bruta": np.broadcast_to(_c(cols.com_pct), shape),
+        "imposto_pct": np.broadcast_to(_c(cols.imp_pct), shape),
+        "marketing_pct": np.broadcast_to(_c(cols.mkt_pct), shape),
+        "comissao_brl": com_r,
+        "imposto_brl": imp_r,
+        "marketing_brl": mkt_r,
+        "subsidio_valor": np.broadcast_to(_nan0(subs), shape),
+        "subsidio_alocado": alloc,
+        "mcp_abs": np.where(ok, mcp_abs, _NAN),
+        "mcp_pct": np.where(ok, mcp_pct, _NAN),
+        "error": error,
+    }
+
+
+def simular_mcp_lote(
+    itens: Sequence[Dict[str, Any]],
+    preco_venda,
+    subsidio_valor=0.0,
+    *,
+    regras: Optional[dict] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Simula MCP para vários itens (e vários preços/subsídios por item) de uma vez.
+
+    preco_venda / subsidio_valor: escalar, shape (n,) ou (n, ...) — o eixo 0 é o
+    item; eixos extras (ex.: grade de preços) são broadcast contra as colunas.
+    Retorna colunas com o mesmo nome das chaves de simular_mcp_item, mais
+    "error" (None | "preco_venda_invalido" | "preco_compra_ausente" |
+    "frete_gratis_sem_peso"); onde há erro, mcp_abs/mcp_pct são NaN.
+    """
+    return avaliar_simulacao(preparar_simulacao(itens, regras=regras), preco_venda, subsidio_valor)
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from .config import get_overrides_ml  # você criará este loader no config.py
 
+__all__ = [
+    "OverrideAplicado",
+    "OverridesCompilados",
+    "compilar_overrides",
+    "overrides_compilados",
+    "resolver_override",
+    "resolver_overrides_lote",
+]
+
 
 @dataclass
 class OverrideAplicado:
@@ -18,19 +28,143 @@ def _hoje() -> date:
     return datetime.now().date()
 
 
-def _ativo(vig: Dict[str, Any], hoje: date) -> bool:
+def _intervalo(vig: Any) -> Tuple[Optional[date], Optional[date]]:
+    """
+    vigencia → [from, to] fechado (None = aberto). Mesma leniência de sempre:
+    `from` ilegível torna o override sempre ativo; `to` ilegível só abre o fim.
+    """
     if not isinstance(vig, dict):
-        return True
-    v_from = vig.get("from")
-    v_to = vig.get("to")
+        return None, None
+    v_from, v_to = vig.get("from"), vig.get("to")
+    try:
+        lo = date.fromisoformat(str(v_from)) if v_from else None
+    except Exception:
+        return None, None
     try:
-        if v_from and hoje < date.fromisoformat(str(v_from)):
-            return False
-        if v_to and hoje > date.fromisoformat(str(v_to)):
-            return False
+        hi = date.fromisoformat(str(v_to)) if v_to else None
     except Exception:
-        return True
-    return True
+        hi = None
+    return lo, hi
+
+
+def _knobs(d: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in d.items() if isinstance(k, str) and k.endswith("_override")}
+
+
+# (from, to, campanha_id, knobs)
+_Entrada = Tuple[Optional[date], Optional[date], Optional[str], Dict[str, Any]]
+
+
+class OverridesCompilados:
+    """
+    overrides.yaml pré-processado: por chave (mlb/sku/gtin, mesmo namespace),
+    os intervalos de vigência já convertidos em date. `do_dia(hoje)` achata
+    tudo num dict chave → (campanha_id, knobs) só com o que vale naquele dia;
+    resolver o catálogo vira uma consulta de hash por chave.
+
+    `por_item[chave]` aceita um dict (formato atual) ou uma lista de dicts
+    (várias campanhas); na lista, vale a primeira ativa no dia.
+    """
+    __slots__ = ("por_item", "cenarios", "_dias", "_lock")
+
+    _MAX_DIAS = 8
+
+    def __init__(self, rules: Optional[Dict[str, Any]]) -> None:
+        rules = rules if isinstance(rules, dict) else {}
+        self.por_item: Dict[Any, Tuple[_Entrada, ...]] = {}
+        for chave, data in (rules.get("por_item") or {}).items():
+            blocos = data if isinstance(data, list) else [data]
+            entradas = []
+            for b in blocos:
+                if isinstance(b, dict):
+                    lo, hi = _intervalo(b.get("vigencia", {}))
+                    entradas.append((lo, hi, b.get("campanha_id"), _knobs(b)))
+            if entradas:
+                self.por_item[chave] = tuple(entradas)
+
+        self.cenarios: Dict[str, Dict[str, Any]] = {}
+        for nome, cen in (rules.get("cenarios") or {}).items():
+            knobs = _knobs(cen) if isinstance(cen, dict) else {}
+            if knobs:
+                self.cenarios[str(nome)] = knobs
+
+        self._dias: Dict[date, Dict[Any, Tuple[Optional[str], Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.por_item)
+
+    def do_dia(self, hoje: date) -> Dict[Any, Tuple[Optional[str], Dict[str, Any]]]:
+        """Chave → (campanha_id, knobs) dos overrides por item ativos em `hoje`."""
+        with self._lock:
+            vista = self._dias.get(hoje)
+        if vista is not None:
+            return vista
+        vista = {}
+        for chave, entradas in self.por_item.items():
+            for lo, hi, campanha, knobs in entradas:
+                if (lo is None or hoje >= lo) and (hi is None or hoje <= hi):
+                    vista[chave] = (campanha, knobs)
+                    break
+        with self._lock:
+            if len(self._dias) >= self._MAX_DIAS:
+                self._dias.clear()
+            self._dias[hoje] = vista
+        return vista
+
+    def cenario(self, nome: Optional[str]) -> Optional[OverrideAplicado]:
+        knobs = self.cenarios.get(str(nome)) if nome else None
+        if not knobs:
+            return None
+        return OverrideAplicado(origem="cenario", campanha_id=str(nome), knobs=dict(knobs))
+
+    def resolver(self, mlb: str | None, sku: str | None, gtin: str | None,
+                 cenario: str | None = None, hoje: date | None = None) -> OverrideAplicado | None:
+        return self._resolver(self.do_dia(hoje or _hoje()), mlb, sku, gtin, cenario)
+
+    def resolver_lote(self, itens: Sequence[Dict[str, Any]], cenario: str | None = None,
+                      hoje: date | None = None) -> List[OverrideAplicado | None]:
+        """resolver() para cada item (chaves mlb/sku/gtin do próprio item), na ordem."""
+        vista = self.do_dia(hoje or _hoje())
+        return [
+            self._resolver(vista, it.get("mlb") or None, it.get("sku") or None, it.get("gtin") or None, cenario)
+            for it in itens
+        ]
+
+    def _resolver(self, vista, mlb, sku, gtin, cenario) -> OverrideAplicado | None:
+        if vista:
+            for key, origem in ((mlb, "mlb"), (sku, "sku"), (gtin, "gtin")):
+                if not key:
+                    continue
+                hit = vista.get(str(key))
+                if hit is not None:
+                    return OverrideAplicado(origem=origem, campanha_id=hit[0], knobs=dict(hit[1]))
+        return self.cenario(cenario)
+
+
+def compilar_overrides(rules: Optional[Dict[str, Any]]) -> OverridesCompilados:
+    return OverridesCompilados(rules)
+
+
+_COMPILADO: Tuple[Optional[dict], Optional[OverridesCompilados]] = (None, None)
+_LOCK = threading.Lock()
+
+
+def overrides_compilados() -> OverridesCompilados:
+    """
+    overrides.yaml compilado. get_overrides_ml() devolve o mesmo dict até o
+    arquivo mudar; um dict novo (arquivo editado) recompila na hora.
+    """
+    global _COMPILADO
+    rules = get_overrides_ml()
+    with _LOCK:
+        src, comp = _COMPILADO
+        if comp is not None and src is rules:
+            return comp
+    comp = compilar_overrides(rules)
+    with _LOCK:
+        _COMPILADO = (rules, comp)
+    return comp
 
 
 def resolver_override(mlb: str | None, sku: str | None, gtin: str | None,
@@ -40,24 +174,10 @@ def resolver_override(mlb: str | None, sku: str | None, gtin: str | None,
     Consulta overrides.yaml e retorna o primeiro override aplicável por prioridade:
       mlb > sku > gtin > cenario. Retorna None se nada se aplica.
     """
-    rules = get_overrides_ml()
-    hoje = hoje or _hoje()
-
-    # 1) por_item (prioridade)
-    por_item = rules.get("por_item", {})
-    for key, origem in ((mlb, "mlb"), (sku, "sku"), (gtin, "gtin")):
-        if not key:
-            continue
-        data = por_item.get(str(key))
-        if isinstance(data, dict) and _ativo(data.get("vigencia", {}), hoje):
-            knobs = {k: v for k, v in data.items() if k.endswith("_override")}
-            return OverrideAplicado(origem=origem, campanha_id=data.get("campanha_id"), knobs=knobs)
-
-    # 2) cenario
-    if cenario:
-        cen = rules.get("cenarios", {}).get(str(cenario), {})
-        knobs = {k: v for k, v in cen.items() if k.endswith("_override")}
-        if knobs:
-            return OverrideAplicado(origem="cenario", campanha_id=str(cenario), knobs=knobs)
-
-    return None
+    return overrides_compilados().resolver(mlb, sku, gtin, cenario=cenario, hoje=hoje)
+
+
+def resolver_overrides_lote(itens: Sequence[Dict[str, Any]], cenario: str | None = None,
+                            hoje: date | None = None) -> List[OverrideAplicado | None]:
+    """resolver_override para o catálogo inteiro num dia (um único snapshot do YAML)."""
+    return overrides_compilados().resolver_lote(itens, cenario=cenario, hoje=hoje)
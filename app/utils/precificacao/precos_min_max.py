@@ -1,8 +1,13 @@
 # C:\Apps\Datahive\app\utils\precificacao\precos_min_max.py
 from __future__ import annotations
-from typing import Any, Dict, Optional
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from app.utils.precificacao.metrics import custo_fixo_full  # tier FULL (quando não há override)
+import numpy as np
+
+from app.utils.precificacao.regras_ml import RegrasML, compiladas
+
+__all__ = ["precos_min_max", "precos_min_max_lote", "resolver_precos_alvo"]
 
 # -----------------------------
 # Helpers
@@ -90,54 +95,120 @@ def _frete_sobre_custo(item: Dict[str, Any], regras: Dict[str, Any]) -> float:
     return float(v or 0.0)
 
 # -----------------------------
-# Resolver preço dado um MCP-alvo
+# Segmentos da função de custo
 # -----------------------------
-def _resolver_preco_por_mcp_alvo(
-    preco_compra: float,
-    alvo_mcp: float,
-    regras: Dict[str, Any],
-    item: Dict[str, Any],
-    max_iter: int = 6,
-) -> Optional[float]:
-    """
-    MCP = P - [preco_compra + frete + fixo(P) + (imposto+marketing+COMISSAO_BRUTA)*P]
-    alvo_mcp = MCP/P  =>  (k - alvo_mcp)*P = base + fixo(P),   com k = 1 - sum_pcts
+# O custo de ML por unidade é constante por trechos do preço P:
+#   FULL:     fixo(P) = faixa de full.custo_fixo_por_unidade_brl
+#   não FULL: P < threshold → faixa de nao_full.custo_fixo_por_unidade_brl
+#             P >= threshold → frete grátis da tabela (banda de preço × peso)
+# Em cada trecho: custo = C + Q*P (Q = valor_pct_do_preco), e
+#   MCP(P)/P >= alvo  <=>  (k - Q - alvo) * P >= base + C,   k = 1 - soma_pcts
+# então a raiz de cada trecho é fechada; vale a menor raiz (ou início de
+# trecho) que cai dentro do próprio trecho. Preços em centavos inteiros.
 
-    Observações:
-    - Só aplicável a FULL.
-    - **Não** inclui subsídio nas metas.
-    - Se houver `custo_fixo_full_override`, ele é usado como fixo constante.
-    """
-    if not _is_full(item):
-        return None
+_INF = math.inf
 
-    sum_pcts = _sum_pcts_para_faixas(regras, item)   # já considera overrides
-    k = 1.0 - sum_pcts
-    if k - alvo_mcp <= 0:
-        return None
 
-    frete = _frete_sobre_custo(item, regras)
-    base = preco_compra + frete
+def _cent_fim(lim: float) -> float:
+    """Último centavo de um trecho fechado à direita (P <= lim)."""
+    return math.floor(lim * 100 + 1e-6)
+
 
-    # Se houver fixo override, a equação vira linear (não depende de P)
-    fixo_ovr = _pick_override(item, "custo_fixo_full")
-    if fixo_ovr is not None:
-        p = (base + float(fixo_ovr)) / (k - alvo_mcp)
-        return round(p, 2)
+def _cent_ini(lim: float) -> float:
+    """Primeiro centavo de um trecho fechado à esquerda (P >= lim)."""
+    return math.ceil(lim * 100 - 1e-6)
 
-    # Chute inicial sem fixo
-    p = base / (k - alvo_mcp)
 
-    # Itera aplicando o tier do FULL
-    for _ in range(max_iter):
-        fixo = custo_fixo_full(p, regras)  # sem override → tier por preço candidato
-        novo_p = (base + fixo) / (k - alvo_mcp)
-        if abs(novo_p - p) <= 0.01:
-            p = novo_p
+def _segmentos_faixas(faixas, ate_cent: float = _INF) -> List[Tuple[float, float, float, float, int]]:
+    """(ini_cent, fim_cent, C, Q, banda=-1) de faixas por preço, cortadas em ate_cent."""
+    out: List[Tuple[float, float, float, float, int]] = []
+    ini = 1.0  # 0,01
+    fins = [_cent_fim(l) for l in faixas.limites] + [_INF]
+    for fim, v, q in zip(fins, faixas.valores, faixas.pcts):
+        fim = min(fim, ate_cent)
+        if fim >= ini:
+            out.append((ini, fim, 0.0 if q == q else v, q if q == q else 0.0, -1))
+        ini = max(ini, fim + 1)
+        if ini > ate_cent:
             break
-        p = novo_p
+    return out
+
+
+def _segmentos(regras: RegrasML, full: bool) -> Tuple[np.ndarray, ...]:
+    if full:
+        segs = _segmentos_faixas(regras.fixo_full)
+    else:
+        tab = regras.frete_gratis
+        t_cent = _cent_ini(tab.threshold) if math.isfinite(tab.threshold) else _INF
+        segs = _segmentos_faixas(regras.fixo_nao_full, ate_cent=t_cent - 1)
+        if math.isfinite(t_cent):
+            if tab.inicios:
+                inis = [max(t_cent, _cent_ini(x)) for x in tab.inicios]
+                inis[0] = t_cent  # abaixo da 1ª banda vale a 1ª banda (como em freight)
+                fins = [x - 1 for x in inis[1:]] + [_INF]
+                segs += [(a, b, 0.0, 0.0, j) for j, (a, b) in enumerate(zip(inis, fins)) if b >= a]
+            else:
+                segs.append((t_cent, _INF, math.nan, 0.0, -1))  # frete desconhecido
+    ini, fim, c, q, banda = (np.asarray(x) for x in zip(*segs)) if segs else (np.empty(0),) * 5
+    return ini.astype(float), fim.astype(float), c.astype(float), q.astype(float), banda.astype(int)
+
+
+def resolver_precos_alvo(
+    base: np.ndarray,
+    k: np.ndarray,
+    alvo: np.ndarray,
+    *,
+    full: bool,
+    regras: Optional[dict] = None,
+    pesos_kg: Optional[np.ndarray] = None,
+    fixo_override: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Menor preço P (R$, 2 casas) com MCP(P)/P >= alvo, vetorizado por item.
+      base  = preco_compra + frete (R$)      k = 1 - soma dos percentuais
+      pesos_kg       → tabela de frete grátis (só não FULL; NaN = desconhecido)
+      fixo_override  → custo fixo constante por item (só FULL; NaN = sem override)
+    NaN quando não há preço que atinja o alvo.
+    """
+    rg = compiladas(regras)
+    base = np.asarray(base, dtype=float).reshape(-1)
+    n = base.size
+    k = np.broadcast_to(np.asarray(k, dtype=float), (n,))
+    alvo = np.broadcast_to(np.asarray(alvo, dtype=float), (n,))
+    ini, fim, c, q, banda = _segmentos(rg, full)
+    if n == 0 or ini.size == 0:
+        return np.full(n, np.nan)
+
+    C = np.broadcast_to(c, (n, ini.size)).copy()
+    Q = np.broadcast_to(q, (n, ini.size)).copy()
+    fr = banda >= 0
+    if fr.any():
+        w = np.full(n, np.nan) if pesos_kg is None else np.asarray(pesos_kg, dtype=float).reshape(-1)
+        C[:, fr] = rg.frete_gratis.por_banda(w)[:, banda[fr]]
+    if full and fixo_override is not None:
+        ov = np.asarray(fixo_override, dtype=float).reshape(-1)
+        tem = ~np.isnan(ov)
+        C[tem] = ov[tem, None]
+        Q[tem] = 0.0
+
+    d = k[:, None] - Q - alvo[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raiz = (base[:, None] + C) / d
+        raiz_c = np.round(raiz * 100)
+    cand = np.maximum(raiz_c, ini)
+    ok = (d > 0) & np.isfinite(raiz) & (cand <= fim)
+    cand = np.where(ok, cand, np.inf)
+
+    j = np.argmin(cand, axis=1)
+    rows = np.arange(n)
+    best = cand[rows, j]
+    out = np.full(n, np.nan)
+    for i in np.flatnonzero(np.isfinite(best)):
+        r = raiz[i, j[i]]
+        # raiz dentro do trecho → round(P, 2) (mesmo arredondamento de antes); senão início do trecho
+        out[i] = round(float(r), 2) if raiz_c[i, j[i]] >= ini[j[i]] else ini[j[i]] / 100
+    return out
 
-    return round(p, 2)
 
 # -----------------------------
 # Público
@@ -151,15 +222,8 @@ def _clamp01(x):
         return None
     return max(0.0, min(1.0, v))
 
-def precos_min_max(item: Dict[str, Any], regras: Dict[str, Any]) -> Dict[str, Optional[float]]:
-    if not _is_full(item):
-        return {"preco_minimo": None, "preco_maximo": None}
-
-    pc = _as_float(item.get("preco_compra"))
-    if pc is None:
-        return {"preco_minimo": None, "preco_maximo": None}
 
-    default = regras.get("default") or {}
+def _metas(item: Dict[str, Any], default: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
     # 1) lê do YAML (defaults)
     mcp_min = float(default.get("mcp_min") or 0.0)
     mcp_max = float(default.get("mcp_max") or 0.0)
@@ -172,10 +236,47 @@ def precos_min_max(item: Dict[str, Any], regras: Dict[str, Any]) -> Dict[str, Op
         mcp_max = _clamp01(ov_max)
     # sanity: min <= max
     if mcp_min is None or mcp_max is None or mcp_min > mcp_max:
-        return {"preco_minimo": None, "preco_maximo": None}
+        return None, None
+    return mcp_min, mcp_max
 
-    pmin = _resolver_preco_por_mcp_alvo(pc, mcp_min, regras, item=item)
-    pmax = _resolver_preco_por_mcp_alvo(pc, mcp_max, regras, item=item)
 
-    return {"preco_minimo": pmin, "preco_maximo": pmax}
+def precos_min_max_lote(itens: Sequence[Dict[str, Any]], regras: Optional[dict] = None) -> List[Dict[str, Optional[float]]]:
+    """
+    preco_minimo / preco_maximo (metas mcp_min / mcp_max) de todos os itens,
+    FULL e não FULL, resolvidos de uma vez. Não FULL usa `peso_kg` do item
+    para a tabela de frete grátis (sem peso, só preços abaixo do threshold).
+    """
+    rg = compiladas(regras)
+    default = rg.get("default") or {}
+    out: List[Dict[str, Optional[float]]] = [{"preco_minimo": None, "preco_maximo": None} for _ in itens]
+
+    grupos: Dict[bool, List[int]] = {True: [], False: []}
+    cols: Dict[int, Tuple[float, float, float, float, float, float]] = {}
+    for i, it in enumerate(itens):
+        pc = _as_float(it.get("preco_compra"))
+        if pc is None:
+            continue
+        mcp_min, mcp_max = _metas(it, default)
+        if mcp_min is None:
+            continue
+        k = 1.0 - _sum_pcts_para_faixas(rg, it)
+        base = pc + _frete_sobre_custo(it, rg)
+        ov = _pick_override(it, "custo_fixo_full")
+        peso = _num_or_none(it.get("peso_kg"))
+        cols[i] = (base, k, mcp_min, mcp_max, math.nan if ov is None else ov, math.nan if peso is None else peso)
+        grupos[_is_full(it)].append(i)
 
+    for full, idx in grupos.items():
+        if not idx:
+            continue
+        base, k, a_min, a_max, ov, peso = (np.array(x, dtype=float) for x in zip(*(cols[i] for i in idx)))
+        kw = dict(full=full, regras=rg, pesos_kg=peso, fixo_override=ov)
+        pmin = resolver_precos_alvo(base, k, a_min, **kw)
+        pmax = resolver_precos_alvo(base, k, a_max, **kw)
+        for i, lo, hi in zip(idx, pmin.tolist(), pmax.tolist()):
+            out[i] = {"preco_minimo": None if lo != lo else lo, "preco_maximo": None if hi != hi else hi}
+    return out
+
+
+def precos_min_max(item: Dict[str, Any], regras: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    return precos_min_max_lote([item], regras)[0]
@@ -0,0 +1,392 @@
+# app/utils/precificacao/regras_ml.py
+"""
+Regras do Mercado Livre (mercado_livre.yaml) compiladas.
+
+O YAML é lido uma vez e reaproveitado enquanto o arquivo não mudar
+(assinatura = mtime_ns + tamanho). O objeto compilado (RegrasML) é imutável
+e se comporta como o dict do YAML (regras.get("default"), regras["full"]...),
+então pode ser passado em qualquer parâmetro `regras` já existente.
+
+As faixas por preço (custo fixo FULL / não FULL) e as tabelas de frete
+grátis (preço × peso) ficam pré-ordenadas em listas para bisect e em arrays
+para lookup vetorizado:
+  - fixed_cost(price, full=True)   → custo fixo por unidade (R$)
+  - freight(price, weight_kg)      → frete do vendedor no frete grátis (R$)
+
+Semântica das faixas = metrics.custo_fixo_full: vence a primeira faixa (na
+ordem do YAML) com preço <= max_preco (+1e-9); sem faixa, vale `otherwise`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.precificacao.config import get_regras_meli_yaml_path
+
+__all__ = [
+    "Faixas",
+    "RegrasML",
+    "compilar_regras",
+    "regras_ml",
+    "compiladas",
+    "invalidar_regras",
+]
+
+_EPS = 1e-9
+_CHAVES_MAX = ("max_preco", "max", "limite", "to", "upper")
+_CHAVES_VALOR = ("valor", "value", "amount")
+
+
+def _num(x: Any) -> Optional[float]:
+    if x is None or isinstance(x, bool):
+        return None
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def _pct(x: Any) -> float:
+    v = _num(x)
+    return v if (v is not None and math.isfinite(v)) else 0.0
+
+
+# =========================
+# Faixas por preço
+# =========================
+
+class Faixas:
+    """
+    Faixas [{max_preco, valor | valor_pct_do_preco}, ..., {otherwise: true, valor}]
+    já filtradas e ordenadas. `pcts[i]` NaN = valor fixo; senão valor = preço × pct.
+    O último elemento de `valores`/`pcts` é o `otherwise`.
+    """
+    __slots__ = ("limites", "valores", "pcts", "_lim_arr", "_val_arr", "_pct_arr")
+
+    def __init__(self, limites: Sequence[float], valores: Sequence[float], pcts: Sequence[float]) -> None:
+        self.limites: Tuple[float, ...] = tuple(limites)
+        self.valores: Tuple[float, ...] = tuple(valores)
+        self.pcts: Tuple[float, ...] = tuple(pcts)
+        self._lim_arr = np.asarray(self.limites, dtype=float)
+        self._val_arr = np.asarray(self.valores, dtype=float)
+        self._pct_arr = np.asarray(self.pcts, dtype=float)
+
+    @classmethod
+    def do_yaml(cls, lst: Any) -> "Faixas":
+        limites: List[float] = []
+        valores: List[float] = []
+        pcts: List[float] = []
+        otherwise: Optional[Tuple[float, float]] = None
+        for t in lst if isinstance(lst, (list, tuple)) else ():
+            if not isinstance(t, dict):
+                continue
+            if t.get("otherwise"):
+                if otherwise is None:
+                    otherwise = _valor_faixa(t) or (0.0, math.nan)
+                continue
+            lim = next((_num(t[k]) for k in _CHAVES_MAX if t.get(k) is not None), None)
+            val = _valor_faixa(t)
+            if lim is None or val is None:
+                continue
+            lim = lim + _EPS
+            # faixa que nunca casa (limite <= de uma anterior): a primeira vence
+            if limites and lim <= limites[-1]:
+                continue
+            limites.append(lim)
+            valores.append(val[0])
+            pcts.append(val[1])
+        v, p = otherwise or (0.0, math.nan)
+        return cls(limites, valores + [v], pcts + [p])
+
+    def valor(self, preco: float) -> float:
+        """Valor da faixa para um preço (NaN → otherwise)."""
+        i = len(self.limites) if preco != preco else bisect_left(self.limites, preco)
+        pct = self.pcts[i]
+        return self.valores[i] if pct != pct else float(preco * pct)
+
+    def valores_array(self, precos: np.ndarray) -> np.ndarray:
+        """Versão vetorizada de valor() (NaN → otherwise)."""
+        p = np.asarray(precos, dtype=float)
+        i = np.searchsorted(self._lim_arr, p, side="left")
+        pct = self._pct_arr[i]
+        return np.where(np.isnan(pct), self._val_arr[i], p * pct)
+
+    def __len__(self) -> int:
+        return len(self.limites)
+
+
+def _valor_faixa(t: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """(valor, pct) da faixa; pct tem precedência. None = faixa inválida (pulada)."""
+    if t.get("valor_pct_do_preco") is not None:
+        return 0.0, _pct(t.get("valor_pct_do_preco"))
+    raw = next((t[k] for k in _CHAVES_VALOR if t.get(k) is not None), 0.0)
+    v = _num(raw)
+    return None if v is None else (v, math.nan)
+
+
+# =========================
+# Frete grátis (preço × peso)
+# =========================
+
+_RE_FAIXA = re.compile(r"^\s*(>=?|<=?)?\s*(\d+(?:[.,]\d+)?)\s*(?:-\s*(\d+(?:[.,]\d+)?))?\s*$")
+
+
+def _inicio_faixa_preco(chave: str) -> Optional[float]:
+    """'79-99.99' → 79.0 ; '>200' → 200.0 ; '<79' → 0.0."""
+    m = _RE_FAIXA.match(str(chave))
+    if not m:
+        return None
+    op, a, _b = m.groups()
+    if op and op.startswith("<"):
+        return 0.0
+    return float(a.replace(",", "."))
+
+
+class _TabelaFrete:
+    __slots__ = ("threshold", "inicios", "kg", "valores", "_ini_arr", "_kg_arr", "_val_arr")
+
+    def __init__(self, cfg: Any) -> None:
+        cfg = cfg if isinstance(cfg, dict) else {}
+        thr = _num(cfg.get("threshold_preco_brl"))
+        self.threshold: float = thr if thr is not None else math.inf
+
+        bandas: List[Tuple[float, List[float], List[float]]] = []
+        tabelas = cfg.get("tabelas_por_preco")
+        for chave, linhas in (tabelas.items() if isinstance(tabelas, dict) else ()):
+            ini = _inicio_faixa_preco(chave)
+            if ini is None:
+                continue
+            pares = sorted(
+                (kg, v) for kg, v in (
+                    (_num(r.get("max_kg")), _num(r.get("valor")))
+                    for r in (linhas or []) if isinstance(r, dict)
+                ) if kg is not None and v is not None
+            )
+            bandas.append((ini, [kg for kg, _ in pares], [v for _, v in pares]))
+        bandas.sort(key=lambda b: b[0])
+
+        self.inicios: Tuple[float, ...] = tuple(b[0] for b in bandas)
+        self.kg: Tuple[Tuple[float, ...], ...] = tuple(tuple(b[1]) for b in bandas)
+        self.valores: Tuple[Tuple[float, ...], ...] = tuple(tuple(b[2]) for b in bandas)
+
+        # matrizes [banda, faixa de peso] com padding (kg=inf, valor=NaN)
+        largura = max((len(k) for k in self.kg), default=0)
+        self._ini_arr = np.asarray(self.inicios, dtype=float)
+        self._kg_arr = np.full((len(bandas), largura), np.inf)
+        self._val_arr = np.full((len(bandas), largura + 1), np.nan)
+        for b, (kgs, vals) in enumerate(zip(self.kg, self.valores)):
+            self._kg_arr[b, :len(kgs)] = kgs
+            self._val_arr[b, :len(vals)] = vals
+
+    def _banda(self, preco: float) -> int:
+        return max(0, bisect_right(self.inicios, preco) - 1)
+
+    def valor(self, preco: Optional[float], peso_kg: Optional[float]) -> Optional[float]:
+        if preco is None or not (preco >= self.threshold):
+            return 0.0
+        if not self.inicios or peso_kg is None or peso_kg != peso_kg:
+            return None
+        b = self._banda(preco)
+        i = bisect_left(self.kg[b], peso_kg)
+        return self.valores[b][i] if i < len(self.valores[b]) else None
+
+    def por_banda(self, pesos_kg: np.ndarray) -> np.ndarray:
+        """Frete de cada peso em cada banda de preço: shape (n, n_bandas); NaN fora da tabela."""
+        w = np.asarray(pesos_kg, dtype=float).reshape(-1)
+        if not self.inicios:
+            return np.empty((w.size, 0))
+        i = (self._kg_arr[None, :, :] < w[:, None, None]).sum(axis=-1)
+        v = self._val_arr[np.arange(len(self.inicios))[None, :], i]
+        v[np.isnan(w)] = np.nan
+        return v
+
+    def valores_array(self, precos: np.ndarray, pesos_kg: np.ndarray) -> np.ndarray:
+        p, w = np.broadcast_arrays(np.asarray(precos, dtype=float), np.asarray(pesos_kg, dtype=float))
+        gratis = p >= self.threshold
+        if not self.inicios:
+            return np.where(gratis, np.nan, 0.0)
+        b = np.maximum(np.searchsorted(self._ini_arr, p, side="right") - 1, 0)
+        i = (self._kg_arr[b] < w[..., None]).sum(axis=-1)
+        v = self._val_arr[b, i]
+        v = np.where(np.isnan(w), np.nan, v)
+        return np.where(gratis, v, 0.0)
+
+
+# =========================
+# Regras compiladas
+# =========================
+
+class RegrasML(Mapping):
+    """
+    Regras do ML compiladas (somente leitura). Acesso como dict ao YAML
+    original + lookups pré-computados. Os nós internos do YAML são
+    compartilhados entre chamadas: não devem ser alterados.
+    """
+    __slots__ = ("_raw", "fixo_full", "fixo_nao_full", "frete_gratis", "origem", "_versao")
+
+    def __init__(self, raw: Optional[Dict[str, Any]], origem: Optional[str] = None) -> None:
+        raw = dict(raw or {})
+        full = raw.get("full") if isinstance(raw.get("full"), dict) else {}
+        nao_full = raw.get("nao_full") if isinstance(raw.get("nao_full"), dict) else {}
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "fixo_full", Faixas.do_yaml(full.get("custo_fixo_por_unidade_brl")))
+        object.__setattr__(self, "fixo_nao_full", Faixas.do_yaml(nao_full.get("custo_fixo_por_unidade_brl")))
+        object.__setattr__(self, "frete_gratis", _TabelaFrete(nao_full.get("frete_gratis_40538")))
+        object.__setattr__(self, "origem", origem)
+        object.__setattr__(self, "_versao", None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RegrasML é imutável")
+
+    # --- Mapping (compatível com o dict do YAML) ---
+    def __getitem__(self, key: str) -> Any:
+        return self._raw[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._raw.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __repr__(self) -> str:
+        return f"RegrasML(origem={self.origem!r}, chaves={list(self._raw)})"
+
+    def __reduce__(self):
+        # pickle/deepcopy (ex.: process pool) recompilam a partir do YAML carregado
+        return (compilar_regras, (self._raw, self.origem))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self._raw)
+
+    @property
+    def versao(self) -> str:
+        """Hash (sha256, 16 hex) do conteúdo das regras — muda só se o YAML mudar."""
+        if self._versao is None:
+            raw = json.dumps(self._raw, sort_keys=True, default=str, ensure_ascii=False)
+            object.__setattr__(self, "_versao", hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16])
+        return self._versao
+
+    # --- lookups ---
+    def fixed_cost(self, price: Optional[float], *, full: bool = True) -> float:
+        """Custo fixo por unidade (R$) pela faixa de preço (FULL ou não FULL)."""
+        p = _num(price)
+        if p is None:
+            return 0.0
+        return (self.fixo_full if full else self.fixo_nao_full).valor(p)
+
+    def fixed_cost_array(self, prices: np.ndarray, *, full: bool = True) -> np.ndarray:
+        """fixed_cost vetorizado (NaN → otherwise)."""
+        return (self.fixo_full if full else self.fixo_nao_full).valores_array(prices)
+
+    def freight(self, price: Optional[float], weight_kg: Optional[float]) -> Optional[float]:
+        """
+        Frete pago pelo vendedor não FULL (frete grátis, tabela por faixa de preço × peso).
+        0.0 abaixo do threshold; None se o peso é desconhecido ou passa da tabela.
+        """
+        return self.frete_gratis.valor(_num(price), _num(weight_kg))
+
+    def freight_array(self, prices: np.ndarray, weights_kg: np.ndarray) -> np.ndarray:
+        """freight vetorizado (NaN no lugar de None)."""
+        return self.frete_gratis.valores_array(prices, weights_kg)
+
+    def non_full_cost(self, price: Optional[float], weight_kg: Optional[float]) -> Optional[float]:
+        """
+        Custo ML por unidade do vendedor não FULL: faixa de nao_full abaixo do
+        threshold de frete grátis, frete da tabela a partir dele (mesmos
+        trechos de precos_min_max). None se o frete depende de um peso desconhecido.
+        """
+        p = _num(price)
+        if p is None:
+            return 0.0
+        if p >= self.frete_gratis.threshold:
+            return self.freight(p, weight_kg)
+        return self.fixo_nao_full.valor(p)
+
+    def non_full_cost_array(self, prices: np.ndarray, weights_kg: np.ndarray) -> np.ndarray:
+        """non_full_cost vetorizado (NaN no lugar de None)."""
+        p = np.asarray(prices, dtype=float)
+        return np.where(p >= self.frete_gratis.threshold,
+                        self.freight_array(p, weights_kg), self.fixo_nao_full.valores_array(p))
+
+
+def compilar_regras(regras: Optional[Dict[str, Any]], origem: Optional[str] = None) -> RegrasML:
+    return RegrasML(regras, origem=origem)
+
+
+# =========================
+# Cache
+# =========================
+
+_LOCK = threading.Lock()
+_CACHE: Dict[str, Tuple[Optional[Tuple[int, int]], RegrasML]] = {}
+# regras passadas como dict (testes/cenários): compiladas por identidade
+_POR_ID: Dict[int, Tuple[Mapping, RegrasML]] = {}
+_POR_ID_MAX = 32
+
+
+def _file_sig(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def regras_ml(path: Optional[Path] = None) -> RegrasML:
+    """Regras do YAML, recompiladas só quando o arquivo muda."""
+    p = Path(path) if path is not None else get_regras_meli_yaml_path()
+    sig = _file_sig(p)
+    key = str(p)
+    with _LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    import yaml  # PyYAML
+    with open(p, "r", encoding="utf-8") as f:
+        compiled = compilar_regras(yaml.safe_load(f) or {}, origem=key)
+    with _LOCK:
+        _CACHE[key] = (sig, compiled)
+    return compiled
+
+
+def compiladas(regras: Optional[Mapping] = None) -> RegrasML:
+    """
+    RegrasML para um parâmetro `regras` qualquer: None → YAML (cache),
+    RegrasML → ele mesmo, dict → compilado uma vez por objeto (não mutar depois).
+    """
+    if regras is None:
+        return regras_ml()
+    if isinstance(regras, RegrasML):
+        return regras
+    k = id(regras)
+    with _LOCK:
+        hit = _POR_ID.get(k)
+        if hit is not None and hit[0] is regras:
+            return hit[1]
+    compiled = compilar_regras(dict(regras))
+    with _LOCK:
+        if len(_POR_ID) >= _POR_ID_MAX:
+            _POR_ID.clear()
+        _POR_ID[k] = (regras, compiled)  # guarda a origem: o id não é reaproveitado
+    return compiled
+
+
+def invalidar_regras() -> None:
+    with _LOCK:
+        _CACHE.clear()
+        _POR_ID.clear()
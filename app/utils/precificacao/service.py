@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import json
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Sequence, Tuple, Union
 from app.utils.precificacao.filters import is_item_full
 
 from app.utils.precificacao.simulator import simular_mcp_item
@@ -23,7 +23,6 @@ from app.utils.precificacao.config import (
     get_precificacao_metrics_path,
     get_anuncios_pp_path,
     get_produtos_pp_path,
-    get_regras_meli_yaml_path,
 )
 
 # Services adjacentes
@@ -32,6 +31,12 @@ from app.utils.produtos.service import get_indices as get_indices_produtos
 
 # Métricas/cálculos puros
 from app.utils.precificacao.metrics import calcular_metricas_item, agregar_metricas_documento
+from app.utils.precificacao.metrics_lote import calcular_metricas_lote
+from app.utils.precificacao.regras_ml import RegrasML, regras_ml
+from app.utils.precificacao.grade import Cenarios, GradeMCP, precos_relativos
+from app.utils.precificacao.index import get_indice_dataset
+from app.utils.precificacao.precos_min_max import precos_min_max_lote
+from app.utils.precificacao.incremental import calcular_incremental
 
 
 # ==== Result Sink (tolerante a layout) ====
@@ -84,15 +89,12 @@ SCRIPT_VERSION = "0.4.0"
 # Regras (exposto para metrics.py)
 # =========================
 
-def carregar_regras_ml() -> dict:
+def carregar_regras_ml() -> RegrasML:
     """
-    Lê o YAML de regras do Mercado Livre e devolve como dict.
+    Regras do Mercado Livre compiladas (cache invalidado pelo mtime do YAML).
     Mantido aqui pois metrics.py pode importar diretamente esse helper.
     """
-    import yaml  # PyYAML
-    yaml_path = get_regras_meli_yaml_path()
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    return regras_ml()
 
 
 # =========================
@@ -203,7 +205,7 @@ def construir_dataset_base(periodo_or_regiao, regiao: Union[Regiao, str, None] =
             "regiao": r,
         }
 
-        # Fora do Full: não sugerimos faixa/custo fixo
+        # Fora do Full: sem custo fixo FULL (faixa de preço vem de precos_min_max)
         if not is_item_full(item):
             item["custo_fixo_full"] = None
             item["preco_min"] = None
@@ -222,6 +224,15 @@ def construir_dataset_base(periodo_or_regiao, regiao: Union[Regiao, str, None] =
         "itens": itens,
     }
 
+def _peso_kg_produto(prod: Dict[str, Any]) -> float | None:
+    """Peso (kg) do cadastro de produtos: pesos_g.bruto > pesos_g.liq (gramas)."""
+    pesos = prod.get("pesos_g") if isinstance(prod.get("pesos_g"), dict) else {}
+    for g in (pesos.get("bruto"), prod.get("peso_bruto_g"), pesos.get("liq"), prod.get("peso_liq_g")):
+        v = _num(g)
+        if v is not None and v > 0:
+            return v / 1000.0
+    return None
+
 def enriquecer_preco_compra(documento: Dict[str, Any]) -> Dict[str, Any]:
     indices = get_indices_produtos()
     if not isinstance(indices, dict) or (not indices.get('por_gtin') and not indices.get('por_sku')):
@@ -232,14 +243,16 @@ def enriquecer_preco_compra(documento: Dict[str, Any]) -> Dict[str, Any]:
         gtin = (it.get("gtin") or "").strip() if it.get("gtin") else None
         sku = (it.get("sku") or "").strip() if it.get("sku") else None
 
-        preco_compra = None
+        prod = None
         if gtin and gtin in indices.get("por_gtin", {}):
-            preco_compra = indices["por_gtin"][gtin].get("preco_compra")
+            prod = indices["por_gtin"][gtin]
         elif sku and sku in indices.get("por_sku", {}):
-            preco_compra = indices["por_sku"][sku].get("preco_compra")
+            prod = indices["por_sku"][sku]
 
         it2 = dict(it)
-        it2["preco_compra"] = preco_compra
+        it2["preco_compra"] = prod.get("preco_compra") if prod else None
+        # peso para a tabela de frete grátis (não FULL) em precos_min_max
+        it2["peso_kg"] = _peso_kg_produto(prod) if prod else None
         it_out.append(it2)
 
     documento2 = dict(documento)
@@ -248,15 +261,10 @@ def enriquecer_preco_compra(documento: Dict[str, Any]) -> Dict[str, Any]:
 
 # --- aplica overrides.yaml aos itens do documento ---
 def aplicar_overrides_no_documento(documento: Dict[str, Any], cenario: str | None = None) -> Dict[str, Any]:
-    from app.utils.precificacao.overrides import resolver_override
+    from app.utils.precificacao.overrides import resolver_overrides_lote
+    itens = documento.get("itens") or []
     it_out: List[Dict[str, Any]] = []
-    for it in (documento.get("itens") or []):
-        ov = resolver_override(
-            mlb=(it.get("mlb") or None),
-            sku=(it.get("sku") or None),
-            gtin=(it.get("gtin") or None),
-            cenario=cenario,
-        )
+    for it, ov in zip(itens, resolver_overrides_lote(itens, cenario=cenario)):
         it2 = dict(it)
         if ov and ov.knobs:
             # derruba apenas chaves *_override; não mexe no resto
@@ -269,9 +277,10 @@ def aplicar_overrides_no_documento(documento: Dict[str, Any], cenario: str | Non
     return doc2
 
 def aplicar_metricas_no_documento(documento: Dict[str, Any], *, use_rebate_as_price: bool = True) -> Dict[str, Any]:
+    itens = documento["itens"]
+    calcs = calcular_metricas_lote(itens, regras=carregar_regras_ml(), considerar_rebate=use_rebate_as_price)
     itens_out = []
-    for it in documento["itens"]:
-        calc = calcular_metricas_item(it, use_rebate_as_price=use_rebate_as_price)
+    for it, calc in zip(itens, calcs):
         merged = dict(it)
         merged.update(calc)
         itens_out.append(merged)
@@ -281,6 +290,66 @@ def aplicar_metricas_no_documento(documento: Dict[str, Any], *, use_rebate_as_pr
     doc2["metrics"] = agregar_metricas_documento(itens_out)
     return doc2
 
+def aplicar_metricas_incremental(
+    documento: Dict[str, Any],
+    regiao: Union[Regiao, str],
+    *,
+    use_rebate_as_price: bool = True,
+    incremental: bool = True,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Igual a aplicar_metricas_no_documento, mas só recalcula itens cuja impressão
+    (anúncio + preço de compra + overrides + versão das regras) mudou desde a
+    última rodada da região. Retorna (documento, {"recalculados", "reaproveitados"}).
+    """
+    regras = carregar_regras_ml()
+    itens = documento["itens"]
+    calcs, stats = calcular_incremental(
+        itens,
+        lambda lote: calcular_metricas_lote(lote, regras=regras, considerar_rebate=use_rebate_as_price),
+        regiao=regiao,
+        etapa="metricas",
+        extras={"regras": regras.versao, "rebate": bool(use_rebate_as_price)},
+        incremental=incremental,
+    )
+    itens_out = []
+    for it, calc in zip(itens, calcs):
+        merged = dict(it)
+        merged.update(calc)
+        itens_out.append(merged)
+
+    doc2 = dict(documento)
+    doc2["itens"] = itens_out
+    doc2["metrics"] = agregar_metricas_documento(itens_out)
+    return doc2, stats
+
+def anexar_precos_min_max(documento: Dict[str, Any]) -> Dict[str, Any]:
+    """preco_minimo/preco_maximo de todos os itens (FULL e não FULL), resolvidos em lote."""
+    itens = documento.get("itens") or []
+    itens2 = []
+    for it, faixas in zip(itens, precos_min_max_lote(itens, carregar_regras_ml())):
+        it2 = dict(it)
+        if faixas.get("preco_minimo") is not None:
+            it2["preco_minimo"] = faixas["preco_minimo"]
+        if faixas.get("preco_maximo") is not None:
+            it2["preco_maximo"] = faixas["preco_maximo"]
+        itens2.append(it2)
+    doc2 = dict(documento)
+    doc2["itens"] = itens2
+    return doc2
+
+def construir_dataset_memoria(regiao: Union[Regiao, str]) -> Dict[str, Any]:
+    """
+    Documento completo em memória (dashboard), sem gravar artefatos:
+    base → preço de compra → overrides → métricas → faixas de preço.
+    Função de módulo (picklable) para poder rodar num pool de processos.
+    """
+    doc = construir_dataset_base(regiao)
+    doc = enriquecer_preco_compra(doc)
+    doc = aplicar_overrides_no_documento(doc)
+    doc = aplicar_metricas_no_documento(doc)
+    return anexar_precos_min_max(doc)
+
 def _build_produtos_indices_fallback() -> dict:
     """
     Lê o produtos.json diretamente e monta índices por_gtin / por_sku.
@@ -464,11 +533,19 @@ def salvar_dataset(documento: Dict[str, Any], regiao: Union[Regiao, str], *, kee
 # Orquestração do módulo
 # =========================
 
-def executar(periodo: Periodo, regiao: Union[Regiao, str], *, use_rebate_as_price: bool = True, keep: int = 7, debug: bool = False) -> Tuple[str, str]:
+def executar(
+    periodo: Periodo,
+    regiao: Union[Regiao, str],
+    *,
+    use_rebate_as_price: bool = True,
+    keep: int = 7,
+    debug: bool = False,
+    incremental: bool = True,
+) -> Tuple[str, str]:
     """
     1) carrega anúncios (PP) → documento base
     2) enriquece com preço de compra (produtos PP)
-    3) calcula métricas item-a-item e agregadas
+    3) calcula métricas item-a-item (só itens alterados, se incremental) e agregadas
     4) executa validações e grava artefatos por região
     """
     base = construir_dataset_base(periodo, regiao)
@@ -476,7 +553,11 @@ def executar(periodo: Periodo, regiao: Union[Regiao, str], *, use_rebate_as_pric
     # >>> NOVO: aplica overrides por MLB/SKU/GTIN/cenário
     com_overrides = aplicar_overrides_no_documento(com_custo, cenario=None)
     # calcula métricas já considerando overrides
-    com_metricas = aplicar_metricas_no_documento(com_overrides, use_rebate_as_price=use_rebate_as_price)
+    com_metricas, stats = aplicar_metricas_incremental(
+        com_overrides, regiao, use_rebate_as_price=use_rebate_as_price, incremental=incremental
+    )
+    com_metricas["incremental"] = stats
+    StdoutSink().emit({"regiao": com_metricas.get("regiao"), **stats}, name="METRICAS_INCREMENTAL")
     # validação
     validado = anexar_warnings_mcp(com_metricas)
 
@@ -484,12 +565,33 @@ def executar(periodo: Periodo, regiao: Union[Regiao, str], *, use_rebate_as_pric
     return salvar_documentos(validado, regiao, keep=keep, debug=debug)
 
 def simular_mcp(mlb: str, regiao: Union[Regiao, str], preco_venda: float, subsidio_valor: float = 0.0) -> Dict[str, Any]:
-    """Carrega o item do dataset da região e retorna simulação de MCP para (preço, subsídio)."""
-    ds_path = get_precificacao_dataset_path(regiao)
-    with open(ds_path, "r", encoding="utf-8") as f:
-        doc = json.load(f)
-    itens = doc.get("itens") or []
-    alvo = next((it for it in itens if str(it.get("mlb")) == str(mlb)), None)
+    """Busca o item no dataset indexado da região e retorna simulação de MCP para (preço, subsídio)."""
+    alvo = get_indice_dataset(regiao).item(mlb)
     if not alvo:
         return {"error": f"MLB {mlb} não encontrado no dataset de {regiao}."}
-    return simular_mcp_item(alvo, preco_venda=float(preco_venda), subsidio_valor=float(subsidio_valor))
\ No newline at end of file
+    return simular_mcp_item(alvo, preco_venda=float(preco_venda), subsidio_valor=float(subsidio_valor))
+
+
+def simular_grade_mcp(
+    regiao: Union[Regiao, str],
+    *,
+    mlbs: List[str] | None = None,
+    precos: Sequence[float] | None = None,
+    fatores: Sequence[float] | None = None,
+    subsidios: Sequence[float] = (0.0,),
+    cenarios: Cenarios = None,
+) -> GradeMCP:
+    """
+    MCP sobre a grade preços × subsídios × cenários para itens do dataset da região
+    (mlbs=None → todos). Informe `precos` (R$, comuns a todos) ou `fatores`
+    (multiplicam o preço efetivo de cada item). Resultado: GradeMCP com arrays
+    (itens, cenários, preços, subsídios).
+    """
+    if (precos is None) == (fatores is None):
+        raise ValueError("simular_grade_mcp: informe exatamente um entre `precos` e `fatores`.")
+    idx = get_indice_dataset(regiao)
+    pos = None if mlbs is None else idx.posicoes(list(mlbs))
+    if fatores is not None:
+        itens = idx.itens if pos is None else [idx.itens[i] for i in pos]
+        precos = precos_relativos(itens, fatores)
+    return idx.simulador.grade(precos, subsidios, cenarios, indices=pos)
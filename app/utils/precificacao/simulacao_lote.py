@@ -0,0 +1,306 @@
+# app/utils/precificacao/simulacao_lote.py
+"""
+Simulação de MCP em lote: um arquivo de cenários (mlb, preço, subsídio,
+overrides) → um arquivo de resultados, sem recarregar o dataset por cenário.
+
+Entrada (CSV ou JSONL; formato pela extensão ou explícito):
+  mlb, preco (ou preco_venda/price), subsidio (ou subsidio_valor) — obrigatórios mlb/preco
+  regiao  — opcional; na falta vale a região padrão
+  id      — opcional; repassado na saída para casar com a entrada
+  overrides — JSON (CSV) ou objeto (JSONL) com knobs *_override;
+              colunas/chaves *_override soltas também valem
+CSV aceita ',' ou ';' e decimal com vírgula.
+
+Os cenários são lidos em streaming, agrupados em blocos e simulados de forma
+vetorizada (metrics_lote.simular_mcp_lote); com workers > 1 os blocos vão para
+um pool de processos (cada worker carrega o dataset indexado uma vez). A saída
+sai na ordem da entrada, também em streaming.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+
+from app.config.paths import Regiao
+from app.utils.precificacao.index import get_indice_dataset
+from app.utils.precificacao.metrics_lote import simular_mcp_lote
+from app.utils.precificacao.regras_ml import regras_ml
+
+__all__ = [
+    "COLUNAS_SAIDA",
+    "ler_cenarios",
+    "simular_cenarios",
+    "gravar_resultados",
+    "simular_arquivo",
+]
+
+COLUNAS_SAIDA = (
+    "linha", "id", "regiao", "mlb", "preco_venda", "subsidio_valor",
+    "preco_compra", "frete", "custo_fixo_full", "custo_ml_nao_full",
+    "comissao_pct_bruta", "imposto_pct", "marketing_pct",
+    "comissao_brl", "imposto_brl", "marketing_brl", "subsidio_alocado",
+    "mcp_abs", "mcp_pct", "overrides", "error",
+)
+_COLUNAS_SIM = COLUNAS_SAIDA[6:19]
+
+_ALIAS_PRECO = ("preco", "preco_venda", "price")
+_ALIAS_SUBSIDIO = ("subsidio", "subsidio_valor")
+
+
+# ------------------------------------------------------------
+# leitura
+# ------------------------------------------------------------
+
+def _formato(path: Union[str, Path], formato: Optional[str]) -> str:
+    if formato:
+        return formato.lower()
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson") else "csv"
+
+
+def _num(v: Any) -> float:
+    """Número BR/EN tolerante ('12,5', '1.234,50', 'R$ 10'); vazio/ilegível → NaN."""
+    if v is None or isinstance(v, bool):
+        return math.nan
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = str(v).strip().replace("R$", "").replace(" ", "")
+    if not s:
+        return math.nan
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".") if "." in s else s.replace(",", ".")
+    try:
+        return float(s)
+    except ValueError:
+        return math.nan
+
+
+def _primeiro(row: Dict[str, Any], chaves: Tuple[str, ...]) -> Any:
+    for k in chaves:
+        v = row.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def _normalizar(row: Dict[str, Any], linha: int) -> Dict[str, Any]:
+    knobs: Dict[str, Any] = {}
+    ov = row.get("overrides")
+    if isinstance(ov, str) and ov.strip():
+        try:
+            ov = json.loads(ov)
+        except ValueError:
+            ov = None
+    if isinstance(ov, dict):
+        knobs.update({k: v for k, v in ov.items() if str(k).endswith("_override")})
+    for k, v in row.items():
+        if isinstance(k, str) and k.endswith("_override") and v not in (None, ""):
+            knobs[k] = _num(v) if isinstance(v, str) else v
+    sub = _primeiro(row, _ALIAS_SUBSIDIO)
+    return {
+        "linha": linha,
+        "id": row.get("id"),
+        "regiao": (str(row.get("regiao") or "").strip().lower() or None),
+        "mlb": (str(row.get("mlb") or "").strip() or None),
+        "preco": _num(_primeiro(row, _ALIAS_PRECO)),
+        "subsidio": 0.0 if sub is None else _num(sub),
+        "knobs": knobs,
+    }
+
+
+def ler_cenarios(fonte: Union[str, Path, TextIO], formato: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Cenários normalizados, um a um (streaming). '-' lê da entrada padrão."""
+    if isinstance(fonte, (str, Path)) and str(fonte) != "-":
+        fmt = _formato(fonte, formato)
+        with open(fonte, "r", encoding="utf-8-sig", newline="") as f:
+            yield from _ler(f, fmt)
+    else:
+        yield from _ler(sys.stdin if not hasattr(fonte, "read") else fonte, (formato or "csv").lower())
+
+
+def _ler(f: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "jsonl":
+        for i, raw in enumerate(f, start=1):
+            raw = raw.strip()
+            if raw:
+                yield _normalizar(json.loads(raw), i)
+        return
+    if fmt != "csv":
+        raise ValueError(f"ler_cenarios: formato não suportado: {fmt!r} (csv|jsonl)")
+    cab = f.readline()
+    sep = ";" if cab.count(";") > cab.count(",") else ","
+    leitor = csv.DictReader(io.StringIO(cab), delimiter=sep)
+    campos = [c.strip() for c in (leitor.fieldnames or [])]
+    for i, row in enumerate(csv.DictReader(f, fieldnames=campos, delimiter=sep), start=2):
+        yield _normalizar(row, i)
+
+
+# ------------------------------------------------------------
+# simulação (por bloco; roda no processo atual ou num worker)
+# ------------------------------------------------------------
+
+def _vazio(c: Dict[str, Any], reg: str, erro: str) -> Dict[str, Any]:
+    out = dict.fromkeys(COLUNAS_SAIDA)
+    out.update(linha=c["linha"], id=c["id"], regiao=reg, mlb=c["mlb"], preco_venda=_sem_nan(c["preco"]),
+               subsidio_valor=_sem_nan(c["subsidio"]), overrides=c["knobs"] or None, error=erro)
+    return out
+
+
+def _sem_nan(v: Any) -> Any:
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+
+def _lista(col: Any) -> List[Any]:
+    """Coluna do simular_mcp_lote → lista por linha (dict de arrays → dict por linha)."""
+    if isinstance(col, dict):
+        chaves = list(col)
+        return [dict(zip(chaves, vals)) for vals in zip(*(np.asarray(col[k]).tolist() for k in chaves))]
+    return np.asarray(col).tolist()
+
+
+def _simular_bloco(bloco: List[Dict[str, Any]], regiao_padrao: str) -> List[Dict[str, Any]]:
+    out: List[Optional[Dict[str, Any]]] = [None] * len(bloco)
+    por_regiao: Dict[str, List[int]] = {}
+    for j, c in enumerate(bloco):
+        por_regiao.setdefault(c["regiao"] or regiao_padrao, []).append(j)
+
+    regras = regras_ml()
+    for reg, pos in por_regiao.items():
+        try:
+            idx = get_indice_dataset(reg)
+        except FileNotFoundError:
+            for j in pos:
+                out[j] = _vazio(bloco[j], reg, "dataset_ausente")
+            continue
+
+        validos, itens = [], []
+        for j in pos:
+            c = bloco[j]
+            base = idx.item(c["mlb"]) if c["mlb"] else None
+            if base is None:
+                out[j] = _vazio(bloco[j], reg, "mlb_nao_encontrado" if c["mlb"] else "mlb_ausente")
+                continue
+            validos.append(j)
+            itens.append({**base, **c["knobs"]} if c["knobs"] else base)
+        if not validos:
+            continue
+
+        res = simular_mcp_lote(
+            itens,
+            np.fromiter((bloco[j]["preco"] for j in validos), dtype=float, count=len(validos)),
+            np.fromiter((bloco[j]["subsidio"] for j in validos), dtype=float, count=len(validos)),
+            regras=regras,
+        )
+        cols = {k: _lista(res[k]) for k in _COLUNAS_SIM}
+        erros = res["error"].tolist()
+        for r, j in enumerate(validos):
+            row = _vazio(bloco[j], reg, erros[r])
+            if erros[r] is None:
+                for k in _COLUNAS_SIM:
+                    row[k] = cols[k][r]
+            out[j] = row
+    return out  # type: ignore[return-value]
+
+
+def _blocos(cenarios: Iterable[Dict[str, Any]], tamanho: int) -> Iterator[List[Dict[str, Any]]]:
+    bloco: List[Dict[str, Any]] = []
+    for c in cenarios:
+        bloco.append(c)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def simular_cenarios(
+    cenarios: Iterable[Dict[str, Any]],
+    regiao: Union[Regiao, str],
+    *,
+    workers: int = 1,
+    lote: int = 5000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Resultados (dicts com COLUNAS_SAIDA) na ordem dos cenários. workers > 1 usa
+    um pool de processos com no máximo 2×workers blocos em voo (memória limitada).
+    """
+    reg = regiao.value if isinstance(regiao, Regiao) else str(regiao).strip().lower()
+    blocos = _blocos(cenarios, max(1, int(lote)))
+    if workers <= 1:
+        for b in blocos:
+            yield from _simular_bloco(b, reg)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        voo: deque = deque()
+        for b in blocos:
+            voo.append(ex.submit(_simular_bloco, b, reg))
+            if len(voo) >= 2 * workers:
+                yield from voo.popleft().result()
+        while voo:
+            yield from voo.popleft().result()
+
+
+# ------------------------------------------------------------
+# escrita
+# ------------------------------------------------------------
+
+def gravar_resultados(linhas: Iterable[Dict[str, Any]], destino: Union[str, Path, TextIO],
+                      formato: Optional[str] = None) -> int:
+    """Grava em streaming (CSV ou JSONL; '-' = saída padrão). Retorna o nº de linhas."""
+    if isinstance(destino, (str, Path)) and str(destino) != "-":
+        fmt = _formato(destino, formato)
+        Path(destino).parent.mkdir(parents=True, exist_ok=True)
+        with open(destino, "w", encoding="utf-8", newline="") as f:
+            return _gravar(linhas, f, fmt)
+    return _gravar(linhas, sys.stdout if not hasattr(destino, "write") else destino, (formato or "csv").lower())
+
+
+def _celula(v: Any) -> Any:
+    if v is None:
+        return ""
+    return json.dumps(v, ensure_ascii=False) if isinstance(v, dict) else v
+
+
+def _gravar(linhas: Iterable[Dict[str, Any]], f: TextIO, fmt: str) -> int:
+    n = 0
+    if fmt == "jsonl":
+        for row in linhas:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+            n += 1
+        return n
+    if fmt != "csv":
+        raise ValueError(f"gravar_resultados: formato não suportado: {fmt!r} (csv|jsonl)")
+    w = csv.writer(f)
+    w.writerow(COLUNAS_SAIDA)
+    for row in linhas:
+        w.writerow([_celula(row.get(k)) for k in COLUNAS_SAIDA])
+        n += 1
+    return n
+
+
+def simular_arquivo(
+    entrada: Union[str, Path],
+    saida: Union[str, Path],
+    regiao: Union[Regiao, str],
+    *,
+    formato_entrada: Optional[str] = None,
+    formato_saida: Optional[str] = None,
+    workers: int = 1,
+    lote: int = 5000,
+) -> int:
+    """ler_cenarios → simular_cenarios → gravar_resultados. Retorna o nº de cenários."""
+    return gravar_resultados(
+        simular_cenarios(ler_cenarios(entrada, formato_entrada), regiao, workers=workers, lote=lote),
+        saida,
+        formato_saida,
+    )
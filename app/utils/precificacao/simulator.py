@@ -8,6 +8,7 @@ from app.utils.precificacao.metrics import (
     carregar_regras_ml,      # lê YAML
     _to_num,                 # helpers do módulo de métricas
 )
+from app.utils.precificacao.regras_ml import compiladas
 
 # -----------------------
 # helpers locais
@@ -23,9 +24,10 @@ def _clamp01(x: Optional[float]) -> float:
 
 def _num_or_none(x):
     try:
-        return float(x)
+        v = float(x)
     except Exception:
         return None
+    return None if v != v else v  # NaN = ausente (como metrics._num)
 
 def _pick_override(item: Dict[str, Any], base: str) -> Optional[float]:
     # ex.: base="comissao_pct" -> lê "comissao_pct_override"
@@ -131,6 +133,9 @@ def simular_mcp_item(
       - comissao_pct_override, imposto_pct_override, marketing_pct_override
       - frete_full_override / frete_sobre_custo_override
 
+    Não FULL paga a faixa nao_full ou, a partir do threshold, o frete grátis
+    da tabela (usa `peso_kg`; sem peso → error "frete_gratis_sem_peso").
+
     Retorna: dict com mcp_abs, mcp_pct e decomposição.
     """
     regras = regras or carregar_regras_ml()
@@ -142,6 +147,13 @@ def simular_mcp_item(
     if pc is None:
         return {"mcp_abs": None, "mcp_pct": None, "error": "preco_compra_ausente"}
 
+    # custo ML do não FULL (faixa nao_full / frete grátis por peso × preço)
+    custo_nf = 0.0
+    if not _is_full(item):
+        custo_nf = compiladas(regras).non_full_cost(preco, item.get("peso_kg"))
+        if custo_nf is None:
+            return {"mcp_abs": None, "mcp_pct": None, "error": "frete_gratis_sem_peso"}
+
     # percentuais (brutos) respeitando overrides
     com_pct, imp_pct, mkt_pct = _pcts_yaml_por_logistica(regras, item)
 
@@ -166,7 +178,7 @@ def simular_mcp_item(
     else:
         fixo = 0.0
 
-    custos_totais = pc + frete + fixo + com_r + mkt_r + imp_r
+    custos_totais = pc + frete + fixo + custo_nf + com_r + mkt_r + imp_r
     mcp_abs = preco - custos_totais
     mcp_pct = (mcp_abs / preco) if preco > 0 else None
 
@@ -175,6 +187,7 @@ def simular_mcp_item(
         "preco_compra": pc,
         "frete": frete,
         "custo_fixo_full": fixo,
+        "custo_ml_nao_full": custo_nf,
         "comissao_pct_bruta": com_pct,
         "imposto_pct": imp_pct,
         "marketing_pct": mkt_pct,
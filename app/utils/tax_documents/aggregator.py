@@ -1,6 +1,7 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional, Union
+from xml.etree import ElementTree as ET
 import zipfile
 import json
 import hashlib
@@ -9,7 +10,9 @@ import re
 
 from app.config.paths import Stage, Camada, Regiao
 from app.utils.core.result_sink.service import build_sink
+from app.utils.core.xml_lotes import Lote, listar_lotes, ler_lote, mapear_lotes
 from .config import raw_zip_dir, pp_json_path, COLUMNS
+from .incremental import cache_dir, manifesto_path, processar_incremental
 
 # --- constantes de classificação (com fallback se não estiverem no config) ---
 try:
@@ -26,17 +29,17 @@ except Exception:
     EVT_EPEC         = "110140"
     CFOPS_DEVOLUCAO  = {"1202","1203","1209","2202","2203","2209","5202","5203","5209","6202","6203","6209"}
 
-# --- parsers ---
-from .mappers.nfe_xml import parse_nfe_xml_bytes
+# --- parsers (sobre a árvore já montada: cada XML é parseado uma vez) ---
+from .mappers.nfe_xml import parse_nfe_root
 try:
-    from .mappers.evento_generico import parse_evento   # tpEvento/chNFe/cStat/dhEvento/nProt/xJust
+    from .mappers.evento_generico import parse_evento_root   # tpEvento/chNFe/cStat/dhEvento/nProt/xJust
 except Exception:
-    parse_evento = None  # opcional
+    parse_evento_root = None  # opcional
 
 try:
-    from .mappers.inut_xml import parse_inutilizacao    # inutilização de numeração
+    from .mappers.inut_xml import parse_inutilizacao_root    # inutilização de numeração
 except Exception:
-    parse_inutilizacao = None  # opcional
+    parse_inutilizacao_root = None  # opcional
 
 
 # ----------------- utils internos -----------------
@@ -62,57 +65,206 @@ def _infer_devolucao(cfop: str, nat: str) -> bool:
     return "devolu" in (nat or "").casefold()
 
 
-# ----------------- primeira fase: coleta de eventos/inutilizações -----------------
-def _coletar_eventos_inutilizacoes(zips: List[Path], xmls: List[Path], debug: bool = False) -> Tuple[Dict[str, List[Dict[str, str]]], List[Dict[str, str]]]:
+# ----------------- passada única: cada XML lido/parseado uma vez -----------------
+# tipo do documento pela tag raiz (sem namespace); raiz desconhecida passa
+# pelos três mappers, como antes
+_TIPO_POR_RAIZ = {
+    "nfeProc": "nfe", "NFe": "nfe",
+    "procEventoNFe": "evento", "envEvento": "evento", "evento": "evento",
+    "procInutNFe": "inut", "inutNFe": "inut",
+}
+
+def _parse_lote(lote: Lote, debug: bool = False) -> Tuple[List[Tuple[str, ...]], List[Tuple[int, tuple]], List[Dict[str, str]], List[Dict[str, str]], List[str]]:
     """
-    Retorna:
-      eventos_por_chave: {chNFe: [evento, ...]}
-      inutilizacoes:     [ {cStat, CNPJ, ano, serie, nNFIni, nNFFin, ...}, ...]
+    Lê e parseia um lote de XMLs (roda no worker). As linhas de NF-e voltam
+    compactas, (índice do conjunto de campos, valores), para o pickle de volta
+    ao processo principal não repetir os nomes das ~60 colunas por item.
+    Retorna (campos, linhas, eventos, inutilizações, avisos).
     """
-    eventos: Dict[str, List[Dict[str, str]]] = {}
+    campos: List[Tuple[str, ...]] = []
+    idx_campos: Dict[Tuple[str, ...], int] = {}
+    linhas: List[Tuple[int, tuple]] = []
+    eventos: List[Dict[str, str]] = []
     inutil: List[Dict[str, str]] = []
+    avisos: List[str] = []
+
+    zip_name = Path(lote[0]).name if lote[0] else None
+    for xml_bytes, nome, erro in ler_lote(lote):
+        src = f"{zip_name}:{nome}" if zip_name else nome
+        if xml_bytes is None:
+            # membro ilegível (CRC, ZIP truncado) ou arquivo solto: pula só ele
+            if debug:
+                avisos.append(f"[WARN] Falha lendo XML {src}: {erro}")
+            continue
+        try:
+            root = ET.fromstring(xml_bytes)
+        except Exception as e:
+            if debug:
+                avisos.append(f"[WARN] Falha parse XML ({src}): {e}")
+            continue
+        tipo = _TIPO_POR_RAIZ.get(root.tag.rpartition("}")[2])
 
-    def _handle_xml_bytes(b: bytes):
-        if parse_evento:
+        if tipo in (None, "nfe"):
             try:
-                ev = parse_evento(b)
+                for r in parse_nfe_root(root) or []:
+                    k = tuple(r)
+                    i = idx_campos.get(k)
+                    if i is None:
+                        i = idx_campos[k] = len(campos)
+                        campos.append(k)
+                    linhas.append((i, tuple(r.values())))
+            except Exception as e:
+                if debug:
+                    avisos.append(f"[WARN] Falha parse NFe ({src}): {e}")
+        if tipo in (None, "evento") and parse_evento_root:
+            try:
+                ev = parse_evento_root(root)
                 if ev and ev.get("chNFe"):
-                    eventos.setdefault(ev["chNFe"], []).append(ev)
+                    eventos.append(ev)
             except Exception as e:
                 if debug:
-                    print(f"[WARN] Falha parse evento: {e}")
-        if parse_inutilizacao:
+                    avisos.append(f"[WARN] Falha parse evento ({src}): {e}")
+        if tipo in (None, "inut") and parse_inutilizacao_root:
             try:
-                iu = parse_inutilizacao(b)
+                iu = parse_inutilizacao_root(root)
                 if iu:
                     inutil.append(iu)
             except Exception as e:
                 if debug:
-                    print(f"[WARN] Falha parse inutilização: {e}")
+                    avisos.append(f"[WARN] Falha parse inutilização ({src}): {e}")
+    return campos, linhas, eventos, inutil, avisos
 
-    for z in zips:
-        try:
-            with zipfile.ZipFile(z, "r") as zf:
-                for name in zf.namelist():
-                    if name.lower().endswith(".xml"):
-                        _handle_xml_bytes(zf.read(name))
-        except zipfile.BadZipFile:
-            if debug:
-                print(f"[WARN] ZIP corrompido (eventos/inut): {z}")
 
-    for x in xmls:
-        try:
-            _handle_xml_bytes(x.read_bytes())
-        except Exception as e:
-            if debug:
-                print(f"[WARN] Falha lendo XML solto (eventos/inut) {x}: {e}")
+def _parse_arquivos(arquivos: List[Path], *, debug: bool = False, workers: int = 1, lote: int = 500) -> List[Dict[str, Any]]:
+    """
+    Resultado cru por arquivo (.zip ou .xml solto), alinhado a `arquivos`:
+    {"campos", "linhas", "eventos", "inutilizacoes"} — a unidade do cache
+    incremental. Os lotes de todos os arquivos vão juntos para o pool.
+    """
+    lotes: List[Lote] = []
+    dono: List[int] = []
+    for i, p in enumerate(arquivos):
+        if p.suffix.lower() == ".zip":
+            lz = listar_lotes([p], tamanho=lote, avisar=print if debug else None)
+        else:
+            lz = [(None, [str(p)])]
+        lotes.extend(lz)
+        dono.extend([i] * len(lz))
+
+    out: List[Dict[str, Any]] = [
+        {"campos": [], "linhas": [], "eventos": [], "inutilizacoes": []} for _ in arquivos
+    ]
+    idx: List[Dict[Tuple[str, ...], int]] = [{} for _ in arquivos]
+    for i, (campos, linhas, evs, ius, avisos) in zip(dono, mapear_lotes(_parse_lote, lotes, workers=workers, debug=debug)):
+        for msg in avisos:
+            print(msg)
+        res, ix = out[i], idx[i]
+        # reindexa os conjuntos de campos do lote no do arquivo
+        mapa = []
+        for k in campos:
+            j = ix.get(tuple(k))
+            if j is None:
+                j = ix[tuple(k)] = len(res["campos"])
+                res["campos"].append(list(k))
+            mapa.append(j)
+        res["linhas"].extend([mapa[c], list(vals)] for c, vals in linhas)
+        res["eventos"].extend(evs)
+        res["inutilizacoes"].extend(ius)
+    return out
+
+
+def _varrer_documentos(
+    zips: List[Path], xmls: List[Path], debug: bool = False, *, workers: int = 1, lote: int = 500,
+    incremental: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, str]]], List[Dict[str, str]]]:
+    """
+    Uma leitura e um parse por XML; a raiz decide o mapper. Com workers > 1 os
+    lotes de `lote` XMLs são parseados num pool de processos e juntados na
+    ordem de leitura (mesmo resultado do serial). `incremental` (kwargs de
+    processar_incremental sem `processar`) reaproveita o parse dos arquivos
+    inalterados. Retorna:
+      itens:             linhas de NF-e (cruas, na ordem de leitura)
+      eventos_por_chave: {chNFe: [evento, ...]}
+      inutilizacoes:     [ {cStat, CNPJ, ano, serie, nNFIni, nNFFin, ...}, ...]
+    """
+    arquivos = list(zips) + list(xmls)
+    processar = lambda arqs: _parse_arquivos(arqs, debug=debug, workers=workers, lote=lote)  # noqa: E731
+    if incremental is None:
+        resultados = processar(arquivos)
+    else:
+        resultados, stats = processar_incremental(arquivos, processar, **incremental)
+        if debug:
+            print(f"[DEBUG] Incremental → parseados: {stats['parseados']} | do cache: {stats['reaproveitados']}")
+
+    # costura na ordem de leitura: mesmo resultado de uma varredura completa
+    itens: List[Dict[str, Any]] = []
+    eventos: Dict[str, List[Dict[str, str]]] = {}
+    inutil: List[Dict[str, str]] = []
+    for res in resultados:
+        campos = res["campos"]
+        itens.extend(dict(zip(campos[i], vals)) for i, vals in res["linhas"])
+        for ev in res["eventos"]:
+            eventos.setdefault(ev["chNFe"], []).append(ev)
+        inutil.extend(res["inutilizacoes"])
 
     # opcional: filtrar inutilizações homologadas (cStat == 102), se desejar num artefato à parte
-    return eventos, inutil
+    return itens, eventos, inutil
+
+
+def _enriquecer(r: Dict[str, Any], eventos_by_key: Dict[str, List[Dict[str, str]]]) -> Dict[str, Any]:
+    chave = (r.get("Chave de acesso") or r.get("ID Nota") or "").strip()
+
+    # CNPJ Emissor: se veio vazio do mapper, tenta fallback pela chave
+    cnpj = (r.get("CNPJ Emissor") or "").strip()
+    if not cnpj:
+        cnpj = _cnpj_from_chave(chave)
+        if cnpj:
+            r["CNPJ Emissor"] = cnpj
+
+    # situação padrão (protNFe cStat, se o mapper tiver deixado)
+    cstat = (r.get("cStat_aut") or "").strip()
+    if cstat in CSTAT_CANCELADA:
+        r["Situacao NFe"] = "cancelada"
+    elif cstat in CSTAT_DENEGADA:
+        r["Situacao NFe"] = "denegada"
+    elif cstat in CSTAT_AUTORIZADA:
+        r["Situacao NFe"] = "autorizada"
+    else:
+        r.setdefault("Situacao NFe", "autorizada")
+
+    # eventos: sobrepõem/registram
+    for ev in eventos_by_key.get(chave, []):
+        tp, ev_stat = ev.get("tpEvento"), ev.get("cStat")
+        if tp == EVT_CANCELAMENTO and ev_stat in {"135", "155"}:
+            r["Situacao NFe"] = "cancelada"
+            r["Cancelada em"] = ev.get("dhEvento", "")
+            r["Prot Cancel"] = ev.get("nProt", "")
+            r["Justificativa Cancel"] = ev.get("xJust", "")
+        elif tp == EVT_CCE and ev_stat in {"135", "136"}:
+            r["Possui CC-e"] = True
+        elif tp == EVT_EPEC:
+            r["Em Contingencia"] = True
+
+    # devolução por CFOP/natureza
+    if _infer_devolucao(str(r.get("Item CFOP", "")), str(r.get("Natureza", ""))):
+        r["Eh Devolucao"] = True
+    return r
 
 
 # ----------------- API: carregar linhas já enriquecidas -----------------
-def carregar_linhas(provider: str, ano: int, mes: int, regiao: Optional[Union[Regiao, str]] = None, *, debug: bool = False) -> List[Dict[str, Any]]:
+def carregar_linhas(
+    provider: str, ano: int, mes: int, regiao: Optional[Union[Regiao, str]] = None,
+    *, debug: bool = False, workers: int = 1, incremental: bool = False,
+    atualizar_manifesto: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Linhas de item de NF-e do mês. workers > 1 parseia os XMLs num pool de
+    processos; incremental=True só parseia os ZIP/XML novos ou alterados desde
+    a última rodada (manifesto ao lado do PP). atualizar_manifesto=True com
+    incremental=False parseia tudo e regrava manifesto e cache (--full); sem
+    nenhum dos dois, manifesto e cache nem são lidos. Mesmo resultado em todos
+    os modos.
+    """
     base = raw_zip_dir(provider, ano, mes, regiao)
     if debug:
         print(f"[DEBUG] Base de leitura: {base}")
@@ -120,84 +272,21 @@ def carregar_linhas(provider: str, ano: int, mes: int, regiao: Optional[Union[Re
     if debug:
         print(f"[DEBUG] Arquivos encontrados → ZIPs: {len(zips)} | XMLs soltos: {len(xmls)}")
 
-    # 1) coletar eventos/inutilizações
-    eventos_by_key, inutilizacoes = _coletar_eventos_inutilizacoes(zips, xmls, debug=debug)
+    # 1) passada única: NF-e, eventos e inutilizações
+    store = {
+        "base": base,
+        "manifesto": manifesto_path(provider, ano, mes, regiao),
+        "pasta_cache": cache_dir(provider, ano, mes, regiao),
+        "incremental": incremental,
+    } if incremental or atualizar_manifesto else None
+    itens, eventos_by_key, inutilizacoes = _varrer_documentos(zips, xmls, debug=debug, workers=workers, incremental=store)
     if debug:
         # resumo mínimo
         ev_count = sum(len(v) for v in eventos_by_key.values())
         print(f"[DEBUG] Eventos coletados: {ev_count} (para {len(eventos_by_key)} chaves) | Inutilizações: {len(inutilizacoes)}")
 
-    rows: List[Dict[str, Any]] = []
-
-    # 2) parse de NFe e enriquecimento linha-a-linha
-    def _process_xml_bytes(xml_bytes: bytes, src: Optional[str] = None):
-        try:
-            item_rows = parse_nfe_xml_bytes(xml_bytes) or []
-        except Exception as e:
-            if debug:
-                print(f"[WARN] Falha parse NFe ({src or 'xml'}): {e}")
-            return
-
-        for r in item_rows:
-            chave = (r.get("Chave de acesso") or r.get("ID Nota") or "").strip()
-
-            # CNPJ Emissor: se veio vazio do mapper, tenta fallback pela chave
-            cnpj = (r.get("CNPJ Emissor") or "").strip()
-            if not cnpj:
-                cnpj = _cnpj_from_chave(chave)
-                if cnpj:
-                    r["CNPJ Emissor"] = cnpj
-
-            # situação padrão (protNFe cStat, se o mapper tiver deixado)
-            cstat = (r.get("cStat_aut") or "").strip()
-            if cstat in CSTAT_CANCELADA:
-                r["Situacao NFe"] = "cancelada"
-            elif cstat in CSTAT_DENEGADA:
-                r["Situacao NFe"] = "denegada"
-            elif cstat in CSTAT_AUTORIZADA:
-                r["Situacao NFe"] = "autorizada"
-            else:
-                r.setdefault("Situacao NFe", "autorizada")
-
-            # eventos: sobrepõem/registram
-            for ev in eventos_by_key.get(chave, []):
-                tp, ev_stat = ev.get("tpEvento"), ev.get("cStat")
-                if tp == EVT_CANCELAMENTO and ev_stat in {"135", "155"}:
-                    r["Situacao NFe"] = "cancelada"
-                    r["Cancelada em"] = ev.get("dhEvento", "")
-                    r["Prot Cancel"] = ev.get("nProt", "")
-                    r["Justificativa Cancel"] = ev.get("xJust", "")
-                elif tp == EVT_CCE and ev_stat in {"135", "136"}:
-                    r["Possui CC-e"] = True
-                elif tp == EVT_EPEC:
-                    r["Em Contingencia"] = True
-
-            # devolução por CFOP/natureza
-            if _infer_devolucao(str(r.get("Item CFOP", "")), str(r.get("Natureza", ""))):
-                r["Eh Devolucao"] = True
-
-            rows.append(r)
-
-    # processa ZIPs
-    for zpath in zips:
-        try:
-            with zipfile.ZipFile(zpath, "r") as zf:
-                members = [n for n in zf.namelist() if n.lower().endswith(".xml")]
-                if debug:
-                    print(f"[DEBUG] ZIP {zpath.name}: {len(members)} XML(s)")
-                for name in members:
-                    _process_xml_bytes(zf.read(name), src=f"{zpath.name}:{name}")
-        except zipfile.BadZipFile:
-            if debug:
-                print(f"[WARN] ZIP corrompido: {zpath}")
-
-    # processa XMLs soltos
-    for x in xmls:
-        try:
-            _process_xml_bytes(x.read_bytes(), src=str(x))
-        except Exception as e:
-            if debug:
-                print(f"[WARN] Falha lendo XML solto {x}: {e}")
+    # 2) eventos aplicados por chave sobre as linhas já lidas
+    rows = [_enriquecer(r, eventos_by_key) for r in itens]
 
     rows.sort(key=lambda r: (r.get("ID Nota", ""), r.get("Item Codigo", ""), r.get("Item Descricao", "")))
     if debug:
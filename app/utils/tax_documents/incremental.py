@@ -0,0 +1,186 @@
+# app/utils/tax_documents/incremental.py
+"""
+PP incremental de tax_documents: manifesto dos arquivos de entrada do mês
+(cada .zip / .xml solto: caminho, tamanho, mtime, sha256) ao lado do PP e o
+resultado cru do parse de cada arquivo (linhas de NF-e antes do
+enriquecimento, eventos e inutilizações) em <pp>/.pp_incremental/.
+
+Na próxima rodada só os arquivos novos ou alterados são parseados; os demais
+vêm do cache. O enriquecimento (eventos, situação, devolução) roda sempre
+sobre o conjunto inteiro, então um cancelamento que chega num ZIP novo é
+aplicado às notas já cacheadas. Mudança de código dos parsers invalida tudo.
+
+O cache é só acelerador: apagá-lo (ou incremental=False) reparseia tudo.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.config.paths import Regiao
+from app.utils.core.excel_cache import hash_arquivo, versao_codigo
+from .config import pp_month_dir, ART_NAME
+
+__all__ = [
+    "VERSAO_MANIFESTO",
+    "manifesto_path",
+    "cache_dir",
+    "processar_incremental",
+]
+
+VERSAO_MANIFESTO = 1
+
+# módulos cujo código define o resultado cru do parse
+_MODULOS_PARSE = (
+    "app.utils.tax_documents.aggregator",
+    "app.utils.tax_documents.mappers.nfe_xml",
+    "app.utils.tax_documents.mappers.evento_generico",
+    "app.utils.tax_documents.mappers.inut_xml",
+    "app.utils.core.nfe_xml",
+    "app.utils.core.xml_lotes",
+)
+
+Resultado = Dict[str, Any]
+
+
+def manifesto_path(provider: str, ano: int, mes: int, regiao: Optional[Union[Regiao, str]] = None) -> Path:
+    return pp_month_dir(provider, ano, mes, regiao) / f"{ART_NAME}_pp_manifest.json"
+
+
+def cache_dir(provider: str, ano: int, mes: int, regiao: Optional[Union[Regiao, str]] = None) -> Path:
+    return pp_month_dir(provider, ano, mes, regiao) / ".pp_incremental"
+
+
+def _contexto() -> str:
+    return f"{VERSAO_MANIFESTO}:{versao_codigo(*_MODULOS_PARSE)}"
+
+
+def _file_sig(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _chave(p: Path, base: Path) -> str:
+    try:
+        return p.relative_to(base).as_posix()
+    except ValueError:
+        return str(p)
+
+
+def _gravar_json(path: Path, obj: Any) -> None:
+    # escrita atômica na própria pasta (os caches de linhas são grandes: sem indent)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _ler_json(path: Path) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _ler_manifesto(path: Path, contexto: str) -> Dict[str, Dict[str, Any]]:
+    obj = _ler_json(path)
+    if not isinstance(obj, dict) or obj.get("contexto") != contexto:
+        return {}  # parser mudou: nada aproveitável
+    arquivos = obj.get("arquivos")
+    return arquivos if isinstance(arquivos, dict) else {}
+
+
+def processar_incremental(
+    arquivos: Sequence[Path],
+    processar: Callable[[List[Path]], List[Resultado]],
+    *,
+    base: Path,
+    manifesto: Path,
+    pasta_cache: Path,
+    incremental: bool = True,
+) -> Tuple[List[Resultado], Dict[str, int]]:
+    """
+    Resultados de `processar` (lista de arquivos → resultados alinhados,
+    JSON-serializáveis) para `arquivos`, parseando só os novos/alterados.
+    Um arquivo conta como inalterado se (tamanho, mtime) batem com o
+    manifesto ou, se não batem, o sha256 do conteúdo bate. incremental=False
+    ignora o manifesto anterior, parseia tudo e regrava manifesto e cache
+    (descartando entradas de arquivos que não existem mais).
+
+    Retorna (resultados alinhados a `arquivos`, {"parseados", "reaproveitados"}).
+    """
+    contexto = _contexto()
+    anterior = _ler_manifesto(manifesto, contexto) if incremental else {}
+
+    out: List[Optional[Resultado]] = [None] * len(arquivos)
+    novo: Dict[str, Dict[str, Any]] = {}
+    pendentes: List[int] = []
+    for i, p in enumerate(arquivos):
+        k = _chave(p, base)
+        sig = _file_sig(p)
+        info = anterior.get(k)
+        if info is not None and sig is not None:
+            sha = info.get("sha256")
+            if [info.get("mtime_ns"), info.get("bytes")] != list(sig):
+                try:
+                    atual: Optional[str] = hash_arquivo(p)
+                except OSError:
+                    atual = None
+                sha = sha if atual == sha else None
+            hit = _ler_json(pasta_cache / f"{sha}.json") if sha else None
+            if isinstance(hit, dict):
+                out[i] = hit
+                novo[k] = {"bytes": sig[1], "mtime_ns": sig[0], "sha256": sha}
+                continue
+        pendentes.append(i)
+
+    if pendentes:
+        for i, res in zip(pendentes, processar([arquivos[i] for i in pendentes])):
+            out[i] = res
+            p = arquivos[i]
+            sig = _file_sig(p)
+            try:
+                sha = hash_arquivo(p)
+                _gravar_json(pasta_cache / f"{sha}.json", res)
+            except (OSError, TypeError, ValueError):
+                continue  # best-effort: fica fora do manifesto e é reparseado
+            if sig is not None:
+                novo[_chave(p, base)] = {"bytes": sig[1], "mtime_ns": sig[0], "sha256": sha}
+
+    if not incremental or novo != anterior:
+        try:
+            _gravar_json(manifesto, {
+                "contexto": contexto,
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                "arquivos": novo,
+            })
+        except (OSError, TypeError, ValueError):
+            pass
+        # caches que não pertencem a nenhum arquivo atual (removido/alterado)
+        vivos = {f"{info['sha256']}.json" for info in novo.values()}
+        if pasta_cache.is_dir():
+            for e in pasta_cache.glob("*.json"):
+                if e.name not in vivos:
+                    try:
+                        e.unlink()
+                    except OSError:
+                        pass
+
+    stats = {"parseados": len(pendentes), "reaproveitados": len(arquivos) - len(pendentes)}
+    return out, stats  # type: ignore[return-value]
@@ -8,7 +8,10 @@ def parse_evento(xml_bytes: bytes) -> Optional[Dict]:
     Parse genérico de procEventoNFe.
     Retorna dict com {tpEvento, chNFe, cStat, dhEvento, nProt, xJust} ou None.
     """
-    root = ET.fromstring(xml_bytes)
+    return parse_evento_root(ET.fromstring(xml_bytes))
+
+def parse_evento_root(root: ET.Element) -> Optional[Dict]:
+    """parse_evento sobre a árvore já montada."""
     if not (root.tag.endswith("procEventoNFe") or root.find(".//{*}evento") is not None):
         return None
 
@@ -3,7 +3,9 @@ from xml.etree import ElementTree as ET
 from typing import Optional, Dict
 
 def parse_inutilizacao(xml_bytes: bytes) -> Optional[Dict]:
-    root = ET.fromstring(xml_bytes)
+    return parse_inutilizacao_root(ET.fromstring(xml_bytes))
+
+def parse_inutilizacao_root(root: ET.Element) -> Optional[Dict]:
     if not (root.tag.endswith("procInutNFe") or root.find(".//{*}inutNFe") is not None):
         return None
     inf = root.find(".//{*}retInutNFe/{*}infInut")
@@ -2,6 +2,8 @@ from __future__ import annotations
 from typing import Any, Dict, List
 from xml.etree import ElementTree as ET
 
+from app.utils.core.nfe_xml import caminhos_nfe, localizar_nfe
+
 # Helpers seguros p/ namespaces variados
 def T(elem, path):
     x = elem.find(path)
@@ -25,116 +27,112 @@ def parse_nfe_xml_bytes(xml_bytes: bytes) -> List[Dict[str, Any]]:
     já flatten com cabeçalho + item.
     Suporta NFe procNFe e NFe pura.
     """
-    root = ET.fromstring(xml_bytes)
-
-    # tentativa de lidar com namespaces distintos
-    # procuramos a tag NFe onde estiver
-    nfe = root.find(".//{*}NFe")
-    if nfe is None and root.tag.endswith("NFe"):
-        nfe = root
-    if nfe is None:
-        return []
+    return parse_nfe_root(ET.fromstring(xml_bytes))
 
-    infNFe = nfe.find(".//{*}infNFe")
-    if infNFe is None:
+def parse_nfe_root(root: ET.Element) -> List[Dict[str, Any]]:
+    """parse_nfe_xml_bytes sobre a árvore já montada (ingest em passada única)."""
+    nfe, infNFe = localizar_nfe(root)
+    if nfe is None or infNFe is None:
         return []
+    # caminhos com o namespace do documento já resolvido (ver core/nfe_xml)
+    c = caminhos_nfe(infNFe)
 
-    ide   = infNFe.find(".//{*}ide")
-    emit  = infNFe.find(".//{*}emit")
-    dest  = infNFe.find(".//{*}dest")
-    total = infNFe.find(".//{*}total")
-    transp= infNFe.find(".//{*}transp")
-    infAdic = infNFe.find(".//{*}infAdic")
+    ide   = infNFe.find(c[".//{*}ide"])
+    emit  = infNFe.find(c[".//{*}emit"])
+    dest  = infNFe.find(c[".//{*}dest"])
+    total = infNFe.find(c[".//{*}total"])
+    transp= infNFe.find(c[".//{*}transp"])
+    infAdic = infNFe.find(c[".//{*}infAdic"])
 
     # Cabeçalho
     chave = infNFe.attrib.get("Id","").replace("NFe","")
     cab = {
         "ID Nota": chave,
-        "Serie": T(ide,".{*}serie"),
-        "Numero Nota": T(ide,".{*}nNF"),
-        "Data emissao": T(ide,".{*}dhEmi") or T(ide,".{*}dEmi"),
-        "Data saída": T(ide,".{*}dhSaiEnt") or T(ide,".{*}dSaiEnt"),
-        "Regime Tributario": T(emit,".{*}CRT"),
-        "Natureza": T(ide,".{*}natOp"),
-        "Observacoes": T(infAdic,".{*}infCpl"),
+        "Serie": T(ide,c[".{*}serie"]),
+        "Numero Nota": T(ide,c[".{*}nNF"]),
+        "Data emissao": T(ide,c[".{*}dhEmi"]) or T(ide,c[".{*}dEmi"]),
+        "Data saída": T(ide,c[".{*}dhSaiEnt"]) or T(ide,c[".{*}dSaiEnt"]),
+        "Regime Tributario": T(emit,c[".{*}CRT"]),
+        "Natureza": T(ide,c[".{*}natOp"]),
+        "Observacoes": T(infAdic,c[".{*}infCpl"]),
         "Chave de acesso": chave,
     }
 
     # Totais
-    ICMSTot = total.find(".//{*}ICMSTot") if total is not None else None
+    ICMSTot = total.find(c[".//{*}ICMSTot"]) if total is not None else None
     cab.update({
-        "Base ICMS": N(ICMSTot,".{*}vBC") if ICMSTot is not None else 0.0,
-        "Valor ICMS": N(ICMSTot,".{*}vICMS") if ICMSTot is not None else 0.0,
-        "Base ICMS Subst": N(ICMSTot,".{*}vBCST") if ICMSTot is not None else 0.0,
-        "Valor ICMS Subst": N(ICMSTot,".{*}vST") if ICMSTot is not None else 0.0,
-        "Valor Servicos": N(ICMSTot,".{*}vServ") if ICMSTot is not None else 0.0,
-        "Valor Produtos": N(ICMSTot,".{*}vProd") if ICMSTot is not None else 0.0,
-        "Frete": N(ICMSTot,".{*}vFrete") if ICMSTot is not None else 0.0,
-        "Seguro": N(ICMSTot,".{*}vSeg") if ICMSTot is not None else 0.0,
-        "Outras Despesas": N(ICMSTot,".{*}vOutro") if ICMSTot is not None else 0.0,
-        "Valor IPI": N(ICMSTot,".{*}vIPI") if ICMSTot is not None else 0.0,
-        "Valor Nota": N(ICMSTot,".{*}vNF") if ICMSTot is not None else 0.0,
-        "Desconto": N(ICMSTot,".{*}vDesc") if ICMSTot is not None else 0.0,
+        "Base ICMS": N(ICMSTot,c[".{*}vBC"]) if ICMSTot is not None else 0.0,
+        "Valor ICMS": N(ICMSTot,c[".{*}vICMS"]) if ICMSTot is not None else 0.0,
+        "Base ICMS Subst": N(ICMSTot,c[".{*}vBCST"]) if ICMSTot is not None else 0.0,
+        "Valor ICMS Subst": N(ICMSTot,c[".{*}vST"]) if ICMSTot is not None else 0.0,
+        "Valor Servicos": N(ICMSTot,c[".{*}vServ"]) if ICMSTot is not None else 0.0,
+        "Valor Produtos": N(ICMSTot,c[".{*}vProd"]) if ICMSTot is not None else 0.0,
+        "Frete": N(ICMSTot,c[".{*}vFrete"]) if ICMSTot is not None else 0.0,
+        "Seguro": N(ICMSTot,c[".{*}vSeg"]) if ICMSTot is not None else 0.0,
+        "Outras Despesas": N(ICMSTot,c[".{*}vOutro"]) if ICMSTot is not None else 0.0,
+        "Valor IPI": N(ICMSTot,c[".{*}vIPI"]) if ICMSTot is not None else 0.0,
+        "Valor Nota": N(ICMSTot,c[".{*}vNF"]) if ICMSTot is not None else 0.0,
+        "Desconto": N(ICMSTot,c[".{*}vDesc"]) if ICMSTot is not None else 0.0,
     })
 
     # Emitente/Destinatário (usaremos DEST como "Contato"/comprador)
     contato = dest if dest is not None else emit
-    ender = contato.find(".//{*}enderDest") if contato is dest else contato.find(".//{*}enderEmit")
+    ender = contato.find(c[".//{*}enderDest"]) if contato is dest else contato.find(c[".//{*}enderEmit"])
     cab.update({
-        "Contato": T(contato,".{*}xNome"),
-        "Fantasia": T(emit,".{*}xFant"),
-        "CPF / CNPJ": T(contato,".{*}CNPJ") or T(contato,".{*}CPF"),
-        "Municipio": T(ender,".{*}xMun") if ender is not None else "",
-        "UF": T(ender,".{*}UF") if ender is not None else "",
-        "Cep": T(ender,".{*}CEP") if ender is not None else "",
-        "Endereco": T(ender,".{*}xLgr") if ender is not None else "",
-        "Nro": T(ender,".{*}nro") if ender is not None else "",
-        "Bairro": T(ender,".{*}xBairro") if ender is not None else "",
-        "Complemento": T(ender,".{*}xCpl") if ender is not None else "",
-        "E-mail": T(contato,".{*}email"),
-        "Fone": T(contato,".{*}fone"),
-        "Peso líquido": T(infNFe,".{*}transp/{*}vol/{*}pesoL"),
-        "Peso bruto": T(infNFe,".{*}transp/{*}vol/{*}pesoB"),
-        "Frete por conta": T(transp,".{*}modFrete") if transp is not None else "",
+        "Contato": T(contato,c[".{*}xNome"]),
+        "Fantasia": T(emit,c[".{*}xFant"]),
+        "CPF / CNPJ": T(contato,c[".{*}CNPJ"]) or T(contato,c[".{*}CPF"]),
+        "Municipio": T(ender,c[".{*}xMun"]) if ender is not None else "",
+        "UF": T(ender,c[".{*}UF"]) if ender is not None else "",
+        "Cep": T(ender,c[".{*}CEP"]) if ender is not None else "",
+        "Endereco": T(ender,c[".{*}xLgr"]) if ender is not None else "",
+        "Nro": T(ender,c[".{*}nro"]) if ender is not None else "",
+        "Bairro": T(ender,c[".{*}xBairro"]) if ender is not None else "",
+        "Complemento": T(ender,c[".{*}xCpl"]) if ender is not None else "",
+        "E-mail": T(contato,c[".{*}email"]),
+        "Fone": T(contato,c[".{*}fone"]),
+        "Peso líquido": T(infNFe,c[".{*}transp/{*}vol/{*}pesoL"]),
+        "Peso bruto": T(infNFe,c[".{*}transp/{*}vol/{*}pesoB"]),
+        "Frete por conta": T(transp,c[".{*}modFrete"]) if transp is not None else "",
     })
 
     # Itens
     rows: List[Dict[str,Any]] = []
-    for det in infNFe.findall(".//{*}det"):
-        prod = det.find(".//{*}prod")
-        imposto = det.find(".//{*}imposto")
+    for det in infNFe.findall(c[".//{*}det"]):
+        prod = det.find(c[".//{*}prod"])
+        imposto = det.find(c[".//{*}imposto"])
 
-        icms_tag = imposto.find(".//{*}ICMS/*") if imposto is not None else None
-        csosn_ou_cst = T(icms_tag,".{*}CSOSN") or T(icms_tag,".{*}CST")
+        icms_tag = imposto.find(c[".//{*}ICMS/*"]) if imposto is not None else None
+        csosn_ou_cst = T(icms_tag,c[".{*}CSOSN"]) or T(icms_tag,c[".{*}CST"])
 
-        simples_base = N(icms_tag,".{*}vBC")
-        simples_imp  = N(icms_tag,".{*}vICMS")
+        simples_base = N(icms_tag,c[".{*}vBC"])
+        simples_imp  = N(icms_tag,c[".{*}vICMS"])
         simples_base_calc = simples_base  # mantido por compat.
 
-        st_imp = N(icms_tag,".{*}vICMSST")
-        aliq_credito = N(icms_tag,".{*}pCredSN")
-        val_credito  = N(icms_tag,".{*}vCredICMSSN")
+        st_imp = N(icms_tag,c[".{*}vICMSST"])
+        aliq_credito = N(icms_tag,c[".{*}pCredSN"])
+        val_credito  = N(icms_tag,c[".{*}vCredICMSSN"])
 
-        pis = imposto.find(".//{*}PIS/*") if imposto is not None else None
-        cof = imposto.find(".//{*}COFINS/*") if imposto is not None else None
-        ipi = imposto.find(".//{*}IPI/{*}IPITrib") if imposto is not None else None
-        ii  = imposto.find(".//{*}II") if imposto is not None else None
+        pis = imposto.find(c[".//{*}PIS/*"]) if imposto is not None else None
+        cof = imposto.find(c[".//{*}COFINS/*"]) if imposto is not None else None
+        ipi = imposto.find(c[".//{*}IPI/{*}IPITrib"]) if imposto is not None else None
+        ii  = imposto.find(c[".//{*}II"]) if imposto is not None else None
 
         row = dict(cab)
         row.update({
-            "CNPJ Emissor": (T(emit, ".{*}CNPJ") or cnpj_from_chave(cab.get("Chave de acesso",""))),
-            "Item Descricao": T(prod,".{*}xProd"),
-            "Item Codigo": T(prod,".{*}cProd"),
-            "Item Quantidade": N(prod,".{*}qCom"),
-            "Item UN": T(prod,".{*}uCom"),
-            "Item Valor": N(prod,".{*}vUnCom"),
-            "Item Total": N(prod,".{*}vProd"),
-            "Item Frete": N(prod,".{*}vFrete"),
-            "Item Seguro": N(prod,".{*}vSeg"),
-            "Item Outras Despesas": N(prod,".{*}vOutro"),
-            "Item Desconto": N(prod,".{*}vDesc"),
-            "Item CFOP": T(prod,".{*}CFOP"),
-            "Item NCM": T(prod,".{*}NCM"),
+            "CNPJ Emissor": (T(emit, c[".{*}CNPJ"]) or cnpj_from_chave(cab.get("Chave de acesso",""))),
+            "Item Descricao": T(prod,c[".{*}xProd"]),
+            "Item Codigo": T(prod,c[".{*}cProd"]),
+            "Item Quantidade": N(prod,c[".{*}qCom"]),
+            "Item UN": T(prod,c[".{*}uCom"]),
+            "Item Valor": N(prod,c[".{*}vUnCom"]),
+            "Item Total": N(prod,c[".{*}vProd"]),
+            "Item Frete": N(prod,c[".{*}vFrete"]),
+            "Item Seguro": N(prod,c[".{*}vSeg"]),
+            "Item Outras Despesas": N(prod,c[".{*}vOutro"]),
+            "Item Desconto": N(prod,c[".{*}vDesc"]),
+            "Item CFOP": T(prod,c[".{*}CFOP"]),
+            "Item NCM": T(prod,c[".{*}NCM"]),
             "ST / CSOSN": csosn_ou_cst,
             "Valor Base Simples / ICMS": simples_base,
             "Valor Imposto Simples / ICMS": simples_imp,
@@ -142,15 +140,15 @@ def parse_nfe_xml_bytes(xml_bytes: bytes) -> List[Dict[str, Any]]:
             "Valor Imposto ST / ICMS": st_imp,
             "Alíquota Crédito Simples": aliq_credito,
             "Valor Crédito Simples": val_credito,
-            "Valor Base COFINS": N(cof,".{*}vBC") if cof is not None else 0.0,
-            "Valor Imposto COFINS": N(cof,".{*}vCOFINS") if cof is not None else 0.0,
-            "Valor Base PIS": N(pis,".{*}vBC") if pis is not None else 0.0,
-            "Valor Imposto PIS": N(pis,".{*}vPIS") if pis is not None else 0.0,
-            "Valor Base IPI": N(ipi,".{*}vBC") if ipi is not None else 0.0,
-            "Valor Imposto IPI": N(ipi,".{*}vIPI") if ipi is not None else 0.0,
-            "Valor Base II": N(ii,".{*}vBC") if ii is not None else 0.0,
-            "Valor Imposto II": N(ii,".{*}vII") if ii is not None else 0.0,
-            "Item Origem": T(icms_tag,".{*}orig"),
+            "Valor Base COFINS": N(cof,c[".{*}vBC"]) if cof is not None else 0.0,
+            "Valor Imposto COFINS": N(cof,c[".{*}vCOFINS"]) if cof is not None else 0.0,
+            "Valor Base PIS": N(pis,c[".{*}vBC"]) if pis is not None else 0.0,
+            "Valor Imposto PIS": N(pis,c[".{*}vPIS"]) if pis is not None else 0.0,
+            "Valor Base IPI": N(ipi,c[".{*}vBC"]) if ipi is not None else 0.0,
+            "Valor Imposto IPI": N(ipi,c[".{*}vIPI"]) if ipi is not None else 0.0,
+            "Valor Base II": N(ii,c[".{*}vBC"]) if ii is not None else 0.0,
+            "Valor Imposto II": N(ii,c[".{*}vII"]) if ii is not None else 0.0,
+            "Item Origem": T(icms_tag,c[".{*}orig"]),
         })
         rows.append(row)
 
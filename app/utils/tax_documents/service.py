@@ -139,10 +139,18 @@ def _sum_valor_nota_dedup_por_nota(rows: List[dict]) -> float:
 # ================
 def gerar_pp_json(
     provider: str, ano: int, mes: int, regiao: Optional[Union[Regiao, str]] = None,
-    *, dry_run: bool = False, debug: bool = False
+    *, dry_run: bool = False, debug: bool = False, workers: int = 1, incremental: bool = True
 ) -> str:
-    """Gera o canônico PP (JSON) a partir dos ZIP/XML do mês."""
-    rows = carregar_linhas(provider, ano, mes, regiao, debug=debug)
+    """
+    Gera o canônico PP (JSON) a partir dos ZIP/XML do mês (workers > 1: parse em
+    paralelo). incremental=True reaproveita o parse dos arquivos inalterados
+    desde a última geração; incremental=False reparseia tudo e regrava manifesto
+    e cache. dry_run não lê nem grava manifesto/cache.
+    """
+    rows = carregar_linhas(
+        provider, ano, mes, regiao, debug=debug, workers=workers,
+        incremental=incremental and not dry_run, atualizar_manifesto=not dry_run,
+    )
     return gravar_pp(provider, ano, mes, regiao, rows, dry_run=dry_run, debug=debug)
 
 
@@ -1,6 +1,5 @@
 # app/utils/vendas/amazon/agregador.py
 from __future__ import annotations
-import time
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
@@ -38,16 +37,16 @@ def listar_pedidos_intervalo(
     orders: List[Dict[str, Any]] = []
 
     # primeira página
-    resp = cli.get(_ORDERS + "?" + urlencode(params))
+    # getOrders compartilha um único bucket (0.0167 req/s, burst 20) no transporte do client
+    resp = cli.get(_ORDERS + "?" + urlencode(params), endpoint="orders")
     orders.extend(resp.get("payload", {}).get("Orders", []))
     next_token = resp.get("payload", {}).get("NextToken")
 
     # paginação
     while next_token:
-        resp = cli.get(_ORDERS + "?" + urlencode({"NextToken": next_token}))
+        resp = cli.get(_ORDERS + "?" + urlencode({"NextToken": next_token}), endpoint="orders")
         orders.extend(resp.get("payload", {}).get("Orders", []))
         next_token = resp.get("payload", {}).get("NextToken")
-        time.sleep(0.2)  # cortesia de rate-limit
 
     # determinismo
     orders.sort(key=lambda o: str(o.get("AmazonOrderId", "")))
@@ -1,11 +1,15 @@
 # app/utils/vendas/meli/aggregator.py
 from __future__ import annotations
 from typing import List, Dict, Any, Iterable, Optional
-from collections import defaultdict
 
 from app.utils.core.filtros import rows_in_ml_window, ml_window_bounds
+from .metrics import TOTAL_KEY as _TOTAL, ROLLUP_KEYS, multi_window_groups, _mlb_key, _sku_key, _total_key, _soma
+from .cube import cube_filtered_total, cube_window_groups
 
-__all__ = ["apply_filters", "summarize", "window_sums", "all_windows", "per_mlb"]
+__all__ = [
+    "apply_filters", "summarize", "window_sums", "all_windows",
+    "per_mlb", "per_gtin", "per_sku", "per_dimensions", "cube_dimensions",
+]
 
 def _num(x) -> float:
     try:
@@ -48,13 +52,13 @@ def _orders_paid(rows: Iterable[Dict[str, Any]]) -> float:
             continue
         paid = _num(r.get("paid_amount"))
         seen[oid] = max(paid, seen.get(oid, 0.0))
-    return sum(seen.values())
+    return _soma(seen.values(), len(seen))
 
 def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
     items_count  = len(rows)
     orders_count = len({r.get("order_id") for r in rows if r.get("order_id") is not None})
-    qty_total    = sum(_qty(r.get("quantity")) for r in rows)
-    items_gross  = sum(line_total(r) for r in rows)
+    qty_total    = _soma((_qty(r.get("quantity")) for r in rows), items_count)
+    items_gross  = _soma((line_total(r) for r in rows), items_count)
     orders_paid  = _orders_paid(rows)
     return {"items_count": items_count, "orders_count": orders_count,
             "qty_total": qty_total, "items_gross": items_gross, "orders_paid": orders_paid}
@@ -76,10 +80,19 @@ def all_windows(rows: List[Dict[str, Any]], windows: Iterable[int] = (7, 15, 30)
                 mlb: Optional[str] = None, sku: Optional[str] = None,
                 title_contains: Optional[str] = None, *, mode: str = "ml") -> Dict[str, Any]:
     base = apply_filters(rows, mlb=mlb, sku=sku, title_contains=title_contains)
-    out: Dict[str, Any] = {}
-    for d in windows:
-        out[str(d)] = window_sums(base, d, date_field=date_field, mode=mode)
-    return out
+    windows = tuple(windows)
+    g = multi_window_groups(base, {"total": _total_key}, windows=windows, date_field=date_field)
+    return _total_windows(g["total"], windows, date_field, mode)
+
+def _total_windows(groups: Dict[str, Any], windows: Iterable[int],
+                   date_field: str, mode: str) -> Dict[str, Any]:
+    tot = groups.get(_TOTAL)
+    if tot is None:  # sem linhas: janelas zeradas
+        return {str(d): window_sums([], d, date_field=date_field, mode=mode) for d in windows}
+    return tot["windows"]
+
+def _with_mlbs_count(v: Dict[str, Any]) -> Dict[str, Any]:
+    return {"title": v["title"], "windows": v["windows"], "mlbs_count": len(v["item_ids"])}
 
 def per_mlb(
     rows: List[Dict[str, Any]],
@@ -91,20 +104,21 @@ def per_mlb(
     """
     Agrega vendas por MLB (item_id), mantendo um título representativo (primeiro visto).
     """
-    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-    titles: Dict[str, str] = {}
-    for r in rows:
-        mlb = str(r.get("item_id") or "")
-        if not mlb:
-            continue
-        groups[mlb].append(r)
-        if r.get("title") and mlb not in titles:
-            titles[mlb] = r["title"]
-    out: Dict[str, Any] = {}
-    for mlb, lst in groups.items():
-        w = {str(d): window_sums(lst, d, date_field=date_field, mode=mode) for d in windows}
-        out[mlb] = {"title": titles.get(mlb), "windows": w}
-    return out
+    g = multi_window_groups(rows, {"mlb": _mlb_key}, windows=windows, date_field=date_field)
+    return {mlb: {"title": v["title"], "windows": v["windows"]} for mlb, v in g["mlb"].items()}
+
+def per_sku(
+    rows: List[Dict[str, Any]],
+    windows: Iterable[int] = (7, 15, 30),
+    date_field: str = "date_approved",
+    *,
+    mode: str = "ml",
+) -> Dict[str, Any]:
+    """
+    Agrega vendas por seller_sku, mantendo um título representativo (primeiro visto).
+    """
+    g = multi_window_groups(rows, {"sku": _sku_key}, windows=windows, date_field=date_field)
+    return {sku: _with_mlbs_count(v) for sku, v in g["sku"].items()}
 
 # app/utils/vendas/meli/aggregator.py
 
@@ -131,18 +145,74 @@ def per_gtin(
     Agrega vendas por GTIN (soma todas as MLBs do mesmo GTIN).
     Mantém um título representativo (primeiro visto).
     """
-    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-    titles: Dict[str, str] = {}
-    for r in rows:
-        g = _row_gtin(r, getter=gtin_getter)
-        if not g:
-            continue
-        groups[g].append(r)
-        if r.get("title") and g not in titles:
-            titles[g] = r["title"]
+    g = multi_window_groups(
+        rows, {"gtin": lambda r: _row_gtin(r, getter=gtin_getter)},
+        windows=windows, date_field=date_field,
+    )
+    return {gtin: _with_mlbs_count(v) for gtin, v in g["gtin"].items()}
+
+_DIMENSIONS = ("mlb", "gtin", "sku", "total")
+
+def _dimension_keys(dims: Iterable[str], gtin_getter=None) -> Dict[str, Any]:
+    keys = {
+        "mlb": _mlb_key,
+        "gtin": lambda r: _row_gtin(r, getter=gtin_getter),
+        "sku": _sku_key,
+        "total": _total_key,
+    }
+    return {d: keys[d] for d in dims}
+
+def _shape_dimensions(g: Dict[str, Any], windows: Iterable[int],
+                      date_field: str, mode: str) -> Dict[str, Any]:
     out: Dict[str, Any] = {}
-    for gtin, lst in groups.items():
-        w = {str(d): window_sums(lst, d, date_field=date_field, mode=mode) for d in windows}
-        out[gtin] = {"title": titles.get(gtin), "windows": w, "mlbs_count": len({x.get("item_id") for x in lst if x.get("item_id")})}
+    if "mlb" in g:
+        out["mlb"] = {k: {"title": v["title"], "windows": v["windows"]} for k, v in g["mlb"].items()}
+    if "gtin" in g:
+        out["gtin"] = {k: _with_mlbs_count(v) for k, v in g["gtin"].items()}
+    if "sku" in g:
+        out["sku"] = {k: _with_mlbs_count(v) for k, v in g["sku"].items()}
+    if "total" in g:
+        out["total"] = _total_windows(g["total"], windows, date_field, mode)
     return out
 
+def per_dimensions(
+    rows: List[Dict[str, Any]],
+    windows: Iterable[int] = (7, 15, 30),
+    date_field: str = "date_approved",
+    *,
+    mode: str = "ml",
+    gtin_getter=None,
+    dims: Iterable[str] = _DIMENSIONS,
+) -> Dict[str, Any]:
+    """
+    Agrega por MLB, GTIN, SKU e total da loja numa única passada sobre as linhas.
+    Cada bloco tem o mesmo formato de per_mlb / per_gtin / per_sku / all_windows.
+    """
+    windows = tuple(windows)
+    g = multi_window_groups(
+        rows, _dimension_keys(dims, gtin_getter), windows=windows, date_field=date_field,
+    )
+    return _shape_dimensions(g, windows, date_field, mode)
+
+def cube_dimensions(
+    cubes: Iterable[Dict[str, Any]],
+    windows: Iterable[int] = (7, 15, 30),
+    *,
+    mode: str = "ml",
+    dims: Iterable[str] = tuple(ROLLUP_KEYS),
+    mlb: Optional[str] = None,
+    sku: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Mesmo contrato (e mesmos números) de per_dimensions para "mlb", "sku" e
+    "total", lendo o cubo diário (ver cube.py). GTIN não sai do cubo (pedidos
+    com vários MLBs do mesmo GTIN): use per_dimensions/per_gtin.
+    Filtros mlb/sku (como em apply_filters) valem só para o bloco "total";
+    title_contains não tem agregado no cubo (use per_dimensions/all_windows).
+    """
+    windows = tuple(windows)
+    if mlb or sku:
+        g = cube_filtered_total(cubes, windows, mlb=mlb, sku=sku)
+    else:
+        g = cube_window_groups(cubes, _dimension_keys(dims), windows=windows)
+    return _shape_dimensions(g, windows, "date_approved", mode)
@@ -6,7 +6,7 @@ from typing import Literal
 
 from app.config.paths import (
     APP_TIMEZONE,
-    vendas_raw_json, vendas_pp_json, vendas_resumo_json, vendas_resumo_hoje_json, vendas_por_mlb_json,
+    vendas_raw_json, vendas_pp_json, vendas_cubo_diario_json, vendas_resumo_json, vendas_resumo_hoje_json, vendas_por_mlb_json,
     pp_dir,
 )
 
@@ -23,6 +23,9 @@ class VendasMeliPaths:
     def pp_json(self) -> Path:
         return vendas_pp_json(self.loja)
 
+    def cubo_diario_json(self) -> Path:
+        return vendas_cubo_diario_json(self.loja)
+
     def resumo_json(self) -> Path:
         return vendas_resumo_json(self.loja)
 
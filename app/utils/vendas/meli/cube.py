@@ -0,0 +1,275 @@
+# app/utils/vendas/meli/cube.py
+"""
+Cubo diário de vendas (rollup materializado no gerar_pp).
+
+Só agregados por célula — nada cresce com o número de pedidos:
+  cells:   (date, loja, item_id, seller_sku) com items, orders (pedidos
+           distintos na célula), qty, gross e paid (por pedido, o maior
+           paid_amount das linhas do pedido na célula), mais o 1º título visto.
+  rollups: as mesmas somas por (date, chave) para as dimensões "mlb", "sku"
+           e "total", deduplicando pedidos dentro da chave.
+
+qty/gross/paid são gravados como parciais exatas (`metrics._parciais`), não
+como um float: somar as parciais das células de uma janela com `_soma` dá,
+bit a bit, o mesmo número do caminho por linhas. Um pedido tem uma data só,
+então somar dias também é exato nas contagens: mlb/sku/total batem com
+per_dimensions/all_windows com ou sem cubo.
+
+GTIN fica fora: um pedido com dois MLBs do mesmo GTIN não se deduplica
+somando células, então get_por_gtin/get_agregados agregam pelas linhas.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.config.paths import APP_TIMEZONE
+from app.utils.core.filtros import ml_window_bounds, _parse_iso
+from .metrics import KeyFn, ROLLUP_KEYS, TOTAL_KEY, _finish_groups, _num, _parciais, _soma
+
+__all__ = ["CUBE_VERSION", "build_daily_cube", "cube_window_groups", "cube_filtered_total"]
+
+CUBE_VERSION = 3
+
+
+def _local_day(s: Optional[str], tz: ZoneInfo) -> Optional[str]:
+    dt = _parse_iso(s)
+    if dt is None:
+        return None
+    return dt.astimezone(tz).date().isoformat()
+
+
+class _CellAcc:
+    """Parcelas de uma célula em construção (linhas na ordem do PP)."""
+    __slots__ = ("items", "qty", "gross", "paid")
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.qty: List[float] = []
+        self.gross: List[float] = []
+        self.paid: Dict[Any, float] = {}
+
+    def add(self, qty: float, gross: float, oid: Any, paid: float) -> None:
+        self.items += 1
+        self.qty.append(qty)
+        self.gross.append(gross)
+        if oid is not None:
+            self.paid[oid] = max(paid, self.paid.get(oid, 0.0))
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "items": self.items, "qty": _parciais(self.qty), "gross": _parciais(self.gross),
+            "orders": len(self.paid), "paid": _parciais(self.paid.values()),
+        }
+
+
+def build_daily_cube(
+    rows: Iterable[Dict[str, Any]],
+    loja: str,
+    *,
+    date_field: str = "date_approved",
+    tz_name: str = APP_TIMEZONE,
+) -> Dict[str, Any]:
+    """
+    Consolida as linhas do PP em células diárias (dia no fuso `tz_name`).
+    Linhas sem data válida vão para células com date=None (fora de qualquer janela,
+    mas ainda contam para título/mlbs_count, como no caminho por linhas).
+    """
+    tz = ZoneInfo(tz_name)
+    day_cache: Dict[Any, Optional[str]] = {}
+    cells: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    accs: Dict[Tuple[Any, ...], _CellAcc] = {}
+    rollups: Dict[str, Dict[Tuple[Optional[str], str], _CellAcc]] = {dim: {} for dim in ROLLUP_KEYS}
+    n_rows = 0
+
+    for pos, r in enumerate(rows):
+        n_rows += 1
+        s = r.get(date_field)
+        day = day_cache.get(s, "")
+        if day == "":
+            day = day_cache[s] = _local_day(s, tz)
+        key = (day, r.get("item_id"), r.get("seller_sku"))
+        c = cells.get(key)
+        if c is None:
+            c = cells[key] = {
+                "date": day, "loja": loja,
+                "item_id": r.get("item_id"), "seller_sku": r.get("seller_sku"),
+                "title": None, "title_pos": None,
+            }
+            accs[key] = _CellAcc()
+        if r.get("title") and c["title"] is None:
+            c["title"], c["title_pos"] = r["title"], pos
+
+        qty = _num(r.get("quantity"))
+        gross = qty * _num(r.get("unit_price"))
+        oid = r.get("order_id")
+        paid = _num(r.get("paid_amount"))
+        accs[key].add(qty, gross, oid, paid)
+        for dim, key_fn in ROLLUP_KEYS.items():
+            k = key_fn(r)
+            if not k:
+                continue
+            acc = rollups[dim].get((day, k))
+            if acc is None:
+                acc = rollups[dim][(day, k)] = _CellAcc()
+            acc.add(qty, gross, oid, paid)
+
+    out_cells = [{**c, **accs[key].result()} for key, c in cells.items()]
+    out_rollups = {
+        dim: [{"date": day, "key": k, **acc.result()} for (day, k), acc in by_key.items()]
+        for dim, by_key in rollups.items()
+    }
+    return {
+        "_meta": {
+            "version": CUBE_VERSION,
+            "loja": loja,
+            "date_field": date_field,
+            "timezone": tz_name,
+            "rows": n_rows,
+            "cells": len(out_cells),
+        },
+        "cells": out_cells,
+        "rollups": out_rollups,
+    }
+
+
+class _WindowSum:
+    """Soma de células numa janela; mesmo formato de `metrics._WindowAcc.result`."""
+    __slots__ = ("items_count", "orders_count", "qty", "gross", "paid")
+
+    def __init__(self) -> None:
+        self.items_count = 0
+        self.orders_count = 0
+        self.qty: List[float] = []
+        self.gross: List[float] = []
+        self.paid: List[float] = []
+
+    def add(self, cell: Dict[str, Any]) -> None:
+        self.items_count += cell.get("items") or 0
+        self.orders_count += cell.get("orders") or 0
+        self.qty.extend(cell.get("qty") or ())
+        self.gross.extend(cell.get("gross") or ())
+        self.paid.extend(cell.get("paid") or ())
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "items_count": self.items_count,
+            "orders_count": self.orders_count,
+            "qty_total": _soma(self.qty, self.items_count),
+            "items_gross": _soma(self.gross, self.items_count),
+            "orders_paid": _soma(self.paid, self.orders_count),
+        }
+
+
+class _Janelas:
+    # dia 'YYYY-MM-DD' -> índices das janelas que o contêm (janelas ML são dias cheios)
+    def __init__(self, wins: List[int], tz_name: str) -> None:
+        self.iso_bounds = [ml_window_bounds(d, tz_name) for d in wins]
+        self.day_bounds = [(a[:10], b[:10]) for a, b in self.iso_bounds]
+        self.cache: Dict[Optional[str], Tuple[int, ...]] = {}
+
+    def hits(self, day: Optional[str]) -> Tuple[int, ...]:
+        h = self.cache.get(day)
+        if h is None:
+            h = self.cache[day] = tuple(
+                i for i, (lo, hi) in enumerate(self.day_bounds) if day and lo <= day <= hi
+            )
+        return h
+
+
+def _novo_grupo(n: int) -> Dict[str, Any]:
+    return {"title": None, "rank": None, "item_ids": set(), "accs": [_WindowSum() for _ in range(n)]}
+
+
+def cube_window_groups(
+    cubes: Iterable[Dict[str, Any]],
+    keys: Mapping[str, KeyFn],
+    windows: Iterable[int] = (7, 15, 30),
+    *,
+    tz_name: str = APP_TIMEZONE,
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Equivalente a `metrics.multi_window_groups` para as dimensões com rollup
+    gravado ("mlb", "sku", "total"), lendo o cubo: custo O(dias × chaves) em
+    vez de O(linhas). As células dão os grupos (na ordem das linhas), o título
+    e os item_ids; os rollups dão as somas, com pedidos deduplicados por chave.
+    """
+    fora = [dim for dim in keys if dim not in ROLLUP_KEYS]
+    if fora:
+        raise ValueError(f"dimensões sem rollup no cubo: {fora} (agregue pelas linhas)")
+    cubes = list(cubes)
+    wins = list(windows)
+    jan = _Janelas(wins, tz_name)
+    groups: Dict[str, Dict[str, Dict[str, Any]]] = {dim: {} for dim in keys}
+    key_items = list(keys.items())
+
+    # 1) células: cria os grupos na ordem das linhas, título (1º visto) e item_ids
+    for ci, cube in enumerate(cubes):
+        for c in cube.get("cells") or []:
+            for dim, key_fn in key_items:
+                k = key_fn(c)
+                if not k:
+                    continue
+                g = groups[dim].get(k)
+                if g is None:
+                    g = groups[dim][k] = _novo_grupo(len(wins))
+                if c.get("title"):
+                    rank = (ci, c.get("title_pos") or 0)
+                    if g["rank"] is None or rank < g["rank"]:
+                        g["title"], g["rank"] = c["title"], rank
+                if c.get("item_id"):
+                    g["item_ids"].add(c["item_id"])
+
+    # 2) rollups: somas com pedidos deduplicados por chave
+    for dim in groups:
+        by_key = groups[dim]
+        for cube in cubes:
+            for c in (cube.get("rollups") or {}).get(dim) or []:
+                g = by_key.get(c["key"])
+                if g is None:
+                    continue
+                for i in jan.hits(c.get("date")):
+                    g["accs"][i].add(c)
+
+    return _finish_groups(groups, wins, jan.iso_bounds)
+
+
+def cube_filtered_total(
+    cubes: Iterable[Dict[str, Any]],
+    windows: Iterable[int] = (7, 15, 30),
+    *,
+    mlb: Optional[str] = None,
+    sku: Optional[str] = None,
+    tz_name: str = APP_TIMEZONE,
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Grupo "total" restrito a mlb e/ou sku (comparação como em apply_filters).
+    Só mlb ou só sku lê o rollup da dimensão; os dois juntos, as células.
+    Filtro por título não tem agregado no cubo: fica no caminho por linhas.
+    """
+    mlb = (mlb or "").strip().lower() or None
+    sku = (sku or "").strip().lower() or None
+    wins = list(windows)
+    jan = _Janelas(wins, tz_name)
+
+    if mlb and sku:
+        nivel = None
+        aceita: Callable[[Dict[str, Any]], bool] = lambda c: (  # noqa: E731
+            str(c.get("item_id", "")).lower() == mlb and str(c.get("seller_sku", "")).lower() == sku
+        )
+    else:
+        nivel, alvo = ("mlb", mlb) if mlb else ("sku", sku)
+        aceita = lambda c: str(c.get("key", "")).lower() == alvo  # noqa: E731
+
+    g: Optional[Dict[str, Any]] = None
+    for cube in cubes:
+        fonte = cube.get("cells") if nivel is None else (cube.get("rollups") or {}).get(nivel)
+        for c in fonte or []:
+            if not aceita(c):
+                continue
+            if g is None:
+                g = _novo_grupo(len(wins))
+            for i in jan.hits(c.get("date")):
+                g["accs"][i].add(c)
+
+    groups = {"total": {} if g is None else {TOTAL_KEY: g}}
+    return _finish_groups(groups, wins, jan.iso_bounds)
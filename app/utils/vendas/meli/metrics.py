@@ -0,0 +1,183 @@
+# app/utils/vendas/meli/metrics.py
+from __future__ import annotations
+import math
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.config.paths import APP_TIMEZONE
+from app.utils.core.filtros import ml_window_bounds, _parse_iso
+
+__all__ = ["KeyFn", "TOTAL_KEY", "ROLLUP_KEYS", "multi_window_groups"]
+
+# key(row) -> chave do grupo (None/"" => linha ignorada naquela dimensão)
+KeyFn = Callable[[Dict[str, Any]], Optional[str]]
+
+TOTAL_KEY = "__total__"
+
+
+def _mlb_key(row: Dict[str, Any]) -> str:
+    return str(row.get("item_id") or "")
+
+
+def _sku_key(row: Dict[str, Any]) -> str:
+    return str(row.get("seller_sku") or "")
+
+
+def _total_key(row: Dict[str, Any]) -> str:
+    return TOTAL_KEY
+
+
+# dimensões que não dependem de dados externos: o cubo diário grava o rollup delas
+ROLLUP_KEYS: Dict[str, KeyFn] = {"mlb": _mlb_key, "sku": _sku_key, "total": _total_key}
+
+
+def _num(x) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return 0.0
+
+
+def _soma(valores: Iterable[float], n: int) -> float:
+    """
+    Soma exata (correctly rounded) de `valores`; 0 (int) se não houve parcela,
+    como o sum() de uma janela vazia. Independe da ordem das parcelas: o cubo
+    diário soma por célula e bate bit a bit com o caminho por linhas.
+    """
+    return math.fsum(valores) if n else 0
+
+
+def _parciais(valores: Iterable[float]) -> List[float]:
+    """
+    Parciais não sobrepostas (Shewchuk) cuja soma exata é a soma exata de
+    `valores`: o cubo grava isto por célula e `_soma` das parciais de várias
+    células dá o mesmo resultado de `_soma` sobre as linhas.
+    """
+    valores = list(valores)
+    if len(valores) < 2:  # maioria das células: uma linha só
+        return [x for x in valores if x]
+    parts: List[float] = []
+    for x in valores:
+        i = 0
+        for y in parts:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                parts[i] = lo
+                i += 1
+            x = hi
+        parts[i:] = [x]
+    return [p for p in parts if p]
+
+
+class _WindowAcc:
+    """
+    Acumulador de uma janela para um grupo. Somas exatas (`_soma`): resultados
+    idênticos a `summarize` e ao cubo diário, qualquer que seja a ordem.
+    """
+    __slots__ = ("items_count", "qty", "gross", "paid")
+
+    def __init__(self) -> None:
+        self.items_count = 0
+        self.qty: List[float] = []
+        self.gross: List[float] = []
+        self.paid: Dict[Any, float] = {}
+
+    def add(self, qty: float, gross: float, oid: Any, paid: float) -> None:
+        self.items_count += 1
+        self.qty.append(qty)
+        self.gross.append(gross)
+        if oid is not None:
+            self.paid[oid] = max(paid, self.paid.get(oid, 0.0))
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "items_count": self.items_count,
+            "orders_count": len(self.paid),
+            "qty_total": _soma(self.qty, self.items_count),
+            "items_gross": _soma(self.gross, self.items_count),
+            "orders_paid": _soma(self.paid.values(), len(self.paid)),
+        }
+
+
+def _window_hits(s: Optional[str], bounds: List[Tuple[float, float]]) -> Tuple[int, ...]:
+    dt = _parse_iso(s)
+    if dt is None:
+        return ()
+    ts = dt.timestamp()
+    return tuple(i for i, (lo, hi) in enumerate(bounds) if lo <= ts <= hi)
+
+
+def multi_window_groups(
+    rows: Iterable[Dict[str, Any]],
+    keys: Mapping[str, KeyFn],
+    windows: Iterable[int] = (7, 15, 30),
+    date_field: str = "date_approved",
+    tz_name: str = APP_TIMEZONE,
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Motor de agregação em passada única: cada data é parseada uma vez e cada
+    linha alimenta, para TODAS as dimensões em `keys`, os acumuladores das
+    janelas (modo ML) que a contêm.
+
+    Retorna {dimensao: {chave: {"title", "item_ids", "windows": {str(d): resumo}}}},
+    onde cada resumo tem o mesmo formato de `aggregator.window_sums`.
+    """
+    wins = list(windows)
+    iso_bounds = [ml_window_bounds(d, tz_name) for d in wins]
+    bounds = [(_parse_iso(a).timestamp(), _parse_iso(b).timestamp()) for a, b in iso_bounds]
+    # linhas do mesmo pedido compartilham a data: parse uma vez por string distinta
+    hits_cache: Dict[Any, Tuple[int, ...]] = {}
+
+    groups: Dict[str, Dict[str, Dict[str, Any]]] = {dim: {} for dim in keys}
+    key_items = list(keys.items())
+
+    for r in rows:
+        s = r.get(date_field)
+        hits = hits_cache.get(s)
+        if hits is None:
+            hits = hits_cache[s] = _window_hits(s, bounds)
+        if hits:
+            qty = _num(r.get("quantity"))
+            gross = qty * _num(r.get("unit_price"))
+            oid = r.get("order_id")
+            paid = _num(r.get("paid_amount"))
+        title = r.get("title")
+        item_id = r.get("item_id")
+
+        for dim, key_fn in key_items:
+            k = key_fn(r)
+            if not k:
+                continue
+            g = groups[dim].get(k)
+            if g is None:
+                g = {"title": None, "item_ids": set(), "accs": [_WindowAcc() for _ in wins]}
+                groups[dim][k] = g
+            if title and g["title"] is None:
+                g["title"] = title
+            if item_id:
+                g["item_ids"].add(item_id)
+            for i in hits:
+                g["accs"][i].add(qty, gross, oid, paid)
+
+    return _finish_groups(groups, wins, iso_bounds)
+
+
+def _finish_groups(
+    groups: Dict[str, Dict[str, Dict[str, Any]]],
+    wins: List[int],
+    iso_bounds: List[Tuple[str, str]],
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for dim, by_key in groups.items():
+        dim_out: Dict[str, Dict[str, Any]] = {}
+        for k, g in by_key.items():
+            w: Dict[str, Any] = {}
+            for d, (win_from, win_to), acc in zip(wins, iso_bounds, g["accs"]):
+                res = acc.result()
+                res.update({"days": d, "from": win_from, "to": win_to})
+                w[str(d)] = res
+            dim_out[k] = {"title": g["title"], "item_ids": g["item_ids"], "windows": w}
+        out[dim] = dim_out
+    return out
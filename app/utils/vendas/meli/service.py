@@ -3,11 +3,12 @@ from __future__ import annotations
 
 from typing import Iterable, Dict, Any, List, Optional, Literal
 
-from app.config.paths import APP_TIMEZONE, vendas_pp_json
+from app.config.paths import APP_TIMEZONE, vendas_pp_json, vendas_cubo_diario_json
 from app.utils.core.io import ler_json
 from app.utils.core.filtros import rows_today, today_bounds
 from app.utils.anuncios.service import listar_anuncios_pp  # consumo cross-domínio (service→service)
-from .aggregator import summarize, per_mlb, all_windows, per_gtin
+from .aggregator import summarize, per_mlb, all_windows, per_gtin, per_dimensions, cube_dimensions
+from .cube import CUBE_VERSION, build_daily_cube
 import re
 
 from .filters import (
@@ -34,6 +35,9 @@ __all__ = [
     "get_por_mlb_br",
     "get_por_gtin",
     "get_por_gtin_br",
+    "get_agregados",
+    "get_agregados_br",
+    "construir_cubo_diario",
 ]
 
 # ----------------------------
@@ -61,7 +65,35 @@ def get_por_gtin_br(
     gtin_getter = gtin_getter or _gtin_getter_factory(None)  # None => SP+MG
     return per_gtin(rows, windows=windows, mode=mode, gtin_getter=gtin_getter)
 
+def get_agregados(
+    loja: Loja,
+    windows: Iterable[int] = (7, 15, 30),
+    *,
+    mode: str = "ml",
+    gtin_getter=None,
+) -> Dict[str, Any]:
+    """
+    MLB, GTIN, SKU e total da loja calculados numa única passada sobre o PP.
+    Chaves: "mlb" | "gtin" | "sku" | "total" (mesmos formatos de get_por_mlb,
+    get_por_gtin e get_resumos()["result"]). Sempre pelas linhas: o GTIN não
+    sai do cubo diário (ver cube.py).
+    """
+    rows = _load_pp(loja)
+    gtin_getter = gtin_getter or _gtin_getter_factory(loja)
+    return per_dimensions(rows, windows=windows, mode=mode, gtin_getter=gtin_getter)
 
+def get_agregados_br(
+    windows: Iterable[int] = (7, 15, 30),
+    *,
+    mode: str = "ml",
+    gtin_getter=None,
+) -> Dict[str, Any]:
+    """
+    Como get_agregados, somando MG+SP.
+    """
+    rows = listar_vendas_br()
+    gtin_getter = gtin_getter or _gtin_getter_factory(None)
+    return per_dimensions(rows, windows=windows, mode=mode, gtin_getter=gtin_getter)
 
 def listar_vendas_br() -> list[dict]:
     """
@@ -82,20 +114,26 @@ def get_resumos_br(
     """
     Resumo de janelas no total BR (MG+SP).
     """
-    rows = listar_vendas_br()
-    return {
-        "loja": "br",
-        "windows": list(windows),
-        "filters": {"title_contains": title_contains},
-        "mode": mode,
-        "result": all_windows(
-            rows,
+    windows = tuple(windows)
+    # filtro por título não tem agregado no cubo: caminho por linhas
+    cubes = None if title_contains else _load_cubes(["sp", "mg"], date_field=date_field)
+    if cubes is not None:
+        result = cube_dimensions(cubes, windows, mode=mode, dims=("total",))["total"]
+    else:
+        result = all_windows(
+            listar_vendas_br(),
             windows=windows,
             date_field=date_field,
             mlb=None, sku=None,
             title_contains=title_contains,
             mode=mode,
-        ),
+        )
+    return {
+        "loja": "br",
+        "windows": list(windows),
+        "filters": {"title_contains": title_contains},
+        "mode": mode,
+        "result": result,
     }
 
 def get_por_mlb_br(
@@ -106,6 +144,9 @@ def get_por_mlb_br(
     """
     Agregado por MLB somando MG+SP nas janelas informadas.
     """
+    cubes = _load_cubes(["sp", "mg"])
+    if cubes is not None:
+        return cube_dimensions(cubes, windows, mode=mode, dims=("mlb",))["mlb"]
     rows = listar_vendas_br()
     return per_mlb(rows, windows=windows, mode=mode)
 
@@ -126,6 +167,31 @@ def _load_pp(loja: Loja) -> List[Dict[str, Any]]:
     """
     return ler_json(vendas_pp_json(loja))
 
+def _load_cube(loja: Loja) -> Optional[Dict[str, Any]]:
+    """
+    Lê o cubo diário da loja se ele estiver em dia com o PP
+    (mtime >= mtime do PP e mesma versão). None => recalcular pelas linhas.
+    """
+    cube_path = vendas_cubo_diario_json(loja)
+    try:
+        if cube_path.stat().st_mtime < vendas_pp_json(loja).stat().st_mtime:
+            return None
+        cube = ler_json(cube_path)
+    except (OSError, ValueError):
+        return None
+    if (cube.get("_meta") or {}).get("version") != CUBE_VERSION:
+        return None
+    return cube
+
+def _load_cubes(lojas: Iterable[Loja], date_field: str = "date_approved") -> Optional[List[Dict[str, Any]]]:
+    cubes: List[Dict[str, Any]] = []
+    for loja in lojas:
+        cube = _load_cube(loja)
+        if cube is None or cube["_meta"].get("date_field") != date_field:
+            return None
+        cubes.append(cube)
+    return cubes
+
 _DIGITS = re.compile(r"\d+")
 
 def _normalize_ean_like(s: str | None) -> str | None:
@@ -181,6 +247,18 @@ def _gtin_getter_factory(loja: Loja | None):
 # Fachada pública (contratos)
 # ----------------------------
 
+def construir_cubo_diario(
+    loja: Loja,
+    rows: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Monta (em memória) o cubo diário da loja a partir das linhas do PP.
+    Não depende dos anúncios (GTIN é agregado pelas linhas, não pelo cubo).
+    A gravação fica a cargo do job (scripts.vendas.gerar_pp).
+    """
+    rows = _load_pp(loja) if rows is None else rows
+    return build_daily_cube(rows, loja)
+
 def listar_vendas(loja: Loja) -> List[Dict[str, Any]]:
     """
     Retorna as linhas normalizadas (PP) já consolidadas.
@@ -199,22 +277,31 @@ def get_resumos(
 ) -> Dict[str, Any]:
     """
     Resumo por janelas (ex.: 7/15/30 dias), com filtros opcionais.
+    Usa o cubo diário quando disponível (janelas arbitrárias: 60, 90, 365...);
+    com title_contains, agrega pelas linhas do PP.
     """
-    rows = _load_pp(loja)
-    return {
-        "loja": loja,
-        "windows": list(windows),
-        "filters": {"mlb": mlb, "sku": sku, "title_contains": title_contains},
-        "mode": mode,
-        "result": all_windows(
-            rows,
+    windows = tuple(windows)
+    # filtro por título não tem agregado no cubo: caminho por linhas
+    cubes = None if title_contains else _load_cubes([loja], date_field=date_field)
+    if cubes is not None:
+        result = cube_dimensions(cubes, windows, mode=mode, dims=("total",),
+                                 mlb=mlb, sku=sku)["total"]
+    else:
+        result = all_windows(
+            _load_pp(loja),
             windows=windows,
             date_field=date_field,
             mlb=mlb,
             sku=sku,
             title_contains=title_contains,
             mode=mode,
-        ),
+        )
+    return {
+        "loja": loja,
+        "windows": list(windows),
+        "filters": {"mlb": mlb, "sku": sku, "title_contains": title_contains},
+        "mode": mode,
+        "result": result,
     }
 
 def get_por_mlb(
@@ -226,6 +313,9 @@ def get_por_mlb(
     """
     Agregado por MLB (mantém compatibilidade com dashboards).
     """
+    cubes = _load_cubes([loja])
+    if cubes is not None:
+        return cube_dimensions(cubes, windows, mode=mode, dims=("mlb",))["mlb"]
     rows = _load_pp(loja)
     return per_mlb(rows, windows=windows, mode=mode)
 
@@ -233,14 +323,20 @@ def get_resumo_hoje(loja: Loja) -> Dict[str, Any]:
     """
     Resumo apenas de hoje (fronteiras segundo APP_TIMEZONE).
     """
-    rows = _load_pp(loja)
-    subset = rows_today(rows, date_field="date_approved", tz_name=APP_TIMEZONE)
+    cubes = _load_cubes([loja])
+    if cubes is not None:
+        # janela ML de 0 dias == hoje 00:00 .. 23:59:59
+        hoje = cube_dimensions(cubes, (0,), dims=("total",))["total"]["0"]
+        result = {k: v for k, v in hoje.items() if k not in ("days", "from", "to")}
+    else:
+        rows = _load_pp(loja)
+        result = summarize(rows_today(rows, date_field="date_approved", tz_name=APP_TIMEZONE))
     since, until = today_bounds(APP_TIMEZONE)
     return {
         "loja": loja,
         "date": since.split("T")[0],
         "window": {"from": since, "to": until, "timezone": APP_TIMEZONE},
-        "result": summarize(subset),
+        "result": result,
     }
 
 def filtrar_por_mlb(loja: Loja, mlb: str) -> List[Dict[str, Any]]:
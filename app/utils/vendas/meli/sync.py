@@ -0,0 +1,108 @@
+# app/utils/vendas/meli/sync.py
+"""
+Sincronização incremental do RAW de vendas (vendas.json) por marca d'água.
+
+O RAW guarda em "sync.last_updated" o limite superior da última busca.
+Na próxima execução basta pedir ao /orders/search os pedidos com
+last_updated >= marca - sobreposição e mesclar por order id.
+"""
+from __future__ import annotations
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.core.filtros import _parse_iso
+
+__all__ = [
+    "SYNC_OVERLAP_MINUTES",
+    "read_watermark",
+    "incremental_since",
+    "merge_orders",
+    "prune_window",
+]
+
+# margem de segurança contra consistência eventual da busca do ML
+SYNC_OVERLAP_MINUTES = 10
+
+
+def _order_updated(order: Dict[str, Any]):
+    return _parse_iso(order.get("last_updated") or order.get("date_last_updated"))
+
+
+def read_watermark(raw_payload: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Marca d'água (ISO) gravada no RAW, ou None se nunca sincronizado."""
+    if not isinstance(raw_payload, dict):
+        return None
+    return (raw_payload.get("sync") or {}).get("last_updated")
+
+
+def incremental_since(
+    raw_payload: Optional[Dict[str, Any]],
+    date_from_iso: str,
+    *,
+    overlap_minutes: int = SYNC_OVERLAP_MINUTES,
+) -> Optional[str]:
+    """
+    Retorna o 'since' (ISO) da busca incremental, ou None quando é preciso
+    refazer a janela completa: RAW sem marca d'água ou que não cobre o
+    início da janela pedida (ex.: RAW de 30 dias e pedido de 60).
+    """
+    mark = _parse_iso(read_watermark(raw_payload))
+    if mark is None:
+        return None
+    win_from = _parse_iso((raw_payload.get("window") or {}).get("from"))
+    want_from = _parse_iso(date_from_iso)
+    if win_from is None or want_from is None or win_from > want_from:
+        return None
+    since = mark - timedelta(minutes=overlap_minutes)
+    return since.isoformat(timespec="seconds")
+
+
+def merge_orders(
+    existing: Iterable[Dict[str, Any]],
+    updates: Iterable[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Mescla pedidos por id: novos entram, atualizados substituem o anterior
+    (a não ser que o anterior tenha last_updated mais recente).
+    Retorna (pedidos, {"added", "updated", "unchanged"}).
+    """
+    by_id: Dict[Any, Dict[str, Any]] = {}
+    for o in existing:
+        oid = o.get("id")
+        if oid is not None:
+            by_id[oid] = o
+    base = len(by_id)
+
+    added = updated = 0
+    for o in updates:
+        oid = o.get("id")
+        if oid is None:
+            continue
+        old = by_id.get(oid)
+        if old is None:
+            added += 1
+        else:
+            t_old, t_new = _order_updated(old), _order_updated(o)
+            if t_old and t_new and t_new < t_old:
+                continue
+            updated += 1
+        by_id[oid] = o
+
+    stats = {"added": added, "updated": updated, "unchanged": base - updated}
+    return list(by_id.values()), stats
+
+
+def prune_window(orders: Iterable[Dict[str, Any]], date_from_iso: str) -> List[Dict[str, Any]]:
+    """
+    Mantém pedidos criados a partir de date_from_iso (mesmo recorte da busca
+    completa), ordenados por date_created asc. Datas ilegíveis são mantidas.
+    """
+    dt_from = _parse_iso(date_from_iso)
+    keep: List[Tuple[Any, int, Dict[str, Any]]] = []
+    for i, o in enumerate(orders):
+        dt = _parse_iso(o.get("date_created"))
+        if dt is not None and dt_from is not None and dt < dt_from:
+            continue
+        keep.append((dt.timestamp() if dt else float("inf"), i, o))
+    keep.sort(key=lambda t: (t[0], t[1]))
+    return [o for _, _, o in keep]
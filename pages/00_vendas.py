@@ -38,17 +38,19 @@ def _run(cmd: list[str]) -> tuple[int, str]:
     except Exception as e:
         return 1, f"[ERRO] {e}"
 
-def atualizar_pipeline_vendas():
+def atualizar_pipeline_vendas(full: bool = False):
     """
     Dispara os scripts do pipeline RAW→PP.
     Usa invocação por módulo (-m) e loja posicional (sp|mg).
+    Por padrão o RAW é sincronizado de forma incremental; full=True refaz a janela.
     """
     py = sys.executable or "python"
+    extra = ["--full"] if full else []
 
     cmds = [
-        # 1) RAW (últimos 30 dias)
-        [py, "-m", "scripts.vendas.meli_vendas_fetch_range", "sp", "--days", "30"],
-        [py, "-m", "scripts.vendas.meli_vendas_fetch_range", "mg", "--days", "30"],
+        # 1) RAW (últimos 30 dias; incremental por marca d'água)
+        [py, "-m", "scripts.vendas.meli_vendas_fetch_range", "sp", "--days", "30", *extra],
+        [py, "-m", "scripts.vendas.meli_vendas_fetch_range", "mg", "--days", "30", *extra],
 
         # 2) PP (aceita sp|mg|all; aqui geramos por loja)
         [py, "-m", "scripts.vendas.gerar_pp", "sp"],
@@ -67,10 +69,13 @@ def atualizar_pipeline_vendas():
 
 
 col1, col2 = st.columns([1, 5])
+with col2:
+    full_refetch = st.checkbox("Rebuscar janela completa (30 dias)", value=False,
+                               help="Ignora a sincronização incremental e refaz o RAW do zero.")
 with col1:
     if st.button("🔁 Atualizar vendas", use_container_width=True, type="primary"):
         with st.status("Atualizando RAW → PP...", expanded=True) as s:
-            ok, logs = atualizar_pipeline_vendas()
+            ok, logs = atualizar_pipeline_vendas(full=full_refetch)
             st.code(logs, language="bash")
             if ok:
                 s.update(label="✅ Atualizado com sucesso!", state="complete")
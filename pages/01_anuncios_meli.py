@@ -31,7 +31,8 @@ with col3:
 
 st.divider()
 st.subheader("Atualização de anúncios (RAW → PP)")
-st.caption("Roda: atualizar_raw.py e depois gerar_pp.py para **SP** e **MG**. O dashboard recarrega ao final.")
+st.caption("Roda atualizar_raw.py (incremental: baixa só anúncios novos/alterados e já aplica no PP) "
+           "para **SP** e **MG**. O dashboard recarrega ao final.")
 
 def _run(cmd: list[str], env: dict, cwd: str | None = None) -> tuple[int, str, str]:
     res = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=cwd)
@@ -57,7 +58,7 @@ with colA:
 
         with st.spinner("Atualizando RAW e PP de anúncios..."):
             for r in regions:
-                # 1) RAW
+                # RAW + PP (patch incremental)
                 cmd_raw = [sys.executable, "-m", "scripts.anuncios.meli.atualizar_raw", "--regiao", r.lower()]
                 rc1, out1, err1 = _run(cmd_raw, env, cwd=ROOT_DIR)
                 logs.append((f"RAW {r}", rc1, out1, err1))
@@ -68,17 +69,6 @@ with colA:
                             st.code(err1 or out1)
                     st.stop()
 
-                # 2) PP
-                cmd_pp = [sys.executable, "-m", "scripts.anuncios.meli.gerar_pp", "--regiao", r.lower()]
-                rc2, out2, err2 = _run(cmd_pp, env, cwd=ROOT_DIR)
-                logs.append((f"PP {r}", rc2, out2, err2))
-                if rc2 != 0:
-                    st.error(f"Falha ao gerar PP ({r}).")
-                    if err2 or out2:
-                        with st.expander(f"Log PP {r}"):
-                            st.code(err2 or out2)
-                    st.stop()
-
         st.success("Anúncios atualizados com sucesso para SP e MG.")
         with st.expander("Ver logs"):
             for name, rc, out, err in logs:
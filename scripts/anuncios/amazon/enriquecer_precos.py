@@ -210,7 +210,8 @@ def main() -> int:
     ap = argparse.ArgumentParser(description="Enriquece preços no PP de anúncios Amazon.")
     ap.add_argument("--regiao", required=True, choices=["sp", "mg"], type=lambda s: s.lower())
     ap.add_argument("--keep", type=int, default=5, help="qtd de backups do PP")
-    ap.add_argument("--delay", type=float, default=0.3, help="delay entre chamadas (s)")
+    ap.add_argument("--delay", type=float, default=0.0,
+                    help="delay extra entre itens (s); o client já aplica rate limit/backoff")
     ap.add_argument("--all", dest="only_missing", action="store_false", help="atualiza todos (não só missing)")
     ap.add_argument("--limit", type=int, default=None, help="limite de itens processados (debug)")
     args = ap.parse_args()
@@ -14,11 +14,16 @@ from app.config.paths import (
     LOGS_DIR,
 )
 
+from app.utils.core.io import ler_json
+from app.utils.core.result_sink.json_file_sink import JsonFileSink
 from app.utils.meli.client import MeliClient
 # Quando executado direto (python scripts\anuncios\meli\atualizar_raw.py), __package__ pode estar vazio.
 # Usamos import relativo se rodar com `-m`, e absoluto se rodar como script.
 
 from app.utils.anuncios import config as anuncios_cfg
+from app.utils.anuncios import sync
+from app.utils.anuncios.preprocess import normalizar_raw_para_pp
+from app.utils.anuncios.schemas import validate_envelope
 
 
 def _setup_logger() -> None:
@@ -138,11 +143,13 @@ def _has_gtin(item: dict, gtin: str) -> bool:
                 return True
     return False
 
-def _fetch_items_details(cli: MeliClient, ids: list[str]) -> list[dict]:
+def _fetch_items_details(cli: MeliClient, ids: list[str], *, workers: int = 8,
+                         full_body: bool = False) -> list[dict]:
     import logging
-    logging.info("Baixando detalhes em lote ...")
+    logging.info("Baixando detalhes em lote (%d IDs, workers=%d) ...", len(ids), workers)
 
-    resp = cli.get_items_bulk(ids)  # pode vir [{"code":200,"body":{...}}, {"code":404,...}, ...]
+    attributes = None if full_body else anuncios_cfg.RAW_ITEM_ATTRIBUTES
+    resp = cli.get_items_bulk(ids, attributes=attributes, workers=workers)  # pode vir [{"code":200,"body":{...}}, {"code":404,...}, ...]
     items, misses = [], []
 
     # 1) Desembrulhar {code, body} e coletar "misses"
@@ -209,39 +216,115 @@ def _persist_raw(regiao: Regiao, payload: Dict[str, Any]) -> Path:
     return target
 
 
-def run_for_regiao(regiao: Regiao) -> Path:
+def _ler_raw_anterior(regiao: Regiao) -> Dict[str, Any]:
+    target = anuncios_json(Marketplace.MELI, Camada.RAW, regiao)
+    if not target.exists():
+        return {}
+    try:
+        env = ler_json(target)
+    except Exception as e:
+        logging.warning("RAW anterior ilegível (%s): %s — refresh completo.", target, e)
+        return {}
+    return env if isinstance(env, dict) else {}
+
+
+def _rescue_watch_gtins(cli: MeliClient, seller_id: str, known: list[dict], listed: list[str]) -> list[str]:
+    """
+    Rescue opcional por GTIN(s) que não apareceram no scan: IDs do seller
+    achados pela busca por GTIN e fora da listagem. Entram em listed_ids antes
+    do plan_refresh — senão viram tombstone e são resgatados de novo a cada run.
+    """
+    listed_set = set(listed)
+    scanned = [it for it in known if str(it.get("id") or "") in listed_set and not sync.is_tombstone(it)]
+    extra: list[str] = []
+    watch_gtins = getattr(anuncios_cfg, "WATCH_GTINS", [])  # ou passe por CLI
+    for g in watch_gtins:
+        if not any(_has_gtin(it, g) for it in scanned):
+            for i in _rescue_ids_by_gtin(cli, seller_id, g):
+                if i not in listed_set:
+                    listed_set.add(i)
+                    extra.append(i)
+    return extra
+
+
+def _persist_pp(regiao: Regiao, raw_items: list[dict], fetched: list[dict],
+                removed: list[str], summary: Dict[str, Any], *, rebuild: bool) -> Path:
+    """
+    Aplica o refresh no PP atual (só itens baixados/removidos são tocados).
+    rebuild=True (ou PP ausente/inválido) regera o PP inteiro a partir do RAW.
+    """
+    target = anuncios_cfg.PP_PATH(regiao.value)
+    env = None
+    if not rebuild and target.exists():
+        try:
+            env = ler_json(target)
+        except Exception:
+            env = None
+    if isinstance(env, dict) and validate_envelope(env):
+        data = sync.patch_pp(env["data"], fetched, removed)
+    else:
+        data = normalizar_raw_para_pp({"items": raw_items})
+    payload = {
+        "marketplace": "meli",
+        "regiao": regiao.value,
+        "total": len(data),
+        "data": data,
+        "_source": anuncios_json(Marketplace.MELI, Camada.RAW, regiao).name,
+        "_sync": {k: v for k, v in summary.items() if k != "ids"},
+    }
+    logging.info("Gravando PP em %s ...", target)
+    JsonFileSink(output_dir=target.parent, filename=target.name, keep=5).emit(payload)
+    return target
+
+
+def run_for_regiao(regiao: Regiao, *, workers: int = 8, full_body: bool = False,
+                   full: bool = False) -> Path:
+    """
+    Atualiza RAW + PP da região. Por padrão é incremental: sonda barata de todos
+    os MLBs, download só de novos/alterados e tombstone dos removidos.
+    full=True (ou sem RAW anterior compatível) baixa todos os itens.
+    """
     loja = regiao.value  # "sp" / "mg"
     cli, seller_id = _build_client(loja)
 
     ids = _fetch_all_items(cli, seller_id)          # agora retorna dedup
-    items = _fetch_items_details(cli, ids)          # agora retorna dedup
 
-    # Rescue opcional por GTIN(s)
-    watch_gtins = getattr(anuncios_cfg, "WATCH_GTINS", [])  # ou passe por CLI
-    for g in watch_gtins:
-        if not any(_has_gtin(it, g) for it in items):
-            rescue_ids = _rescue_ids_by_gtin(cli, seller_id, g)
-            if rescue_ids:
-                rescued = _fetch_items_details(cli, rescue_ids)
-                for r in rescued:
-                    if isinstance(r, dict) and r.get("id"):
-                        items.append(r)
-
-    # blindagem extra antes de gravar
-    seen, unique_items = set(), []
-    for it in items:
-        k = str(it.get("id") or "")
-        if k and k not in seen:
-            seen.add(k)
-            unique_items.append(it)
-    items = unique_items
+    prev_env = _ler_raw_anterior(regiao)
+    prev_items = prev_env.get("items") or prev_env.get("data") or []
+    prev_meta = prev_env.get("metadata") or {}
+    rescued = _rescue_watch_gtins(cli, seller_id, prev_items, ids)
+    if rescued:
+        logging.info("Resgatados por GTIN fora do scan: %d MLBs (%s)", len(rescued), ",".join(rescued[:20]))
+        ids = ids + rescued
+    attributes = None if full_body else list(anuncios_cfg.RAW_ITEM_ATTRIBUTES)
+    # projeção diferente da anterior (ex.: --full-body) exige rebaixar tudo
+    incremental = not full and bool(prev_items) and prev_meta.get("attributes") == attributes
+
+    if incremental:
+        logging.info("Sondando %d MLBs (%s) ...", len(ids), ",".join(sync.PROBE_ATTRIBUTES))
+        probes = cli.get_items_bulk(ids, attributes=sync.PROBE_ATTRIBUTES, workers=workers)
+        plan = sync.plan_refresh(prev_items, probes, ids)
+        to_fetch = plan["new"] + plan["changed"]
+        fetched = _fetch_items_details(cli, to_fetch, workers=workers, full_body=full_body) if to_fetch else []
+    else:
+        fetched = _fetch_items_details(cli, ids, workers=workers, full_body=full_body)
+        plan = sync.plan_refresh(prev_items, fetched, ids)
+
+    items = sync.patch_items(prev_items, fetched, plan["removed"])
+
+    summary = sync.change_summary(plan, mode="incremental" if incremental else "full",
+                                  fetched=len(fetched))
+    logging.info(
+        "Refresh %s [%s]: novos=%d alterados=%d inalterados=%d removidos=%d falhos=%d baixados=%d",
+        regiao.value.upper(), summary["mode"], summary["new"], summary["changed"],
+        summary["unchanged"], summary["removed"], summary["failed"], summary["fetched"],
+    )
+    if plan["failed"]:
+        logging.warning("%d MLBs listados sem resposta do /items (mantidos como estavam): %s",
+                        len(plan["failed"]), ",".join(plan["failed"][:20]))
 
-    # sanity (opcional): logar se vier algo repetido
-    from collections import Counter
-    ids_list = [str(i.get("id") or "") for i in items]
-    dups = [k for k, c in Counter(ids_list).items() if c > 1 and k]
-    if dups:
-        logging.warning("Ainda há IDs duplicados no payload: %s", dups)
+    history = list(prev_meta.get("sync_history") or [])
+    history.append({k: v for k, v in summary.items() if k != "ids"})
 
     payload = {
         "metadata": {
@@ -249,25 +332,36 @@ def run_for_regiao(regiao: Regiao) -> Path:
             "marketplace": Marketplace.MELI.value,
             "regiao": regiao.value,
             "seller_id": seller_id,
-            "count": len(items),  # contar APÓS a dedup
+            "count": sum(1 for it in items if not sync.is_tombstone(it)),
+            "tombstones": sum(1 for it in items if sync.is_tombstone(it)),
             "source": "users/{seller}/items/search + items?ids",
+            "attributes": attributes,
+            "sync": summary,
+            "sync_history": history[-sync.SYNC_HISTORY_MAX:],
         },
         "items": items,
     }
-    return _persist_raw(regiao, payload)
-
+    logging.info("HTTP stats: %s", cli.http.stats())
+    target = _persist_raw(regiao, payload)
+    _persist_pp(regiao, items, fetched, plan["removed"], summary, rebuild=not incremental)
+    return target
 
 
 def main() -> None:
     _setup_logger()
-    parser = argparse.ArgumentParser(description="Atualiza anúncios RAW (SP/MG).")
+    parser = argparse.ArgumentParser(description="Atualiza anúncios RAW + PP (SP/MG), incremental por padrão.")
     parser.add_argument("--regiao", choices=["sp", "mg", "ambas"], type=lambda s: s.lower(), default="ambas")
+    parser.add_argument("--workers", type=int, default=8, help="Lotes /items?ids= em paralelo.")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebaixa todos os itens (ignora o refresh incremental).")
+    parser.add_argument("--full-body", action="store_true",
+                        help="Grava o item completo (sem projeção attributes=).")
     args = parser.parse_args()
 
     regioes = [Regiao.SP, Regiao.MG] if args.regiao == "ambas" else [Regiao(args.regiao)]
     for r in regioes:
         try:
-            path = run_for_regiao(r)
+            path = run_for_regiao(r, workers=args.workers, full_body=args.full_body, full=args.full)
             logging.info("✓ RAW atualizado para %s em %s", r.value.upper(), path)
         except Exception as e:
             logging.exception("Falha ao atualizar RAW para %s: %s", r.value.upper(), e)
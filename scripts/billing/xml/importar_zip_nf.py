@@ -42,9 +42,10 @@ def main():
     ap.add_argument("--mes", type=int, required=True)
     ap.add_argument("--regiao", action="append", required=True, help="Use múltiplas --regiao sp --regiao mg")
     ap.add_argument("--sink", choices=("file","stdout","both"), default="file")
+    ap.add_argument("--workers", type=int, default=1, help="Processos p/ parsear os XMLs (1 = serial)")
     args = ap.parse_args()
 
-    notas = carregar_e_normalizar(market=args.market, ano=args.ano, mes=args.mes, regioes=args.regiao)
+    notas = carregar_e_normalizar(market=args.market, ano=args.ano, mes=args.mes, regioes=args.regiao, workers=args.workers)
 
     # Emite por REGIÃO separadamente (mantendo o “dono” regional do artefato)
     for regiao in args.regiao:
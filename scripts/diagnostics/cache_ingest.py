@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Inspeciona/limpa o cache de planilhas lidas (pastas .ingest_cache/ ao lado
+dos Excel de billing e custos).
+
+  python -m scripts.diagnostics.cache_ingest listar
+  python -m scripts.diagnostics.cache_ingest limpar --orfas --dry-run
+  python -m scripts.diagnostics.cache_ingest limpar --dias 90
+"""
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+from app.config.paths import DATA_DIR
+from app.utils.core.excel_cache import limpar_cache, listar_cache
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f} MB"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cache de ingest de Excel (.ingest_cache): listar / limpar.")
+    ap.add_argument("--raiz", default=str(DATA_DIR), help="Pasta varrida recursivamente (padrão: DATA_DIR)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ls = sub.add_parser("listar", help="Lista as entradas do cache")
+    ls.add_argument("--json", action="store_true", help="Saída em JSON (uma lista)")
+
+    rm = sub.add_parser("limpar", help="Remove entradas (padrão: todas)")
+    rm.add_argument("--orfas", action="store_true", help="Só órfãs (origem sumiu) e substituídas (versão antiga da mesma leitura/params)")
+    rm.add_argument("--dias", type=float, default=None, help="Só entradas com mais de N dias")
+    rm.add_argument("--dry-run", action="store_true", help="Mostra o que seria removido, sem remover")
+    args = ap.parse_args()
+
+    raiz = Path(args.raiz)
+    if args.cmd == "listar":
+        itens = listar_cache(raiz)
+        if args.json:
+            print(json.dumps(itens, ensure_ascii=False, indent=2))
+            return
+        for i in itens:
+            flags = ",".join(k for k in ("orfa", "substituida") if i[k]) or "-"
+            print(f"{i['formato']:7} {_mb(i['bytes']):>10} {i['idade_dias']:>6}d {flags:17} {i['arquivo']}")
+        print(f"[ok] entradas={len(itens)} | total={_mb(sum(i['bytes'] for i in itens))}")
+        return
+
+    itens = limpar_cache(raiz, orfas=args.orfas, dias=args.dias, dry_run=args.dry_run)
+    for i in itens:
+        print(("[dry-run] " if args.dry_run else "[rm] ") + i["arquivo"])
+    print(f"[ok] removidas={len(itens)} | liberado={_mb(sum(i['bytes'] for i in itens))}"
+          + (" (dry-run)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
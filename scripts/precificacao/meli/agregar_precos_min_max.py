@@ -16,7 +16,7 @@ from typing import Dict, Any, List
 from app.config.paths import Regiao
 from app.utils.precificacao.config import get_precificacao_dataset_path
 from app.utils.precificacao.service import salvar_dataset, carregar_regras_ml
-from app.utils.precificacao.precos_min_max import precos_min_max
+from app.utils.precificacao.precos_min_max import precos_min_max_lote
 from app.utils.precificacao.filters import is_item_full
 
 # Validators (avisos por item)
@@ -39,9 +39,9 @@ def _load_doc(regiao_enum: Regiao) -> tuple[dict, str]:
     return doc, str(path)
 
 
-def _merge_ranges_e_warnings(item: dict, regras: dict) -> dict:
-    """Calcula faixa de preço e anota warnings de validação no item."""
-    res = precos_min_max(item, regras) or {}
+def _merge_ranges_e_warnings(item: dict, res: dict) -> dict:
+    """Anota a faixa de preço (já resolvida em lote) e warnings de validação no item."""
+    res = res or {}
     it2 = dict(item)
     # Persistimos com ambos os nomes (compatibilidade com páginas/serviços)
     it2["preco_minimo"] = res.get("preco_minimo")
@@ -69,12 +69,15 @@ def _processar_regiao(regiao: str, *, debug: bool = False) -> None:
 
     itens_in = doc.get("itens") or []
     itens_out: List[Dict[str, Any]] = []
-    full_com_faixa = 0
-
-    for it in itens_in:
-        it2 = _merge_ranges_e_warnings(it, regras)
-        if is_item_full(it2) and (it2.get("preco_minimo") is not None or it2.get("preco_maximo") is not None):
-            full_com_faixa += 1
+    full_com_faixa = nao_full_com_faixa = 0
+
+    for it, res in zip(itens_in, precos_min_max_lote(itens_in, regras)):
+        it2 = _merge_ranges_e_warnings(it, res)
+        if it2.get("preco_minimo") is not None or it2.get("preco_maximo") is not None:
+            if is_item_full(it2):
+                full_com_faixa += 1
+            else:
+                nao_full_com_faixa += 1
         itens_out.append(it2)
 
     doc_out = dict(doc)
@@ -84,7 +87,7 @@ def _processar_regiao(regiao: str, *, debug: bool = False) -> None:
     salvar_dataset(doc_out, regiao_enum, keep=7, debug=debug)
 
     print(f"[ok] {path}")
-    print(f"[stats] total_itens={len(itens_out)} | full_com_faixa={full_com_faixa}")
+    print(f"[stats] total_itens={len(itens_out)} | full_com_faixa={full_com_faixa} | nao_full_com_faixa={nao_full_com_faixa}")
 
 
 def main():
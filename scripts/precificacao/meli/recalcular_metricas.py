@@ -10,6 +10,7 @@ from app.utils.precificacao.config import Periodo, get_precificacao_dataset_path
 from app.utils.precificacao.service import executar, salvar_dataset
 from app.utils.precificacao.metrics import carregar_regras_ml, preco_efetivo, _is_full_item
 from app.utils.precificacao.custos_meli import custo_fixo_full
+from app.utils.precificacao.incremental import calcular_incremental
 from app.config.paths import Regiao
 
 # scripts/precificacao/meli/recalcular_metricas.py  (substituir apenas esta função)
@@ -95,6 +96,7 @@ def main():
     ap.add_argument("--mes", type=int, default=None, help="Opcional _meta (1..12)")
     ap.add_argument("--no-rebate", action="store_true", help="Se presente, NÃO usar rebate como preço efetivo.")
     ap.add_argument("--debug", action="store_true", help="StdoutSink extra.")
+    ap.add_argument("--full", action="store_true", help="Ignora o store incremental e recalcula todos os itens.")
     args = ap.parse_args()
 
     # Periodo só para _meta; saída é por região fixa
@@ -111,6 +113,7 @@ def main():
         use_rebate_as_price=(not args.no_rebate),
         keep=7,
         debug=args.debug,
+        incremental=not args.full,
     )
 
     # 2) Recarrega dataset e sobrescreve comissão/custo_fixo_full com base nas fórmulas puras
@@ -119,7 +122,16 @@ def main():
         doc = json.load(f)
 
     regras = carregar_regras_ml()
-    doc2 = _overwrite_commission_and_fixed(doc, regras, use_rebate_as_price=(not args.no_rebate))
+    use_rebate = not args.no_rebate
+    itens2, stats2 = calcular_incremental(
+        doc.get("itens") or [],
+        lambda lote: _overwrite_commission_and_fixed({"itens": lote}, regras, use_rebate_as_price=use_rebate)["itens"],
+        regiao=regiao_enum,
+        etapa="recalculo",
+        extras={"regras": regras.versao, "rebate": use_rebate},
+        incremental=not args.full,
+    )
+    doc2 = {**doc, "itens": itens2}
 
     # 3) Persiste novamente (canônico) via service.salvar_dataset (inclui _meta e hash)
     salvar_dataset(doc2, regiao_enum, keep=7, debug=args.debug)
@@ -128,6 +140,9 @@ def main():
     total, com_metricas = _count_with_metrics(ds_path)
     print(f"[ok] {ds_path}")
     print(f"[stats] itens={total} | com_metricas={com_metricas} | rebate={'off' if args.no_rebate else 'on'}")
+    st1 = doc.get("incremental") or {}
+    print(f"[incremental] metricas: recalculados={st1.get('recalculados', '?')} reaproveitados={st1.get('reaproveitados', '?')}"
+          f" | recalculo: recalculados={stats2['recalculados']} reaproveitados={stats2['reaproveitados']}")
 
 if __name__ == "__main__":
     main()
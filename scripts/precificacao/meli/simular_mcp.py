@@ -2,18 +2,43 @@
 from __future__ import annotations
 import argparse
 import json
+import os
+import sys
+import time
 from app.config.paths import Regiao
 from app.utils.precificacao.service import simular_mcp
+from app.utils.precificacao.simulacao_lote import simular_arquivo
 
 def main():
-    ap = argparse.ArgumentParser(description="Simular MCP informando preço e subsídio (R$).")
-    ap.add_argument("--regiao", choices=["sp","mg"], required=True)
-    ap.add_argument("--mlb", required=True, help="MLB do anúncio")
-    ap.add_argument("--preco", type=float, required=True, help="Preço de venda a simular (R$)")
+    ap = argparse.ArgumentParser(description="Simular MCP informando preço e subsídio (R$) — um MLB ou um arquivo de cenários.")
+    ap.add_argument("--regiao", choices=[r.value for r in Regiao], required=True,
+                    help="Região do dataset (padrão das linhas sem 'regiao' no lote)")
+    ap.add_argument("--mlb", help="MLB do anúncio")
+    ap.add_argument("--preco", type=float, help="Preço de venda a simular (R$)")
     ap.add_argument("--subsidio", type=float, default=0.0, help="Subsídio ML (R$) a abater nas taxas")
+    # lote
+    ap.add_argument("--entrada", help="CSV/JSONL de cenários (mlb, preco, subsidio, overrides); '-' = stdin")
+    ap.add_argument("--saida", default="-", help="CSV/JSONL de resultados; '-' = stdout (padrão)")
+    ap.add_argument("--formato-entrada", choices=["csv", "jsonl"], default=None, help="Padrão: pela extensão")
+    ap.add_argument("--formato-saida", choices=["csv", "jsonl"], default=None, help="Padrão: pela extensão")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos do pool (1 = sem pool)")
+    ap.add_argument("--lote", type=int, default=5000, help="Cenários por bloco enviado a cada worker")
     args = ap.parse_args()
 
-    reg = Regiao.SP if args.regiao == "sp" else Regiao.MG
+    reg = Regiao(args.regiao)
+
+    if args.entrada:
+        t0 = time.perf_counter()
+        n = simular_arquivo(
+            args.entrada, args.saida, reg,
+            formato_entrada=args.formato_entrada, formato_saida=args.formato_saida,
+            workers=args.workers, lote=args.lote,
+        )
+        print(f"[ok] cenarios={n} | workers={args.workers} | {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        return
+
+    if not args.mlb or args.preco is None:
+        ap.error("informe --mlb e --preco (ou --entrada para lote)")
     out = simular_mcp(args.mlb, reg, args.preco, args.subsidio)
     print(json.dumps(out, ensure_ascii=False, indent=2))
 
@@ -15,6 +15,8 @@ def parse_args():
     p.add_argument("--regiao", type=str, help="SP/MG/ES (opcional para alguns provedores)")
     p.add_argument("--debug", action="store_true")
     p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--workers", type=int, default=1, help="Processos p/ parsear os XMLs (1 = serial)")
+    p.add_argument("--full", action="store_true", help="Reparseia todos os ZIP/XML (ignora o manifesto incremental)")
     # 👇 novos
     p.add_argument("--preview", type=int, default=0, help="Imprime N linhas de amostra após gerar o PP")
     p.add_argument("--preview-fields", type=str, default="",
@@ -31,7 +33,8 @@ def main():
     regiao = Regiao[a.regiao] if a.regiao else None
 
     # gera o JSON (ou dry-run)
-    json_path = gerar_pp_json(a.provedor, a.ano, a.mes, regiao, dry_run=a.dry_run, debug=a.debug)
+    json_path = gerar_pp_json(a.provedor, a.ano, a.mes, regiao, dry_run=a.dry_run, debug=a.debug, workers=a.workers,
+                              incremental=not a.full)
     status = "dry-run" if a.dry_run else "ok"
     print(json.dumps({"status": status, "json_target": json_path}, ensure_ascii=False))
 
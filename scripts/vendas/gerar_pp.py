@@ -2,8 +2,9 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 from typing import List, Dict, Any
-from app.config.paths import ensure_dirs, vendas_pp_json, pp_dir
+from app.config.paths import ensure_dirs, vendas_pp_json, vendas_cubo_diario_json, pp_dir
 from app.utils.vendas.meli.preprocess import normalize_from_file
+from app.utils.vendas.meli.service import construir_cubo_diario
 from app.utils.core.io import atomic_write_json
 
 import os
@@ -21,6 +22,12 @@ def _run_for(loja: str) -> Path:
     pp_dir(loja).mkdir(parents=True, exist_ok=True)
     atomic_write_json(out, rows, do_backup=True)
     print(f"[OK] PP gerado ({loja.upper()}): {out} | linhas={len(rows)}")
+
+    # Cubo diário (rollup) no mesmo run: gravado DEPOIS do PP para ficar em dia (mtime)
+    cubo = construir_cubo_diario(loja, rows)
+    out_cubo = vendas_cubo_diario_json(loja)
+    atomic_write_json(out_cubo, cubo, do_backup=False)
+    print(f"[OK] Cubo diário ({loja.upper()}): {out_cubo} | células={cubo['_meta']['cells']}")
     return out
 
 def main(argv: list[str]) -> None:
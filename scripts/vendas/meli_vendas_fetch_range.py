@@ -9,10 +9,11 @@ from pathlib import Path
 
 from app.config.paths import (
     APP_TIMEZONE, ML_API_BASE, ensure_dirs, get_loja_config,
-    vendas_raw_json, meli_client_credentials,
+    vendas_raw_json, vendas_shards_dir, meli_client_credentials,
 )
 from app.utils.core.io import salvar_json, ler_json
-from app.utils.meli.client import MeliClient
+from app.utils.meli.client import MeliClient, OrdersShardTruncated
+from app.utils.vendas.meli.sync import incremental_since, merge_orders, prune_window
 
 import os
 os.environ.setdefault("PYTHONIOENCODING", "utf-8")
@@ -21,9 +22,17 @@ try:
 except Exception:
     pass
 
-USO = "Uso: python -m scripts.vendas.meli_vendas_fetch_range [sp|mg] [--days 60]"
+USO = ("Uso: python -m scripts.vendas.meli_vendas_fetch_range [sp|mg] [--days 60] [--full] "
+       "[--shard day|hour] [--workers 4] [--checkpoint-max-age HORAS]")
 
-def _parse_args(argv: list[str]) -> Tuple[str, int]:
+def _arg_value(argv: list[str], flag: str) -> str | None:
+    if flag in argv:
+        i = argv.index(flag)
+        if i + 1 < len(argv):
+            return argv[i + 1]
+    return None
+
+def _parse_args(argv: list[str]) -> Tuple[str, int, bool, str | None, int, timedelta | None]:
     loja = (argv[1] if len(argv) > 1 else "").strip().lower()
     if loja not in ("sp", "mg"):
         raise SystemExit(USO)
@@ -35,7 +44,28 @@ def _parse_args(argv: list[str]) -> Tuple[str, int]:
                 days = int(argv[i + 1])
             except ValueError:
                 pass
-    return loja, days
+    full = "--full" in argv
+    shard = _arg_value(argv, "--shard")
+    if shard is not None and shard not in ("day", "hour"):
+        raise SystemExit(USO)
+    try:
+        workers = int(_arg_value(argv, "--workers") or 4)
+    except ValueError:
+        workers = 4
+    # checkpoints de shard mais velhos que isso são buscados de novo (0 = sem limite)
+    try:
+        horas = float(_arg_value(argv, "--checkpoint-max-age") or 24)
+    except ValueError:
+        horas = 24.0
+    max_age = timedelta(hours=horas) if horas > 0 else None
+    return loja, days, full, shard, workers, max_age
+
+def _ler_raw_atual(path: Path) -> dict | None:
+    try:
+        data = ler_json(path)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
 
 def _token_bundle(tokens_path: Path) -> Tuple[str, str | None]:
     data = ler_json(tokens_path)
@@ -47,7 +77,7 @@ def _token_bundle(tokens_path: Path) -> Tuple[str, str | None]:
 
 def main(argv: list[str]) -> None:
     ensure_dirs()
-    loja, days = _parse_args(argv)
+    loja, days, full, shard, workers, ckpt_max_age = _parse_args(argv)
 
     cfg = get_loja_config(loja)
     if not cfg.seller_id:
@@ -65,8 +95,42 @@ def main(argv: list[str]) -> None:
     iso_from = dt_from.isoformat(timespec="seconds")   # ex.: 2025-07-01T00:00:00-03:00
     iso_to   = dt_to.isoformat(timespec="seconds")
 
-    print(f"-> Buscando pedidos de {loja.upper()} de {iso_from} ate {iso_to} (fuso={APP_TIMEZONE})")
-    data = client.search_orders_range(cfg.seller_id, iso_from, iso_to, limit=50)
+    out = vendas_raw_json(loja)
+    atual = None if full else _ler_raw_atual(out)
+    since = incremental_since(atual, iso_from) if atual else None
+
+    if since:
+        # Incremental: só pedidos criados/alterados desde a marca d'água, mesclados por id
+        print(f"-> Sync incremental {loja.upper()}: date_last_updated >= {since} (janela desde {iso_from})")
+        data = client.search_orders_range(cfg.seller_id, since, iso_to, limit=50, date_field="date_last_updated")
+        fetched = data.get("results", [])
+        results, stats = merge_orders(atual.get("results") or [], fetched)
+        mode = "incremental"
+    elif shard:
+        # Backfill longo: shards concorrentes com checkpoint (retomável se interrompido)
+        ckpt = vendas_shards_dir(loja)
+        print(f"-> Backfill {loja.upper()} de {iso_from} ate {iso_to} | shard={shard} workers={workers} "
+              f"| checkpoints={ckpt}")
+        try:
+            data = client.search_orders_range_sharded(
+                cfg.seller_id, iso_from, iso_to, shard=shard, workers=workers, checkpoint_dir=ckpt,
+                checkpoint_max_age=ckpt_max_age,
+                progress=lambda done, pend, sh, n: print(f"   shard {sh}: {n} pedidos | ok={done} pendentes={pend}"),
+            )
+        except OrdersShardTruncated as e:
+            # shards já concluídos ficam no checkpoint; nada é gravado no RAW truncado
+            raise SystemExit(f"[ERRO] {e}")
+        fetched = data.get("results", [])
+        results, stats = fetched, {"added": len(fetched), "updated": 0, "unchanged": 0}
+        mode = "full"
+    else:
+        print(f"-> Buscando pedidos de {loja.upper()} de {iso_from} ate {iso_to} (fuso={APP_TIMEZONE})")
+        data = client.search_orders_range(cfg.seller_id, iso_from, iso_to, limit=50)
+        fetched = data.get("results", [])
+        results, stats = fetched, {"added": len(fetched), "updated": 0, "unchanged": 0}
+        mode = "full"
+
+    results = prune_window(results, iso_from)
 
     # Acrescenta metadados e salva no RAW fixo
     payload = {
@@ -76,12 +140,24 @@ def main(argv: list[str]) -> None:
             "timezone": APP_TIMEZONE,
             "days": days,
         },
-        "paging": data.get("paging", {}),
-        "results": data.get("results", []),
+        "paging": {"total": len(results)},
+        "sync": {
+            "last_updated": iso_to,  # marca d'água da próxima execução
+            "mode": mode,
+            "fetched": len(fetched),
+            **stats,
+        },
+        "results": results,
     }
-    out = vendas_raw_json(loja)
     salvar_json(out, payload)  # atômico + backup
-    print(f"[OK] RAW atualizado: {out} | total={len(payload['results'])}")
+    if shard and mode == "full":
+        # backfill concluído: checkpoints não são mais necessários
+        for p in vendas_shards_dir(loja).glob("*.json"):
+            p.unlink(missing_ok=True)
+    print(f"[OK] RAW atualizado ({mode}): {out} | total={len(results)} | "
+          f"buscados={len(fetched)} novos={stats['added']} atualizados={stats['updated']}")
+    for ep, st in client.http.stats().items():
+        print(f"   http {ep}: {st}")
 
 if __name__ == "__main__":
     main(sys.argv)
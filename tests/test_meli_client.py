@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.meli.client import MeliClient
+
+
+class _Resp:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class _Transport:
+    """Grava a query de cada GET e devolve uma página vazia."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, headers=None, params=None, **kw):
+        self.calls.append((url, dict(params or {})))
+        return _Resp({"results": [], "paging": {"total": 0}})
+
+
+def _client():
+    t = _Transport()
+    return MeliClient("tok", transport=t), t
+
+
+def test_search_orders_range_incremental_filtra_por_date_last_updated():
+    c, t = _client()
+    c.search_orders_range("123", "2025-07-01T00:00:00-03:00", "2025-07-02T00:00:00-03:00",
+                          date_field="date_last_updated")
+    url, params = t.calls[0]
+    assert url.endswith("/orders/search")
+    assert params == {
+        "seller": "123",
+        "order.date_last_updated.from": "2025-07-01T00:00:00-03:00",
+        "order.date_last_updated.to": "2025-07-02T00:00:00-03:00",
+        "sort": "date_asc",
+        "limit": 50,
+        "offset": 0,
+    }
+
+
+def test_search_orders_range_padrao_filtra_por_date_created():
+    c, t = _client()
+    c.search_orders_range("123", "2025-07-01T00:00:00-03:00", "2025-07-02T00:00:00-03:00")
+    params = t.calls[0][1]
+    assert params["order.date_created.from"] == "2025-07-01T00:00:00-03:00"
+    assert params["order.date_created.to"] == "2025-07-02T00:00:00-03:00"
+
+
+def test_sharded_usa_o_mesmo_filtro():
+    c, t = _client()
+    c.search_orders_range_sharded("123", "2025-07-01T00:00:00-03:00", "2025-07-01T05:00:00-03:00",
+                                  shard="hour", workers=1, date_field="date_last_updated")
+    assert t.calls
+    tz = timezone(timedelta(hours=-3))
+    for _, params in t.calls:
+        assert set(params) == {"seller", "order.date_last_updated.from", "order.date_last_updated.to",
+                               "sort", "limit", "offset"}
+        assert datetime.fromisoformat(params["order.date_last_updated.from"]) >= datetime(2025, 7, 1, tzinfo=tz)
+
+
+@pytest.mark.parametrize("campo", ["last_updated", "date_updated"])
+def test_campo_de_data_desconhecido_levanta(campo):
+    c, t = _client()
+    with pytest.raises(ValueError):
+        c.search_orders_range("123", "2025-07-01T00:00:00-03:00", "2025-07-02T00:00:00-03:00", date_field=campo)
+    with pytest.raises(ValueError):
+        c.search_orders_range_sharded("123", "2025-07-01T00:00:00-03:00", "2025-07-02T00:00:00-03:00",
+                                      date_field=campo)
+    assert t.calls == []
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+import pytest
+
+from app.utils.precificacao import regras_ml as regras_mod
+from app.utils.precificacao.index import IndiceDataset
+
+
+@pytest.fixture
+def yaml_regras(tmp_path, monkeypatch):
+    p = tmp_path / "mercado_livre.yaml"
+    shutil.copy(regras_mod.get_regras_meli_yaml_path(), p)
+    monkeypatch.setattr(regras_mod, "get_regras_meli_yaml_path", lambda: p)
+    return p
+
+
+def test_simulador_acompanha_regras_do_yaml(yaml_regras):
+    idx = IndiceDataset("sp", [{"mlb": "MLB1", "logistic_type": "fulfillment", "preco_compra": 40.0}])
+    sim = idx.simulador
+    assert idx.simulador is sim
+    antes = sim.grade([100.0]).mcp_pct[0, 0]
+
+    texto = yaml_regras.read_text(encoding="utf-8")
+    assert "imposto_pct: 0.10" in texto
+    yaml_regras.write_text(texto.replace("imposto_pct: 0.10", "imposto_pct: 0.20"), encoding="utf-8")
+    st = yaml_regras.stat()
+    os.utime(yaml_regras, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    novo = idx.simulador
+    assert novo is not sim
+    assert novo.regras.versao == regras_mod.regras_ml().versao
+    assert novo.grade([100.0]).mcp_pct[0, 0] == pytest.approx(antes - 0.10)
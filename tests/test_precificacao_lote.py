@@ -0,0 +1,85 @@
+import copy
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.utils.precificacao.metrics import calcular_metricas_item, carregar_regras_ml
+from app.utils.precificacao.metrics_lote import calcular_metricas_lote, simular_mcp_lote
+from app.utils.precificacao.simulator import simular_mcp_item
+
+NAN, INF = float("nan"), float("inf")
+_VALORES = {
+    "preco": [None, "", NAN, INF, 0, -5, 19.9, 120.0, "80.5", "abc", True],
+    "pct": [None, "", NAN, INF, 0, 0.12, 1.5, -0.2, "0.1", True],
+    "custo": [None, "", NAN, INF, -1, 0, 30.0, "25,5", "20"],
+    "peso": [None, "", NAN, INF, -1, 0, 0.3, 1.2, 45.0, "2", True],
+}
+_CAMPOS = {
+    "price": "preco", "rebate_price_discounted": "preco", "preco_compra": "custo",
+    "comissao_pct": "pct", "imposto_pct": "pct", "marketing_pct": "pct",
+    "comissao_pct_override": "pct", "imposto_pct_override": "pct", "marketing_pct_override": "pct",
+    "frete_full": "custo", "frete_sobre_custo": "custo", "frete_full_override": "custo",
+    "frete_sobre_custo_override": "custo", "custo_fixo_full_override": "custo",
+    "peso_kg": "peso",
+}
+
+
+def _itens(n, seed):
+    rnd = random.Random(seed)
+    itens = []
+    for _ in range(n):
+        it = {"logistic_type": rnd.choice(["fulfillment", "cross_docking", None]), "is_full": rnd.random() < 0.2}
+        for campo, tipo in _CAMPOS.items():
+            if rnd.random() < 0.5:
+                it[campo] = rnd.choice(_VALORES[tipo])
+        itens.append(it)
+    return itens
+
+
+def _igual(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_igual(a[k], b[k]) for k in a)
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a):
+        return math.isnan(b)
+    return a == b
+
+
+@pytest.fixture(scope="module")
+def regras():
+    return carregar_regras_ml()
+
+
+@pytest.mark.parametrize("considerar_rebate", [True, False])
+def test_lote_bate_com_item_com_nan_e_inf(regras, considerar_rebate):
+    itens = _itens(4000, seed=11)
+    lote = calcular_metricas_lote(copy.deepcopy(itens), regras=regras, considerar_rebate=considerar_rebate)
+    for it, got in zip(itens, lote):
+        esperado = calcular_metricas_item(copy.deepcopy(it), considerar_rebate=considerar_rebate, regras=regras)
+        assert _igual(got, esperado), it
+
+
+def test_nan_conta_como_ausente(regras):
+    base = {"price": 100.0, "preco_compra": 40.0, "logistic_type": "cross_docking"}
+    ref = calcular_metricas_item(dict(base), regras=regras)
+    com_nan = calcular_metricas_item({**base, "rebate_price_discounted": NAN, "frete_full_override": NAN},
+                                     regras=regras)
+    assert _igual(com_nan, ref)
+    sem_custo = calcular_metricas_item({**base, "preco_compra": NAN}, regras=regras)
+    assert sem_custo["mcp"] is None and sem_custo["mcp_null_reasons"] == ["preco_compra_invalido"]
+
+
+def test_simulacao_lote_bate_com_item_com_nan(regras):
+    rnd = random.Random(5)
+    itens = _itens(3000, seed=12)
+    precos = np.array([rnd.choice([10.0, 49.9, 99.0, 250.0]) for _ in itens])
+    subs = np.array([rnd.choice([0.0, 3.0, 50.0]) for _ in itens])
+    lote = simular_mcp_lote(itens, precos, subs, regras=regras)
+    for j, it in enumerate(itens):
+        esperado = simular_mcp_item(copy.deepcopy(it), preco_venda=precos[j], subsidio_valor=subs[j], regras=regras)
+        assert esperado.get("error") == lote["error"][j], it
+        if esperado.get("error"):
+            continue
+        for k in ("mcp_abs", "mcp_pct", "frete", "custo_fixo_full", "custo_ml_nao_full", "comissao_brl"):
+            assert _igual(float(esperado[k]), float(lote[k][j])), (k, it)
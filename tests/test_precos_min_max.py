@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from app.utils.precificacao.metrics import calcular_metricas_item, carregar_regras_ml
+from app.utils.precificacao.metrics_lote import calcular_metricas_lote
+from app.utils.precificacao.precos_min_max import precos_min_max_lote
+from app.utils.precificacao.simulator import simular_mcp_item
+
+_TOL = 1e-3  # preço arredondado ao centavo
+
+
+@pytest.fixture(scope="module")
+def regras():
+    return carregar_regras_ml()
+
+
+def _itens(n, seed):
+    rnd = random.Random(seed)
+    return [
+        {
+            "logistic_type": rnd.choice(["fulfillment", "cross_docking", "drop_off"]),
+            "preco_compra": round(rnd.uniform(1.0, 300.0), 2),
+            "peso_kg": rnd.choice([0.2, 0.9, 3.0, 12.0]),
+        }
+        for _ in range(n)
+    ]
+
+
+def test_mcp_no_preco_minimo_e_maximo_bate_com_a_meta(regras):
+    default = regras["default"]
+    itens = _itens(1500, seed=3)
+    faixas = precos_min_max_lote(itens, regras)
+    vistos = {"full": 0, "abaixo": 0, "frete_gratis": 0}
+    for it, faixa in zip(itens, faixas):
+        for chave, alvo in (("preco_minimo", default["mcp_min"]), ("preco_maximo", default["mcp_max"])):
+            p = faixa[chave]
+            if p is None:
+                continue
+            met = calcular_metricas_item({**it, "price": p}, regras=regras)
+            sim = simular_mcp_item(it, preco_venda=p, regras=regras)
+            assert met["mcp_pct"] == pytest.approx(sim["mcp_pct"], abs=1e-12), it
+            assert sim["mcp_pct"] >= alvo - _TOL, (chave, p, it)
+            # menor preço: um centavo abaixo já não atinge a meta
+            abaixo = simular_mcp_item(it, preco_venda=round(p - 0.01, 2), regras=regras)
+            assert abaixo.get("error") or abaixo["mcp_pct"] < alvo + _TOL, (chave, p, it)
+            if it["logistic_type"] == "fulfillment":
+                vistos["full"] += 1
+            elif p < regras.frete_gratis.threshold:
+                vistos["abaixo"] += 1
+            else:
+                vistos["frete_gratis"] += 1
+    assert all(vistos.values()), vistos
+
+
+def test_frete_gratis_sem_peso_nao_tem_mcp(regras):
+    acima = regras.frete_gratis.threshold + 20.0
+    it = {"logistic_type": "cross_docking", "preco_compra": 30.0, "price": acima}
+    met = calcular_metricas_item(dict(it), regras=regras)
+    assert met["mcp"] is None and met["mcp_null_reasons"] == ["frete_gratis_sem_peso"]
+    assert calcular_metricas_lote([dict(it)], regras=regras)[0] == met
+    assert simular_mcp_item(it, preco_venda=acima, regras=regras)["error"] == "frete_gratis_sem_peso"
+
+    com_peso = calcular_metricas_item({**it, "peso_kg": 0.5}, regras=regras)
+    assert com_peso["custo_ml_nao_full"] == regras.freight(acima, 0.5)
+    assert com_peso["mcp_abs"] is not None